@@ -12,4 +12,5 @@ from ablator.main.model.wrapper import ModelWrapper
 from ablator.main.mp import ParallelTrainer
 from ablator.main.proto import ProtoTrainer
 from ablator.modules.optimizer import OPTIMIZER_CONFIG_MAP, OptimizerConfig
+from ablator.modules.profiler import ProfilerConfig
 from ablator.modules.scheduler import SCHEDULER_CONFIG_MAP, SchedulerConfig
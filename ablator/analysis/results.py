@@ -14,6 +14,8 @@ from joblib import Memory
 
 from ablator.config.main import ConfigBase
 from ablator.main.configs import Optim, ParallelConfig, SearchSpace
+from ablator.modules.loggers.arrow import read_arrow_results
+from ablator.modules.loggers.main import SummaryLogger
 
 
 def process_row(row: str, **aux_info) -> dict[str, ty.Any] | None:
@@ -75,7 +77,8 @@ def read_result(config_type: type[ConfigBase], json_path: Path) -> pd.DataFrame:
 
     The function reads the data from a JSON file, processes each row, and appends
     experiment attributes from a YAML configuration file. The resulting DataFrame
-    is indexed and returned.
+    is indexed and returned. When ``json_path`` is a ``results.arrow`` directory,
+    the results are loaded from its Arrow segment files instead.
 
     Parameters
     ----------
@@ -83,7 +86,8 @@ def read_result(config_type: type[ConfigBase], json_path: Path) -> pd.DataFrame:
         The type of the configuration class that is used to load the experiment
         configuration from a YAML file.
     json_path : Path
-        The path to the JSON file containing the results of the experiment.
+        The path to the JSON file containing the results of the experiment, or to the
+        directory of the results in the arrow format.
 
     Returns
     -------
@@ -125,16 +129,24 @@ def read_result(config_type: type[ConfigBase], json_path: Path) -> pd.DataFrame:
             experiment_config.annotations, flatten=True
         )
 
+        aux_info = {
+            **experiment_attributes,
+            **{"path": json_path.parent.as_posix()},
+        }
+        if json_path.is_dir():
+            df = read_arrow_results(json_path)
+            assert (
+                len(set(df.columns).intersection(aux_info.keys())) == 0
+            ), f"Overlapping column names between auxilary dictionary and run results. aux_info: {aux_info}\n\ncolumns:{list(df.columns)} "
+            df = pd.concat(
+                [df, pd.DataFrame([aux_info] * len(df), index=df.index)], axis=1
+            )
+            return df.reset_index()
+
         with open(json_path, "r", encoding="utf-8") as f:
             lines = f.read().split("}\n{")
 
-        _process_row = functools.partial(
-            process_row,
-            **{
-                **experiment_attributes,
-                **{"path": json_path.parent.as_posix()},
-            },
-        )
+        _process_row = functools.partial(process_row, **aux_info)
         processed_rows = [_process_row(l) for l in lines]  # noqa
         processed_jsons = list(filter(lambda x: x is not None, processed_rows))
         df = pd.DataFrame(processed_jsons)
@@ -320,7 +332,9 @@ class Results:
             A dataframe of all the results
         """
         results = []
-        json_paths = list(experiment_dir.rglob("results.json"))
+        json_paths = list(experiment_dir.rglob(SummaryLogger.RESULTS_JSON_NAME)) + list(
+            experiment_dir.rglob(SummaryLogger.RESULTS_ARROW_NAME)
+        )
         if len(json_paths) == 0:
             raise RuntimeError(f"No results found in {experiment_dir}")
         cpu_count = mp.cpu_count()
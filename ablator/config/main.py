@@ -24,7 +24,9 @@ from ablator.config.utils import dict_hash, flatten_nested_dict
 
 def configclass(cls):
     """
-    Decorator for ConfigBase subclasses, adds the ``config_class`` attribute to the class.
+    Decorator for ConfigBase subclasses, adds the ``config_class`` attribute to the class and parses
+    the annotations of the class once, when it is decorated. Invalid annotations raise when an object of
+    the class is created.
 
     Parameters
     ----------
@@ -39,7 +41,13 @@ def configclass(cls):
 
     assert issubclass(cls, ConfigBase), f"{cls.__name__} must inherit from ConfigBase"
     setattr(cls, "config_class", cls)
-    return dataclass(cls, init=False, repr=False, kw_only=True)
+    cls = dataclass(cls, init=False, repr=False, kw_only=True)
+    try:
+        cls._class_cache()  # pylint: disable=protected-access
+    except Exception:  # pylint: disable=broad-exception-caught
+        # the invalid annotations raise when an object of the class is created.
+        pass
+    return cls
 
 
 class Missing:
@@ -48,6 +56,61 @@ class Missing:
     """
 
 
+class _ClassCache(ty.NamedTuple):
+    """
+    The class attributes of a configuration class that are the same for all of its objects.
+    """
+
+    annotations: dict[str, Annotation]
+    non_annotated_variables: set[str]
+    custom_init: bool
+    # the fields whose values can be nested configuration objects.
+    config_fields: tuple[str, ...]
+    # the function that parses the value of every field in ``from_trusted_dict``, ``None`` when the value
+    # is used as is.
+    trusted_parsers: dict[str, ty.Callable[[ty.Any], ty.Any] | None]
+
+
+def _make_trusted_parser(
+    name: str, annotation: Annotation
+) -> ty.Callable[[ty.Any], ty.Any] | None:
+    """
+    Make the function that parses a value of a valid configuration dictionary, which skips the
+    validation of ``parse_value``.
+
+    Parameters
+    ----------
+    name : str
+        The name of the field.
+    annotation : Annotation
+        The annotation of the field.
+
+    Returns
+    -------
+    ty.Callable[[ty.Any], ty.Any] | None
+        The function that parses a value, or ``None`` when the value is used as is.
+    """
+    collection = annotation.collection
+    variable_type = annotation.variable_type
+    if isinstance(variable_type, type) and issubclass(variable_type, ConfigBase):
+        if collection == Type:
+            return lambda v: variable_type.from_trusted_dict(v) if isinstance(v, dict) else v
+        if collection == Dict:
+            return lambda v: {
+                _k: variable_type.from_trusted_dict(_v) if isinstance(_v, dict) else _v
+                for _k, _v in v.items()
+            }
+    if collection is None and variable_type in (int, float, str, bool):
+        return lambda v: v if type(v) is variable_type else variable_type(v)
+    if collection is Literal:
+        return None
+    if collection in [List, Tuple]:
+        return list
+    if collection == Dict and variable_type in (int, float, str, bool):
+        return dict
+    return lambda v: parse_value(v, annotation, name)
+
+
 @dataclass(repr=False)
 class ConfigBase:
     # NOTE: this allows for non-defined arguments to be created. It is very bug-prone and will be disabled.
@@ -83,20 +146,8 @@ class ConfigBase:
 
     def __init__(self, *args, **kwargs):
         class_name = type(self).__name__
-        added_variables = {
-            item[0]
-            for item in inspect.getmembers(type(self))
-            if not inspect.isfunction(item[1]) and not item[0].startswith("_")
-        }
-
-        base_variables = {
-            item[0]
-            for item in inspect.getmembers(ConfigBase)
-            if not inspect.isfunction(item[1])
-        }
-        non_annotated_variables = (
-            added_variables - base_variables - set(self.annotations.keys())
-        )
+        class_cache = self._class_cache()
+        non_annotated_variables = class_cache.non_annotated_variables
         assert (
             len(non_annotated_variables) == 0
         ), f"All variables must be annotated. {non_annotated_variables}"
@@ -106,8 +157,9 @@ class ConfigBase:
             raise RuntimeError(
                 f"You must decorate your Config class '{class_name}' with ablator.configclass."
             )
+        annotations = class_cache.annotations
         missing_vals = []
-        for k, annotation in self.annotations.items():
+        for k, annotation in annotations.items():
             if not annotation.optional and annotation.state not in [Derived]:
                 # make sure non-optional and derived values are not empty or
                 # without a default assignment
@@ -117,7 +169,7 @@ class ConfigBase:
                 ):
                     missing_vals.append(k)
         assert len(missing_vals) == 0, f"Missing required value {missing_vals}"
-        for k, annotation in self.annotations.items():
+        for k, annotation in annotations.items():
             if k in kwargs:
                 v = kwargs[k]
                 del kwargs[k]
@@ -131,6 +183,173 @@ class ConfigBase:
             unspected_args = ", ".join(kwargs.keys())
             raise KeyError(f"Unexpected arguments: `{unspected_args}`")
 
+    def __setattr__(self, name: str, value: ty.Any) -> None:
+        super().__setattr__(name, value)
+        # invalidates the cached values of the object, i.e. ``uid``
+        self.__dict__["_version"] = self.__dict__.get("_version", 0) + 1
+
+    def _version_key(self) -> tuple:
+        """
+        The version of the object and of every nested configuration object. It changes
+        when any attribute is assigned.
+
+        Returns
+        -------
+        tuple
+            The versions of the configuration tree.
+        """
+        key: list[ty.Any] = [self.__dict__.get("_version", 0)]
+        for k in self._class_cache().config_fields:
+            v = self.__dict__.get(k)
+            if isinstance(v, ConfigBase):
+                key.append(v._version_key())
+            elif isinstance(v, list):
+                key += [_v._version_key() for _v in v if isinstance(_v, ConfigBase)]
+            elif isinstance(v, dict):
+                key += [
+                    _v._version_key() for _v in v.values() if isinstance(_v, ConfigBase)
+                ]
+        return tuple(key)
+
+    def _cached(self, name: str, fn: ty.Callable[[], ty.Any]) -> ty.Any:
+        """
+        Get a value computed from the configuration, e.g. ``uid``. The value is cached in the object
+        and recomputed after an attribute of the object or of a nested configuration is assigned.
+
+        Parameters
+        ----------
+        name : str
+            The name of the cached value.
+        fn : ty.Callable[[], ty.Any]
+            The function that computes the value.
+
+        Returns
+        -------
+        ty.Any
+            The value.
+
+        Notes
+        -----
+        In-place modifications of collections, i.e. ``config.arguments["lr"] = 0.1`` are not detected.
+        """
+        # NOTE written to __dict__ directly so that caching does not change the version.
+        cache = self.__dict__.setdefault("_cache", {})
+        version_key = self._version_key()
+        if name in cache and cache[name][0] == version_key:
+            return cache[name][1]
+        value = fn()
+        cache[name] = (version_key, value)
+        return value
+
+    @classmethod
+    def _class_cache(cls) -> _ClassCache:
+        """
+        Get the parsed annotations and the members of the configuration class. They are computed
+        when the class is decorated with ``@configclass``, or the first time an object of a class
+        that is not decorated is created, and are cached in the class.
+
+        Returns
+        -------
+        _ClassCache
+            The cached class attributes.
+        """
+        # NOTE the cache is looked up in the class itself as the cache of a parent class is not valid.
+        class_cache = cls.__dict__.get("__class_cache__")
+        if class_cache is not None:
+            return class_cache
+        annotations = {}
+        if hasattr(cls, "__annotations__"):
+            annotation_types = dict(cls.__annotations__)
+            # pylint: disable=no-member
+            # Without the if statement it will over-write new configurations
+            # e.x.
+
+            # class ReConfig(RunConfig):
+            #     train_config: SomeTrainConfig = SomeTrainConfig()
+            #     model_config: SomeModelConfig = SomeModelConfig()
+            # TODO test-me
+
+            dataclass_types = {
+                k: v.type
+                for k, v in cls.__dataclass_fields__.items()
+                if k not in annotation_types
+            }
+            annotation_types.update(dataclass_types)
+
+            annotations = {
+                field_name: parse_type_hint(annotation)
+                for field_name, annotation in annotation_types.items()
+            }
+        added_variables = {
+            item[0]
+            for item in inspect.getmembers(cls)
+            if not inspect.isfunction(item[1]) and not item[0].startswith("_")
+        }
+
+        base_variables = {
+            item[0]
+            for item in inspect.getmembers(ConfigBase)
+            if not inspect.isfunction(item[1])
+        }
+        custom_init = any(
+            "__init__" in base.__dict__
+            for base in cls.__mro__
+            if base is not ConfigBase and issubclass(base, ConfigBase)
+        )
+        config_fields = tuple(
+            k
+            for k, annotation in annotations.items()
+            if annotation.collection in [Type, Dict, List]
+            and isinstance(annotation.variable_type, type)
+            and issubclass(annotation.variable_type, ConfigBase)
+        )
+        class_cache = _ClassCache(
+            annotations=annotations,
+            non_annotated_variables=added_variables
+            - base_variables
+            - set(annotations.keys()),
+            custom_init=custom_init,
+            config_fields=config_fields,
+            trusted_parsers={
+                k: _make_trusted_parser(k, annotation)
+                for k, annotation in annotations.items()
+            },
+        )
+        setattr(cls, "__class_cache__", class_cache)
+        return class_cache
+
+    @classmethod
+    def from_trusted_dict(cls, kwargs: dict[str, ty.Any]):
+        """
+        Create a configuration object from a dictionary that was created by ``to_dict`` of a valid
+        configuration object, i.e. when loading a configuration stored by ablator. The values are not
+        validated: the checks for missing values, unexpected arguments and non-annotated variables are skipped,
+        primitive values are only converted when their type differs from the annotation and the collections
+        are copied without parsing their elements. Nested configurations are created the same way.
+        Configuration classes that implement ``__init__`` are created with their constructor.
+
+        Parameters
+        ----------
+        kwargs : dict[str, ty.Any]
+            The dictionary of the configuration object.
+
+        Returns
+        -------
+        ConfigBase
+            The configuration object.
+        """
+        class_cache = cls._class_cache()
+        if class_cache.custom_init:
+            return cls(**kwargs)
+        config = cls.__new__(cls)
+        values = {}
+        for k, parse in class_cache.trusted_parsers.items():
+            v = kwargs[k] if k in kwargs else getattr(cls, k, None)
+            values[k] = v if parse is None or v is None else parse(v)
+        # NOTE the values are assigned without ``__setattr__`` as the object has no cached values.
+        config.__dict__.update(values)
+        return config
+
     def keys(self):
         """
         Get the keys of the configuration dictionary.
@@ -170,30 +389,7 @@ class ConfigBase:
         dict[str, Annotation]
             A dictionary of parsed annotations.
         """
-        annotations = {}
-        if hasattr(self, "__annotations__"):
-            annotation_types = dict(self.__annotations__)
-            # pylint: disable=no-member
-            # Without the if statement it will over-write new configurations
-            # e.x.
-
-            # class ReConfig(RunConfig):
-            #     train_config: SomeTrainConfig = SomeTrainConfig()
-            #     model_config: SomeModelConfig = SomeModelConfig()
-            # TODO test-me
-
-            dataclass_types = {
-                k: v.type
-                for k, v in self.__dataclass_fields__.items()
-                if k not in annotation_types
-            }
-            annotation_types.update(dataclass_types)
-
-            annotations = {
-                field_name: parse_type_hint(annotation)
-                for field_name, annotation in annotation_types.items()
-            }
-        return annotations
+        return dict(self._class_cache().annotations)
 
     def get_val_with_dot_path(self, dot_path: str):
         """
@@ -564,7 +760,12 @@ class ConfigBase:
             The unique identifier for the configuration object.
 
         """
-        return dict_hash(self.make_dict(self.annotations, ignore_stateless=True))[:5]
+        return self._cached(
+            "uid",
+            lambda: dict_hash(self.make_dict(self.annotations, ignore_stateless=True))[
+                :5
+            ],
+        )
 
     def assert_unambigious(self):
         """
@@ -1,5 +1,6 @@
 # TODO fix mypy that does not recognize correctly the types i.e. Stateless
 from ablator.config.main import ConfigBase, configclass
+from ablator.config.utils import dict_hash
 from ablator.config.types import (
     Optional,
     Stateless,
@@ -10,6 +11,7 @@ from ablator.config.types import (
     Dict,
 )
 from ablator.modules.optimizer import OptimizerConfig
+from ablator.modules.profiler import ProfilerConfig
 from ablator.modules.scheduler import SchedulerConfig
 from ablator.modules.storage.cloud import GcpConfig
 from ablator.modules.storage.remote import RemoteConfig
@@ -34,6 +36,11 @@ class TrainConfig(ConfigBase):
         scheduler configuration. (check ``SchedulerConfig`` for more details)
     rand_weights_init: bool = True
         whether to initialize model weights randomly.
+    gradient_accumulation_steps: int = 1
+        number of batches over which the gradients are accumulated before an optimizer step.
+        The effective batch size is ``batch_size * gradient_accumulation_steps``. It is not part of the
+        ``uid`` when it is 1, such that the ``uid`` of the configurations without gradient accumulation
+        is the same as before the attribute was added.
     """
 
     dataset: str
@@ -42,6 +49,17 @@ class TrainConfig(ConfigBase):
     optimizer_config: OptimizerConfig
     scheduler_config: Optional[SchedulerConfig]
     rand_weights_init: bool = True
+    gradient_accumulation_steps: int = 1
+
+    @property
+    def uid(self) -> str:
+        def make_uid():
+            config_dict = self.make_dict(self.annotations, ignore_stateless=True)
+            if config_dict["gradient_accumulation_steps"] == 1:
+                del config_dict["gradient_accumulation_steps"]
+            return dict_hash(config_dict)[:5]
+
+        return self._cached("uid", make_uid)
 
 
 # TODO decorator @modelconfig as opposed to @configclass ModelConfig
@@ -101,6 +119,46 @@ class RunConfig(ConfigBase):
         number of epochs marked as warm up epochs.
     divergence_factor: float = 100
         if ``cur_loss > best_loss > divergence_factor``, the model is considered to have diverged.
+    metrics_readback_itr: int = 1
+        number of training iterations for which the loss and auxiliary metrics are kept on the device
+        before they are copied to the host in a single batch. Values larger than 1 avoid a device
+        synchronization on every training step. Metrics are always read back at logging and evaluation steps.
+    prefetch_batches: int = 0
+        number of batches prepared ahead of the current batch by a background thread and, when training
+        on a cuda device, transferred to the device on a side stream. ``0`` disables prefetching.
+    async_checkpoint: bool = False
+        whether to write the checkpoints in a background thread. The checkpoint is copied to
+        CPU memory before it is written, such that training can continue during the write.
+    metrics_on_device: bool = False
+        whether to keep the model outputs appended to the metrics as tensors on the training device, such that
+        they are copied to the host in bulk when the evaluation functions run instead of after every step.
+        Arguments of the evaluation functions annotated as ``torch.Tensor`` receive tensors, and the rest numpy arrays.
+    checkpoint_format: Literal["single", "sharded", "dedup"] = "single"
+        the layout of the saved checkpoints. ``"single"`` saves every checkpoint in a single file.
+        ``"sharded"`` saves every checkpoint as a directory with a separate file for every
+        top-level key of the save dict (i.e. model, optimizer, scheduler, scaler, metrics), such that
+        loading only the model weights does not read the optimizer state. A ``"single"`` checkpoint is
+        read entirely, unless ``torch.load`` can memory-map it (``torch>=2.1``). ``"dedup"`` stores the tensors
+        as content-addressed blobs shared by all checkpoints of the run and every checkpoint as a small
+        index file, such that identical tensors of the best and recent checkpoints, or parameters that did
+        not change between two checkpoints, are written only once.
+    results_format: Literal["json", "arrow"] = "json"
+        the format of the metrics written at every log step. ``"json"`` appends a JSON object to ``results.json``.
+        ``"arrow"`` writes the metrics as record batches of an Arrow IPC stream in ``results.arrow``, which
+        ``Results`` loads without parsing. Requires ``pyarrow``.
+    buffered_logs: bool = False
+        whether to buffer the messages of the log files and append them in batches by a background thread,
+        which reduces the number of writes when many trials log to a shared file system. The buffered messages
+        are written every few seconds, when an error is logged and when the run ends.
+    step_timer: Literal["off", "wall", "cuda"] = "off"
+        whether to time the phases of the training loop (data, to_device, forward, backward, metrics, status,
+        log and eval). ``"wall"`` records the wall time of every phase and ``"cuda"`` additionally the time of the
+        work of every phase on the cuda device. The mean time of every phase is logged as the static metrics
+        ``step_{phase}_ms`` and a summary is written to the log at the end of training.
+    profiler_config: Optional[ProfilerConfig] = None
+        the schedule of the ``torch.profiler`` traces of the training loop and the trials that are profiled.
+        The traces are written to the ``dashboard/profiler`` directory of the trial and the operator tables
+        to its log. (check ``ProfilerConfig`` for more details). The training loop is not profiled when ``None``.
 
     """
 
@@ -123,13 +181,24 @@ class RunConfig(ConfigBase):
     init_chkpt: Stateless[Optional[str]] = None
     warm_up_epochs: Stateless[float] = 1
     divergence_factor: Stateless[float] = 100
+    metrics_readback_itr: Stateless[int] = 1
+    prefetch_batches: Stateless[int] = 0
+    async_checkpoint: Stateless[bool] = False
+    metrics_on_device: Stateless[bool] = False
+    checkpoint_format: Stateless[Literal["single", "sharded", "dedup"]] = "single"
+    results_format: Stateless[Literal["json", "arrow"]] = "json"
+    buffered_logs: Stateless[bool] = False
+    step_timer: Stateless[Literal["off", "wall", "cuda"]] = "off"
+    profiler_config: Stateless[Optional[ProfilerConfig]] = None
 
     @property
     def uid(self) -> str:
-        train_uid = self.train_config.uid
-        model_uid = self.model_config.uid
-        uid = f"{train_uid}_{model_uid}"
-        return uid
+        def make_uid():
+            train_uid = self.train_config.uid
+            model_uid = self.model_config.uid
+            return f"{train_uid}_{model_uid}"
+
+        return self._cached("uid", make_uid)
 
 
 class SearchType(Enum):
@@ -200,6 +269,10 @@ class ParallelConfig(RunConfig):
         remote storage configuration.
     gcp_config: Optional[GcpConfig] = None
         gcp configuration.
+    sqlite_wal: bool = False
+        whether to use write-ahead logging for the experiment state and optuna databases, such that reading
+        the trial states does not block their update. Write-ahead logging is not supported on network file
+        systems, and the default journal is kept when it can not be enabled.
 
     """
 
@@ -213,3 +286,4 @@ class ParallelConfig(RunConfig):
     ignore_invalid_params: Stateless[bool] = False
     remote_config: Stateless[Optional[RemoteConfig]] = None
     gcp_config: Stateless[Optional[GcpConfig]] = None
+    sqlite_wal: Stateless[bool] = False
@@ -16,9 +16,11 @@ from torch.utils.data import DataLoader
 from tqdm import tqdm
 
 import ablator.utils.base as butils
+import ablator.utils.file as futils
 from ablator.main.configs import RunConfig
 from ablator.modules.loggers.main import SummaryLogger
 from ablator.modules.metrics.main import TrainMetrics
+from ablator.modules.profiler import StepTimer
 from ablator.utils.base import Dummy
 
 
@@ -81,6 +83,8 @@ class ModelBase(ABC):
         Directory for the current checkpoint file, by default None.
     metrics : Metrics
         Training metrics including model information. i.e. learning rate and loss value.
+    step_timer : StepTimer
+        Times the phases of the training loop when ``run_config.step_timer`` is set.
     current_state : dict
         The currrent state of the model, including run_config, metrics and other necessary states.
     learning_rate : float
@@ -95,6 +99,9 @@ class ModelBase(ABC):
         The iteration with the best loss value.
     best_loss : float
         The lowest loss value encountered during training.
+    TRAINING_STATE_KEYS : tuple[str, ...]
+        The keys of the save dict that are only required to resume training, i.e. the optimizer state.
+        They are not read from sharded or deduplicated checkpoints when only the model weights are loaded.
 
     Notes
     -----
@@ -109,6 +116,8 @@ class ModelBase(ABC):
 
     """
 
+    TRAINING_STATE_KEYS: tuple[str, ...] = ()
+
     def __init__(
         self,
         model_class: type[nn.Module],
@@ -139,6 +148,7 @@ class ModelBase(ABC):
         self.current_checkpoint: Path | None = None
         # Runtime metrics
         self.metrics: TrainMetrics
+        self.step_timer = StepTimer(enabled=False)
         self.current_state: dict = {}
 
         # stats
@@ -201,22 +211,28 @@ class ModelBase(ABC):
     @cached_property
     def epoch_len(self):
         """
-        Returns the length of an epoch, which is the number of batches in the ``train_dataloader``.
+        Returns the length of an epoch, which is the number of optimizer steps over the ``train_dataloader``,
+        i.e. the number of batches divided by ``train_config.gradient_accumulation_steps``.
 
         Returns
         -------
         int
-            The length of an epoch, represented as the number of batches in the ``train_dataloader``.
+            The length of an epoch, represented as the number of optimizer steps in the ``train_dataloader``.
 
         Raises
         ------
         AssertionError
-            If the ``train_dataloader`` is not defined or its length is 0.
+            If the ``train_dataloader`` is not defined, its length is 0 or it is shorter than
+            ``gradient_accumulation_steps``.
         """
         assert (
             hasattr(self, "train_dataloader") and len(self.train_dataloader) > 0
         ), "Undefined train_dataloader."
-        return len(self.train_dataloader)
+        accumulation_steps = self.run_config.train_config.gradient_accumulation_steps
+        assert (
+            len(self.train_dataloader) >= accumulation_steps
+        ), f"`gradient_accumulation_steps` {accumulation_steps} is larger than the train_dataloader length {len(self.train_dataloader)}."
+        return len(self.train_dataloader) // accumulation_steps
 
     @cached_property
     def eval_itr(self):
@@ -443,6 +459,10 @@ class ModelBase(ABC):
         )
 
         self.verbose = run_config.verbose
+        self.step_timer = StepTimer(
+            enabled=run_config.step_timer != "off",
+            cuda=run_config.step_timer == "cuda" and "cuda" in self.device,
+        )
 
         if self.verbose == "silent":
             warnings.filterwarnings("ignore")
@@ -461,8 +481,10 @@ class ModelBase(ABC):
             moving_average_limit=self.epoch_len,
             evaluation_functions=self.evaluation_functions(),
             tags=["train"] + (["val"] if self.val_dataloader is not None else []),
-            static_aux_metrics=self.train_stats,
+            static_aux_metrics={**self.train_stats, **self.step_timer.metrics()},
             moving_aux_metrics=["loss"] + getattr(self, "aux_metric_names", []),
+            on_device=run_config.metrics_on_device,
+            evaluation_intermediates=self.evaluation_intermediates(),
         )
         if self.run_config.experiment_dir is not None and not debug:
             self.experiment_dir = Path(self.run_config.experiment_dir)
@@ -473,7 +495,9 @@ class ModelBase(ABC):
 
         setproctitle.setproctitle(self._get_process_name())
 
-    def _init_model_state(self, resume: bool = False, smoke_test: bool = False):
+    def _init_model_state(
+        self, resume: bool = False, smoke_test: bool = False, model_only: bool = False
+    ):
         """
         Initializes the model state based on provided parameters and configuration.
 
@@ -483,6 +507,8 @@ class ModelBase(ABC):
             If True, tries to resume training from a checkpoint, by default False.
         smoke_test : bool, optional
             Whether to run as a smoke test, by default False.
+        model_only : bool, optional
+            If True, only the model weights are loaded when resuming from a checkpoint, by default False.
         """
         if self.run_config.init_chkpt is not None and resume:
             self.current_checkpoint = Path(self.run_config.init_chkpt)
@@ -502,7 +528,7 @@ class ModelBase(ABC):
                 raise RuntimeError("Checkpoint folder was not found.")
             recent_checkpoint_dir = self.logger.CHKPT_DIRS["recent"]
             # NOTE: current_checkpoint is found in _find_load_valid_checkpoint
-            self._find_load_valid_checkpoint(recent_checkpoint_dir)
+            self._find_load_valid_checkpoint(recent_checkpoint_dir, model_only=model_only)
         else:
             self.current_checkpoint = None
             self.logger.info("Creating new model")
@@ -515,6 +541,7 @@ class ModelBase(ABC):
         smoke_test: bool = False,
         debug: bool = False,
         resume: bool = False,
+        model_only: bool = False,
     ):
         """
         Initializes the state of the trainer based on provided configuration and parameters.
@@ -529,6 +556,8 @@ class ModelBase(ABC):
             If True, disables logging and model directory creation, by default False.
         resume : bool, optional
             If True, tries to resume training from a checkpoint, by default False.
+        model_only : bool, optional
+            If True, only the model weights are loaded when resuming from a checkpoint, by default False.
         """
         self.run_config = run_config
         self.random_seed = self.run_config.random_seed
@@ -545,7 +574,7 @@ class ModelBase(ABC):
             self._init_logger(resume=resume, debug=debug)
         else:
             self.logger = butils.Dummy()
-        self._init_model_state(resume, smoke_test)
+        self._init_model_state(resume, smoke_test, model_only=model_only)
         self.run_config.assert_state(_run_config)
 
         if self.verbose == "tqdm" and not smoke_test:
@@ -559,7 +588,7 @@ class ModelBase(ABC):
         else:
             self.train_tqdm = butils.Dummy()
 
-    def _find_load_valid_checkpoint(self, chkpt_dir):
+    def _find_load_valid_checkpoint(self, chkpt_dir, model_only: bool = False):
         """
         Finds and loads the latest valid checkpoint from the given directory.
 
@@ -567,6 +596,8 @@ class ModelBase(ABC):
         ----------
         chkpt_dir : str
             The directory containing the checkpoints.
+        model_only : bool, optional
+            If True, only the model weights are loaded, by default False.
 
         Raises
         ------
@@ -575,14 +606,21 @@ class ModelBase(ABC):
         RuntimeError
             If a checkpoint is not found.
         """
+        # wait for the checkpoints that are written in the background.
+        self.logger.flush()
         latest_checkpoints = butils.get_latest_chkpts(chkpt_dir)
         current_checkpoint = None
         if len(latest_checkpoints) > 0:
             # Try to load first valid chkpt in case there was a crash and some checkpoint is unrecoverable
             for i, _checkpoint in enumerate(latest_checkpoints):
+                if not self.logger.verify_checkpoint(_checkpoint):
+                    self.logger.warn(
+                        f"Checkpoint {_checkpoint} does not match its saved size and hash. Skipping."
+                    )
+                    continue
                 try:
                     self.logger.info(f"Loading checkpoint {_checkpoint}")
-                    self._load_model(_checkpoint, model_only=False)
+                    self._load_model(_checkpoint, model_only=model_only)
                     current_checkpoint = _checkpoint
                     break
                 except Exception as e:
@@ -605,9 +643,10 @@ class ModelBase(ABC):
         Parameters
         ----------
         checkpoint_path : Path
-            The path to the checkpoint file containing the model and its state.
+            The path to the checkpoint file or sharded checkpoint directory containing the model and its state.
         model_only : bool, optional, default=False
-            If True, only the model's weights will be loaded, ignoring other state information.
+            If True, only the model's weights will be loaded, ignoring other state information. The
+            ``TRAINING_STATE_KEYS`` are then not read from a sharded or deduplicated checkpoint.
 
         Raises
         ------
@@ -620,7 +659,10 @@ class ModelBase(ABC):
                 "Can not load model on an unitialzed model state. Consider run init_experiment_state function first"
             )
 
-        save_dict = torch.load(checkpoint_path, map_location="cpu")
+        save_dict = futils.load_checkpoint(
+            checkpoint_path,
+            exclude_keys=self.TRAINING_STATE_KEYS if model_only else None,
+        )
 
         run_config = type(self.run_config)(**save_dict["run_config"])
         assert run_config.uid == self.run_config.uid
@@ -680,6 +722,19 @@ class ModelBase(ABC):
         """
         raise NotImplementedError
 
+    def evaluation_intermediates(self) -> dict[str, Callable] | None:
+        """
+        Create and return a dictionary of intermediate values that are shared by the evaluation functions
+        and computed once per evaluation, i.e. ``{"pred_class": lambda preds: preds.argmax(-1)}``.
+        Can be over-written by subclasses.
+
+        Returns
+        -------
+        dict[str, Callable] | None
+            A dictionary containing the functions that compute the intermediates as values and their names as keys.
+        """
+        return None
+
     def _load_stats(self, save_dict) -> None:
         """
         Loads the saved training and validation metrics from the save_dict and updates
@@ -691,6 +746,9 @@ class ModelBase(ABC):
             A dictionary containing the saved model state, metrics, and other necessary information.
         """
         metrics = copy.deepcopy(save_dict["metrics"])
+        # the step times are measured again for the resumed run.
+        for k in StepTimer.metric_names():
+            metrics.pop(k, None)
 
         for k in self.train_stats:
             if (
@@ -1,3 +1,4 @@
+import contextlib
 import copy
 import multiprocessing as mp
 import traceback
@@ -18,6 +19,7 @@ from ablator.main.model.main import EvaluationError, ModelBase, TrainPlateauErro
 from ablator.modules.metrics.main import LossDivergedError, TrainMetrics
 from ablator.modules.optimizer import OptimizerConfig
 from ablator.modules.scheduler import Scheduler, SchedulerConfig
+from ablator.utils.prefetch import BatchPrefetcher
 
 
 class ModelWrapper(ModelBase):
@@ -39,6 +41,8 @@ class ModelWrapper(ModelBase):
         The scheduler created from the scheduler config or checkpoint
     """
 
+    TRAINING_STATE_KEYS = ("optimizer", "scheduler", "scaler")
+
     def __init__(
         self,
         model_class: type[nn.Module],
@@ -59,6 +63,10 @@ class ModelWrapper(ModelBase):
         self.optimizer: Optimizer
         self.scaler: GradScaler
         self.scheduler: Scheduler | None
+        # Training metrics that have not been read back from the device yet.
+        self._pending_train_metrics: list[dict[str, ty.Any]] = []
+        # Number of batches whose gradients were accumulated since the last optimizer step.
+        self._accumulated_steps = 0
 
     @property
     def train_config(self) -> TrainConfig:
@@ -262,9 +270,8 @@ class ModelWrapper(ModelBase):
         This method is the implementation of the abstract method in the base class.
         """
         if model_only:
-            del save_dict["scheduler"]
-            del save_dict["optimizer"]
-            del save_dict["scaler"]
+            for k in self.TRAINING_STATE_KEYS:
+                save_dict.pop(k, None)
 
         self.create_model(
             save_dict,
@@ -290,7 +297,31 @@ class ModelWrapper(ModelBase):
         """
         if device is None:
             device = self.device
-        return butils.iter_to_device(data, device)
+        with self.step_timer.phase("to_device"):
+            return butils.iter_to_device(data, device)
+
+    def make_batch_iterator(self, dataloader: Iterable) -> ty.Iterator:
+        """
+        Creates the iterator over the batches of a dataloader used by ``train_loop`` and ``validation_loop``.
+
+        Parameters
+        ----------
+        dataloader: Iterable
+            The dataloader to iterate over.
+
+        Returns
+        -------
+        ty.Iterator
+            A ``BatchPrefetcher`` over the dataloader when ``run_config.prefetch_batches`` is larger
+            than 0, otherwise the iterator of the dataloader.
+        """
+        if self.run_config.prefetch_batches > 0:
+            return BatchPrefetcher(
+                dataloader,
+                device=self.device,
+                prefetch_batches=self.run_config.prefetch_batches,
+            )
+        return iter(dataloader)
 
     def model_step(
         self, model: nn.Module, batch: Iterable
@@ -337,6 +368,20 @@ class ModelWrapper(ModelBase):
             and self.current_iteration % step_interval == 0
         )
 
+    def _is_accumulating(self) -> bool:
+        """
+        Whether the gradients of the current batch should only be accumulated, without an optimizer step.
+
+        Returns
+        -------
+        bool
+            ``True`` when ``train_step`` has processed fewer than ``train_config.gradient_accumulation_steps``
+            batches since the last optimizer step.
+        """
+        return (
+            0 < self._accumulated_steps < self.train_config.gradient_accumulation_steps
+        )
+
     def _train_evaluation_step(self, smoke_test=False):
         is_best = False
         val_loss = None
@@ -424,6 +469,10 @@ class ModelWrapper(ModelBase):
         A single step for training.
         It also updates learning rate with scheduler.
 
+        When ``train_config.gradient_accumulation_steps`` is larger than 1, the gradients are accumulated
+        and the optimizer, the scheduler and ``current_iteration`` are only stepped on every
+        ``gradient_accumulation_steps`` batch.
+
         Parameters
         ----------
         batch: Iterable
@@ -440,22 +489,29 @@ class ModelWrapper(ModelBase):
         optimizer = self.optimizer
         scaler = self.scaler
         scheduler = self.scheduler
-        # Ensure no left-over grads are in the model's parameters from custom evaluation or what-not
-        optimizer.zero_grad()
-        outputs, loss = self._model_step(model=model, batch=batch)
-
-        loss_value = self.apply_loss(model, loss, optimizer, scaler, scheduler)
+        if self._accumulated_steps == 0:
+            # Ensure no left-over grads are in the model's parameters from custom evaluation or what-not
+            optimizer.zero_grad()
+        self._accumulated_steps += 1
+        with self.step_timer.phase("forward"):
+            outputs, loss = self._model_step(model=model, batch=batch)
+
+        with self.step_timer.phase("backward"):
+            loss_value = self.apply_loss(model, loss, optimizer, scaler, scheduler)
         aux_metrics = None
         if outputs is not None:
-            aux_metrics = self.aux_metrics(outputs)
-        if (
-            scheduler is not None
-            and getattr(scheduler, "step_when", None) == "epoch"
-            and self._is_step(self.epoch_len)
-        ):
-            scheduler.step()  # type: ignore
-        self._inc_iter()
-        self._update_learning_rate()
+            with self.step_timer.phase("metrics"):
+                aux_metrics = self.aux_metrics(outputs)
+        if not self._is_accumulating():
+            self._accumulated_steps = 0
+            if (
+                scheduler is not None
+                and getattr(scheduler, "step_when", None) == "epoch"
+                and self._is_step(self.epoch_len)
+            ):
+                scheduler.step()  # type: ignore
+            self._inc_iter()
+            self._update_learning_rate()
 
         train_metrics = {}
         if loss is not None:
@@ -556,6 +612,7 @@ class ModelWrapper(ModelBase):
         # Log step
         if self._is_step(self.log_itr):
             self.metrics.evaluate("train", reset=False)
+            self.metrics.update_static_metrics(self.step_timer.metrics())
             self.log_step()
 
     @ty.final
@@ -588,6 +645,78 @@ class ModelWrapper(ModelBase):
         """
         return self.epoch_len * self.epochs
 
+    @ty.final
+    def _flush_train_metrics(self):
+        """
+        Reads back the pending training metrics from the device in a single batch, updates the
+        moving averages in the order they were produced and checks the loss for divergence.
+
+        Raises
+        ------
+        LossDivergedError
+            If any of the pending loss values is not finite.
+        """
+        pending = self._pending_train_metrics
+        if len(pending) == 0:
+            return
+        self._pending_train_metrics = []
+        # the steps can return different metrics, i.e. from an overridden ``aux_metrics``, and a metric
+        # is only updated for the steps that returned it.
+        keys = list(dict.fromkeys(k for train_metrics in pending for k in train_metrics))
+        values: dict[str, dict[int, ty.Any]] = {}
+        for k in keys:
+            steps = [j for j, train_metrics in enumerate(pending) if k in train_metrics]
+            step_values = [pending[j][k] for j in steps]
+            if all(isinstance(v, torch.Tensor) for v in step_values):
+                # a single device-to-host copy for all the steps.
+                step_values = torch.stack(
+                    [v.detach().reshape(()) for v in step_values]
+                ).tolist()
+            values[k] = dict(zip(steps, step_values))
+        for j in range(len(pending)):
+            self.metrics.update_ma_metrics(
+                {k: v[j] for k, v in values.items() if j in v}, tag="train"
+            )
+        if "loss" in values:
+            for loss in values["loss"].values():
+                if not np.isfinite(loss):
+                    msg = f"Loss Diverged. Terminating. loss: {loss}"
+                    self.logger.error(msg)
+                    raise LossDivergedError(msg)
+
+    def _make_profiler(self) -> torch.profiler.profile | None:
+        """
+        Create the profiler of the training loop.
+
+        Returns
+        -------
+        torch.profiler.profile | None
+            The profiler, or ``None`` when ``run_config.profiler_config`` is not set or does not include
+            the trial.
+        """
+        profiler_config = self.run_config.profiler_config
+        if profiler_config is None or not profiler_config.should_profile(self.uid):
+            return None
+        trace_dir = None
+        if self.model_dir is not None:
+            # next to the tensorboard dashboard.
+            trace_dir = self.logger.summary_dir.joinpath("profiler")
+        return profiler_config.make_profiler(
+            trace_dir,
+            lambda table: self.logger.info(table, verbose=False),
+            cuda="cuda" in self.device,
+        )
+
+    @staticmethod
+    def _close_batch_iterator(iterator: ty.Iterator):
+        # releases the worker thread and the buffers of a ``BatchPrefetcher``.
+        if isinstance(iterator, BatchPrefetcher):
+            iterator.close()
+
+    def _reset_train_epoch(self):
+        self.metrics.reset("train")
+        self.train_tqdm.reset()
+
     def train_loop(self, smoke_test=False):
         """
         Train the model in many steps, evaluate the model and log the metrics for each iteration.
@@ -597,38 +726,93 @@ class ModelWrapper(ModelBase):
         ----------
         smoke_test: bool
             Whether to run a smoke test.
+
+        Notes
+        -----
+        When ``run_config.metrics_readback_itr`` is larger than 1, the training metrics are kept on the
+        device and read back every ``metrics_readback_itr`` iterations, or before logging and evaluation.
+        Loss divergence is then detected at read-back and not at the iteration it occurred.
+
+        When the length of the train dataloader is not a multiple of ``train_config.gradient_accumulation_steps``,
+        the leftover batches at the end of every epoch are skipped.
+
+        When ``run_config.step_timer`` is set, the time of every phase of the loop is recorded by
+        ``step_timer`` and a summary is written to the log when the loop ends. When ``run_config.profiler_config``
+        is set and includes the trial, the loop is profiled with ``torch.profiler``.
         """
         train_dataloader = self.train_dataloader
-        generator = iter(train_dataloader)
+        generator = self.make_batch_iterator(train_dataloader)
+        readback_itr = self.run_config.metrics_readback_itr
+        accumulation_steps = self.train_config.gradient_accumulation_steps
+        self._pending_train_metrics = []
+        self._accumulated_steps = 0
+        timer = self.step_timer
 
-        for i in range(self.current_iteration, self.total_steps):
-            self.model.train()
-            try:
-                batch = next(generator)
-            except StopIteration:
-                # restart the generator if the previous generator is exhausted.
-                generator = iter(train_dataloader)
-                batch = next(generator)
-                self.metrics.reset("train")
-                self.train_tqdm.reset()
-            outputs, train_metrics = self.train_step(batch)
-            if outputs is not None:
-                self.metrics.append_batch(**outputs, tag="train")
-            self.metrics.update_ma_metrics(train_metrics, tag="train")
-
-            if "loss" in train_metrics and not np.isfinite(train_metrics["loss"]):
-                msg = f"Loss Diverged. Terminating. loss: {train_metrics['loss']}"
-                self.logger.error(msg)
-                raise LossDivergedError(msg)
-
-            if not smoke_test:
-                self.update_status()
-                self.log()
-                self.eval()
-
-            if smoke_test and i > self.epoch_len * 0.01:
-                self.eval(smoke_test=True)
-                break
+        # the number of accumulated steps taken from ``generator``.
+        epoch_steps = 0
+
+        profiler = None if smoke_test else self._make_profiler()
+        try:
+            with profiler if profiler is not None else contextlib.nullcontext():
+                for i in range(self.current_iteration, self.total_steps):
+                    self.model.train()
+                    if epoch_steps == self.epoch_len:
+                        # the leftover batches that do not fill an accumulated step are skipped, such that
+                        # an optimizer step does not mix the batches of two epochs.
+                        self._close_batch_iterator(generator)
+                        generator = self.make_batch_iterator(train_dataloader)
+                        epoch_steps = 0
+                        self._reset_train_epoch()
+                    epoch_ended = False
+                    for step in range(accumulation_steps):
+                        with timer.phase("data"):
+                            try:
+                                batch = next(generator)
+                            except StopIteration:
+                                # restart the generator if the dataloader is shorter than its length.
+                                self._close_batch_iterator(generator)
+                                generator = self.make_batch_iterator(train_dataloader)
+                                epoch_steps = 0
+                                batch = next(generator)
+                                # the metrics are reset at the boundary of an accumulated step.
+                                epoch_ended = step > 0
+                                if step == 0:
+                                    self._reset_train_epoch()
+                        outputs, train_metrics = self.train_step(batch)
+                        with timer.phase("metrics"):
+                            if outputs is not None:
+                                self.metrics.append_batch(**outputs, tag="train")
+                            self._pending_train_metrics.append(train_metrics)
+                    epoch_steps += 1
+                    if epoch_ended:
+                        self._reset_train_epoch()
+                    if (
+                        len(self._pending_train_metrics) >= readback_itr
+                        or self._is_step(self.log_itr)
+                        or self._is_step(self.eval_itr)
+                        or smoke_test
+                        or i == self.total_steps - 1
+                    ):
+                        with timer.phase("metrics"):
+                            self._flush_train_metrics()
+
+                    if not smoke_test:
+                        with timer.phase("status"):
+                            self.update_status()
+                        with timer.phase("log"):
+                            self.log()
+                        with timer.phase("eval"):
+                            self.eval()
+
+                    if smoke_test and i > self.epoch_len * 0.01:
+                        self.eval(smoke_test=True)
+                        break
+                    if profiler is not None:
+                        profiler.step()
+        finally:
+            self._close_batch_iterator(generator)
+        if timer.enabled:
+            self.logger.info(f"Step times:\n{timer.summary()}", verbose=False)
         return self.metrics
 
     @ty.final
@@ -664,11 +848,21 @@ class ModelWrapper(ModelBase):
         )
 
         try:
-            return self.train_loop(smoke_test)
+            metrics = self.train_loop(smoke_test)
         except KeyboardInterrupt:
             self._checkpoint()
-
-        return self.metrics
+            metrics = self.metrics
+        except BaseException:
+            # the error of a checkpoint written in the background must not replace the error of
+            # training, i.e. ``LossDivergedError``, which is used to classify the trial.
+            try:
+                self.logger.flush()
+            except Exception:  # pylint: disable=broad-exception-caught
+                self.logger.error(traceback.format_exc())
+            raise
+        # wait for the checkpoints that are written in the background.
+        self.logger.flush()
+        return metrics
 
     @ty.final
     def evaluate(
@@ -683,7 +877,7 @@ class ModelWrapper(ModelBase):
         run_config: RunConfig
             The run config to use for evaluation.
         """
-        self._init_state(run_config, resume=True)
+        self._init_state(run_config, resume=True, model_only=True)
         self.logger.info(f"Evaluating {self.current_checkpoint}")
 
         msg = self.metrics.to_dict()
@@ -702,6 +896,8 @@ class ModelWrapper(ModelBase):
                     evaluation_functions=self.evaluation_functions(),
                     tags=[tag],
                     moving_aux_metrics=["loss"] + getattr(self, "aux_metric_names", []),
+                    on_device=self.run_config.metrics_on_device,
+                    evaluation_intermediates=self.evaluation_intermediates(),
                 )
                 self._validation_loop(
                     model=self.model,
@@ -722,9 +918,11 @@ class ModelWrapper(ModelBase):
         optimizer: Optimizer,
         scaler: torch.cuda.amp.GradScaler,
         scheduler: ty.Optional[Scheduler],
-    ) -> float | None:
+    ) -> float | torch.Tensor | None:
         """
         Calculate the loss and apply the gradients, call ``optimizer.step()`` and ``scheduler.step()``.
+        When accumulating gradients, the loss is scaled by ``1 / gradient_accumulation_steps`` and
+        the optimizer and the scheduler are only stepped on the last accumulated batch.
 
         Parameters
         ----------
@@ -741,19 +939,29 @@ class ModelWrapper(ModelBase):
 
         Returns
         -------
-        float | None
-            The loss value.
+        float | torch.Tensor | None
+            The loss value. It is a detached device tensor when ``run_config.metrics_readback_itr > 1``
+            to avoid synchronizing with the device.
         """
         if loss is not None:
             loss = torch.mean(loss)
+            accumulation_steps = self.train_config.gradient_accumulation_steps
+            # the accumulated gradients are averaged over the accumulated batches
+            scaled_loss = loss / accumulation_steps if accumulation_steps > 1 else loss
             if self.amp:
-                scaler.scale(loss).backward()
+                scaler.scale(scaled_loss).backward()
             else:
-                loss.backward()
-            loss_value = loss.item()
+                scaled_loss.backward()
+            if self.run_config.metrics_readback_itr > 1:
+                loss_value = loss.detach()
+            else:
+                loss_value = loss.item()
         else:
             loss_value = None
 
+        if self._is_accumulating():
+            return loss_value
+
         if self.amp:
             scaler.unscale_(optimizer)
             torch.nn.utils.clip_grad_norm_(model.parameters(), 2)
@@ -831,24 +1039,28 @@ class ModelWrapper(ModelBase):
             self.logger.warn(
                 "Called `validation_loop` without setting the model to evaluation mode. i.e. `model.eval()`"
             )
-        for i, batch in enumerate(dataloader):
-            with torch.no_grad():
-                outputs, loss = self._model_step(model=model, batch=batch)
-                val_metrics = {}
-                if outputs is not None:
-                    aux_metrics = self.aux_metrics(outputs)
-                    metrics.append_batch(tag=tag, **outputs)
-                    if aux_metrics is not None:
-                        assert (
-                            "loss" not in aux_metrics
-                        ), "Invalid return key `loss` from `aux_metrics`"
-                        val_metrics.update(aux_metrics)
-                if loss is not None:
-                    val_metrics["loss"] = torch.mean(loss).item()
-
-                metrics.update_ma_metrics(val_metrics, tag=tag)
-                if i > cutoff_itr or smoke_test:
-                    break
+        generator = self.make_batch_iterator(dataloader)
+        try:
+            for i, batch in enumerate(generator):
+                with torch.no_grad():
+                    outputs, loss = self._model_step(model=model, batch=batch)
+                    val_metrics = {}
+                    if outputs is not None:
+                        aux_metrics = self.aux_metrics(outputs)
+                        metrics.append_batch(tag=tag, **outputs)
+                        if aux_metrics is not None:
+                            assert (
+                                "loss" not in aux_metrics
+                            ), "Invalid return key `loss` from `aux_metrics`"
+                            val_metrics.update(aux_metrics)
+                    if loss is not None:
+                        val_metrics["loss"] = torch.mean(loss).item()
+
+                    metrics.update_ma_metrics(val_metrics, tag=tag)
+                    if i > cutoff_itr or smoke_test:
+                        break
+        finally:
+            self._close_batch_iterator(generator)
         metrics.evaluate(tag)
         metrics_dict = {
             k: v for k, v in metrics.to_dict().items() if k.startswith(f"{tag}_")
@@ -12,6 +12,7 @@ from pathlib import Path
 import builtins
 
 import numpy as np
+import pandas as pd
 import ray
 import torch
 
@@ -205,6 +206,12 @@ def train_main_remote(
     except builtins.Exception as e:
         return handle_exception(e)
     finally:
+        # writes the buffered results and stops the background writers of the trial before syncing.
+        if getattr(model, "logger", None) is not None:
+            try:
+                model.logger.close()
+            except builtins.Exception:
+                mp_logger.error(traceback.format_exc())
         if model.model_dir is not None:
             kwargs = parse_rsync_paths(model.model_dir, root_dir)
             if run_config.gcp_config is not None:
@@ -217,6 +224,50 @@ def train_main_remote(
                 run_config.remote_config.rsync_up(
                     Path(kwargs["local_path"]), str(kwargs["remote_path"])
                 )
+        # the remote copy of the logger is not closed when the worker exits.
+        mp_logger.flush()
+
+
+def evaluate_main_remote(
+    model: ModelWrapper,
+    run_config: ParallelConfig,
+    mp_logger: FileLogger,
+) -> tuple[str, dict[str, float] | None]:
+    """
+    The evaluation job that will be executed remotely at a ray node. The model of a completed trial is
+    loaded from its latest checkpoint and evaluated on the test and validation sets.
+
+    Parameters
+    ----------
+    model : ModelWrapper
+        The ModelWrapper that is used to evaluate the model.
+    run_config : ParallelConfig
+        Runtime configuration of the trial.
+    mp_logger : FileLogger
+        The file logger that's used to log the evaluation progress.
+
+    Returns
+    -------
+    str
+        The uid of the trial.
+    dict[str, float], None
+        The evaluation metrics of every tag, i.e. ``val_loss`` and ``test_loss``, or ``None``
+        if an exception was raised during evaluation.
+    """
+    try:
+        tag_metrics = model.evaluate(run_config)
+        metrics: dict[str, float] = {}
+        for tag_metric in tag_metrics.values():
+            metrics.update(tag_metric.to_dict())
+        mp_logger.info(f"Finished evaluating - {run_config.uid}")
+        return run_config.uid, metrics
+    except builtins.Exception:
+        exception_str = traceback.format_exc()
+        if hasattr(model, "logger"):
+            model.logger.error(exception_str)
+        mp_logger.error(f"Error Occured during evaluation {run_config.uid}")
+        traceback.print_exc()
+        return run_config.uid, None
 
 
 class ParallelTrainer(ProtoTrainer):
@@ -282,8 +333,12 @@ class ParallelTrainer(ProtoTrainer):
         self.run_config = run_config
         self.device = butils.parse_device(self.run_config.device)
         self.experiment_dir: Path = Path(run_config.experiment_dir)
-        self.logger = FileLogger(path=self.experiment_dir / "mp.log")
+        self.logger = FileLogger(
+            path=self.experiment_dir / "mp.log", buffered=run_config.buffered_logs
+        )
         self.experiment_state: ExperimentState
+        # the uid of the trial of every pending remote.
+        self._remote_uids: dict[ty.Any, str] = {}
         self.total_trials = self.run_config.total_trials
         self.gpu: float = 0.0
         self.cpu: float = self._make_cpu()
@@ -352,39 +407,51 @@ class ParallelTrainer(ProtoTrainer):
             max_retries=max_error_retries,
         )(train_main_remote)
 
+    def _make_remote_eval_fn(self) -> ty.Any:
+        return ray.remote(
+            num_gpus=self.gpu,
+            num_cpus=self.cpu,
+            max_calls=1,
+        )(evaluate_main_remote)
+
+    def _put_logger(self) -> ty.Any:
+        # the copy of the logger is only used to be sent to the remotes.
+        logger = copy.deepcopy(self.logger)
+        logger_ref = ray.put(logger)
+        logger.close()
+        return logger_ref
+
     def _make_remotes(
         self,
         trials: list[ParallelConfig],
     ):
         model_obj = ray.put(copy.deepcopy(self.wrapper))
-        mp_logger = ray.put(copy.deepcopy(self.logger))
+        mp_logger = self._put_logger()
         remotes = []
+        running_states: list[tuple[str, dict[str, float] | None, TrialState]] = []
+        resumed_uids = {cfg.uid for cfg in self.experiment_state.resumed_trials}
         for run_config in trials:
             if (remote_fn := self._make_remote_fn()) is not None:
                 diffs = self.run_config.diff_str(run_config)
                 diffs = "\n\t".join(diffs)
-                resume = run_config.uid in [
-                    cfg.uid for cfg in self.experiment_state.resumed_trials
-                ]
+                resume = run_config.uid in resumed_uids
                 action = "Scheduling" if resume is False else "Resuming"
                 msg = f"{action} uid: {run_config.uid}\nParameters: \n\t{diffs}\n-----"
                 self.logger.info(msg)
-                self.experiment_state.update_trial_state(
-                    run_config.uid, None, TrialState.RUNNING
+                running_states.append((run_config.uid, None, TrialState.RUNNING))
+                remote = remote_fn.remote(
+                    model_obj,
+                    copy.deepcopy(run_config),
+                    mp_logger,
+                    self.experiment_dir,
+                    True,
+                    None,
+                    resume,
+                    True,
                 )
-                remotes.append(
-                    remote_fn.remote(
-                        model_obj,
-                        copy.deepcopy(run_config),
-                        mp_logger,
-                        self.experiment_dir,
-                        True,
-                        None,
-                        resume,
-                        True,
-                    )
-                )
-
+                self._remote_uids[remote] = run_config.uid
+                remotes.append(remote)
+        self.experiment_state.update_trial_states(running_states)
         return remotes
 
     def _init_state(
@@ -478,16 +545,34 @@ class ParallelTrainer(ProtoTrainer):
         Synchronize content of current experiment directory to Google cloud storage and
         other remote servers.
         """
+        self.logger.flush()
         self._rsync_gcp_up()
         self._rsync_remote_up()
 
-    def evaluate(self):
+    def evaluate(self, concurrent_evaluations: int | None = None) -> pd.DataFrame:
         """
         Evaluate model performance in trials that are completed, using evaluation functions defined
-        in the model wrapper. Evaluation results will be logged to the console and log files in the
-        experiment directory. This method also synchronizes the experiment directory to Google cloud
-        storage and remote servers.
+        in the model wrapper. Every trial is evaluated by a ray job with the same resources as a training trial,
+        and at most ``concurrent_evaluations`` trials are evaluated at the same time. The results are
+        aggregated into a single table that is written to ``evaluation_results.csv`` in the experiment directory.
+        Evaluation results will also be logged to the console and log files in the experiment directory.
+        This method also synchronizes the experiment directory to Google cloud storage and remote servers.
+
+        Parameters
+        ----------
+        concurrent_evaluations : int, None, default=None
+            The maximum number of trials evaluated at the same time. Defaults to ``concurrent_trials``
+            of the run configuration.
+
+        Returns
+        -------
+        pd.DataFrame
+            The evaluation metrics with one row per trial, indexed by the trial uid. The metrics of
+            trials that failed to evaluate are missing values.
         """
+        if concurrent_evaluations is None:
+            concurrent_evaluations = self.run_config.concurrent_trials
+        assert concurrent_evaluations > 0, "Invalid concurrent_evaluations count"
         eval_configs = []
         trial_uids = self.experiment_state.complete_trials
         for config in trial_uids:
@@ -496,10 +581,44 @@ class ParallelTrainer(ProtoTrainer):
             )
             eval_configs.append(model_config)
 
-        # TODO evaluate in parallel
-        for model_config in eval_configs:
-            self.wrapper.evaluate(model_config)
+        self.logger.info(f"Evaluating {len(eval_configs)} trials.")
+        remote_fn = self._make_remote_eval_fn()
+        model_obj = ray.put(copy.deepcopy(self.wrapper))
+        mp_logger = self._put_logger()
+        results: dict[str, dict[str, float] | None] = {}
+        futures: list[ty.Any] = []
+        future_uids: dict[ty.Any, str] = {}
+        while len(eval_configs) > 0 or len(futures) > 0:
+            while len(eval_configs) > 0 and len(futures) < concurrent_evaluations:
+                eval_config = eval_configs.pop(0)
+                future = remote_fn.remote(model_obj, eval_config, mp_logger)
+                future_uids[future] = eval_config.uid
+                futures.append(future)
+            done_ids, futures = ray.wait(futures, num_returns=1, timeout=60)
+            if len(done_ids) == 0:
+                self.logger.info(
+                    f"Waiting for {len(futures)} trials to finish evaluating."
+                )
+                continue
+            for done_id in done_ids:
+                uid = future_uids.pop(done_id)
+                try:
+                    uid, metrics = ray.get(done_id)
+                except builtins.Exception:
+                    # i.e. the worker of the evaluation was killed
+                    self.logger.error(traceback.format_exc())
+                    metrics = None
+                if metrics is None:
+                    self.logger.error(f"Could not evaluate {uid}.")
+                results[uid] = metrics
+
+        df = pd.DataFrame.from_dict(
+            {uid: metrics or {} for uid, metrics in results.items()}, orient="index"
+        )
+        df.index.name = "uid"
+        df.to_csv(self.experiment_dir.joinpath("evaluation_results.csv"))
         self.sync_up()
+        return df
 
     def launch(  # type: ignore
         self,
@@ -552,26 +671,41 @@ class ParallelTrainer(ProtoTrainer):
         config: ParallelConfig
         metrics: dict[str, float] | None
         trial_state: TrialState
-        n_trials_to_sample = 1
         while len(futures) > 0:
             try:
-                done_id, futures = ray.wait(
-                    futures, num_returns=n_trials_to_sample, timeout=60
-                )
-                if len(done_id) > 0:
-                    config, metrics, trial_state = ray.get(done_id[0])
+                done_ids, futures = ray.wait(futures, num_returns=1, timeout=60)
+                if len(done_ids) == 0:
+                    self.logger.info(
+                        f"Waiting for {len(futures)} trials to finish running."
+                    )
+                    continue
+                if len(futures) > 0:
+                    # drain the rest of the trials that have finished since the last wake-up
+                    ready_ids, futures = ray.wait(
+                        futures, num_returns=len(futures), timeout=0
+                    )
+                    done_ids += ready_ids
+                trial_states = []
+                for done_id in done_ids:
+                    uid = self._remote_uids.pop(done_id)
+                    try:
+                        config, metrics, trial_state = ray.get(done_id)
+                    except builtins.Exception:
+                        # i.e. the worker of the trial was killed. The results of the other
+                        # finished trials are still recorded.
+                        self.logger.error(traceback.format_exc())
+                        self.logger.error(f"Trial {uid} failed.")
+                        trial_states.append((uid, None, TrialState.FAIL))
+                        continue
                     metrics = parse_metrics(
                         list(self.run_config.optim_metrics.keys()), metrics
                     )
-                    self.experiment_state.update_trial_state(
-                        config.uid, metrics, trial_state
-                    )
+                    trial_states.append((config.uid, metrics, trial_state))
+                self.experiment_state.update_trial_states(trial_states)
+                n_trials_to_sample = self.run_config.concurrent_trials - len(futures)
+                if n_trials_to_sample > 0:
                     trials = self.experiment_state.sample_trials(n_trials_to_sample)
                     futures += self.__make_remotes_from_trials(trials)
-                else:
-                    self.logger.info(
-                        f"Waiting for {len(futures)} trials to finish running."
-                    )
             except builtins.Exception as e:
                 # NOTE we do not know which trial caused the error, only
                 # the pending trials (which we can assume one is the errored)
@@ -583,6 +717,7 @@ class ParallelTrainer(ProtoTrainer):
                     self.logger.warn(
                         f"There are {len(pending_trials)} unfinished trials. with ids: {pending_trials}"
                     )
+                    self.experiment_state.close()
                     sys.exit(0)
 
         complete_ids = [c.uid for c in self.experiment_state.complete_trials]
@@ -598,4 +733,6 @@ class ParallelTrainer(ProtoTrainer):
             self.logger.error(
                 f"There are {len(errored)} unfinished trials. with ids: {errored_ids}"
             )
+        # the write-ahead log is merged into the databases before they are synchronized.
+        self.experiment_state.close()
         self.sync_up()
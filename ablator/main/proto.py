@@ -78,7 +78,12 @@ class ProtoTrainer:
             Metrics returned after training.
         """
         self._init_state()
-        metrics = self.wrapper.train(run_config=self.run_config, debug=debug)
+        try:
+            metrics = self.wrapper.train(run_config=self.run_config, debug=debug)
+        finally:
+            # writes the buffered results and stops the background writers of the trial.
+            if getattr(self.wrapper, "logger", None) is not None:
+                self.wrapper.logger.close()
         self.sync()
         return metrics
 
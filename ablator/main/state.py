@@ -1,15 +1,20 @@
 import copy
 import enum
+import pickle
+import sqlite3
 import typing as ty
 from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
 import builtins
 
 import numpy as np
 import optuna
 from optuna.trial import TrialState as OptunaTrialState
-from sqlalchemy import Integer, PickleType, String, create_engine, select
+from sqlalchemy import Integer, PickleType, String, create_engine, event, select
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+from sqlalchemy.types import TypeDecorator
 
 import ablator.utils.base as butils
 from ablator.main.configs import (
@@ -234,20 +239,143 @@ def sample_trial_params(
     return parameter
 
 
+def enable_sqlite_wal(engine: Engine) -> Engine:
+    """
+    Use write-ahead logging for every connection of an SQLite ``engine``, such that readers
+    do not block the writer and commits do not wait to sync the database file. Connections for
+    which write-ahead logging can not be enabled, e.g. on network file systems, keep the default journal.
+
+    Parameters
+    ----------
+    engine : Engine
+        The SQLite engine.
+
+    Returns
+    -------
+    Engine
+        The same engine.
+    """
+
+    def set_pragma(dbapi_connection, connection_record):  # pylint: disable=unused-argument
+        cursor = dbapi_connection.cursor()
+        try:
+            journal_mode = cursor.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        except sqlite3.OperationalError:
+            journal_mode = None
+        # relaxed syncing is only safe with write-ahead logging.
+        if journal_mode == "wal":
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    event.listen(engine, "connect", set_pragma)
+    # connections opened before the listener was registered are re-opened.
+    engine.dispose()
+    return engine
+
+
+class TrialStateType(TypeDecorator):
+    """
+    Stores a ``TrialState`` as an integer. States of databases created by earlier versions
+    are stored pickled and are decoded when read.
+    """
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return int(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, bytes):
+            value = pickle.loads(value)
+        return TrialState(value)
+
+
 class Trial(Base):
     __tablename__ = "trial"
     id: Mapped[int] = mapped_column(primary_key=True)
-    config_uid: Mapped[str] = mapped_column(String(30))
+    config_uid: Mapped[str] = mapped_column(String(30), index=True)
     metrics: Mapped[PickleType] = mapped_column(PickleType)
     config_param: Mapped[PickleType] = mapped_column(PickleType)
     optuna_trial_num: Mapped[str] = mapped_column(Integer)
-    state: Mapped[PickleType] = mapped_column(PickleType, default=TrialState.WAITING)
+    state: Mapped[TrialState] = mapped_column(
+        TrialStateType, default=TrialState.WAITING, index=True
+    )
     runtime_errors: Mapped[int] = mapped_column(Integer, default=0)
 
     def __repr__(self) -> str:
         return f"Trial(id={self.id!r}, config_uid={self.config_uid!r}, fullname={self.config_param!r})"
 
 
+class TrialRecord:
+    """
+    The in-memory copy of a row of the ``Trial`` table, used by ``ExperimentState`` to look up trials
+    without querying the database.
+
+    Attributes
+    ----------
+    id : int
+        The id of the row in the ``Trial`` table.
+    config_uid : str
+        The uid of the trial configuration, or ``'none'`` for trials pruned during sampling.
+    config_param : dict[str, ty.Any]
+        The configuration dictionary of the trial.
+    optuna_trial_num : int
+        The optuna trial number.
+    state : TrialState
+        The state of the trial.
+    """
+
+    __slots__ = (
+        "id",
+        "config_uid",
+        "config_param",
+        "optuna_trial_num",
+        "state",
+        "_config",
+    )
+
+    def __init__(
+        self,
+        id: int,  # pylint: disable=redefined-builtin
+        config_uid: str,
+        config_param: dict[str, ty.Any],
+        optuna_trial_num: int,
+        state: TrialState,
+        config: ParallelConfig | None = None,
+    ) -> None:
+        self.id = id
+        self.config_uid = config_uid
+        self.config_param = config_param
+        self.optuna_trial_num = optuna_trial_num
+        self.state = state
+        self._config = config
+
+    def config(self, config_class: type[ParallelConfig]) -> ParallelConfig:
+        """
+        The configuration of the trial. It is parsed once and cached.
+
+        Parameters
+        ----------
+        config_class : type[ParallelConfig]
+            The configuration class of the experiment.
+
+        Returns
+        -------
+        ParallelConfig
+            The configuration of the trial.
+        """
+        if self._config is None:
+            # NOTE the parameters were stored from a valid configuration.
+            self._config = config_class.from_trusted_dict(dict(self.config_param))
+            assert self._config.uid == self.config_uid
+        return self._config
+
+
 class OptunaState:
     """
     A class to store the state of the Optuna study.
@@ -260,6 +388,8 @@ class OptunaState:
         The search space containing the parameters to sample from.
     optuna_study : optuna.study.Study
         The Optuna study object.
+    rdb_storage : optuna.storages.RDBStorage, None
+        The storage of the study when it is an SQLite database.
     """
 
     def __init__(
@@ -269,6 +399,7 @@ class OptunaState:
         optim_metrics: dict[str, Optim],
         search_algo,
         search_space: dict[str, SearchSpace],
+        sqlite_wal: bool = False,
     ) -> None:
         """
         Initialize the Optuna state.
@@ -285,6 +416,8 @@ class OptunaState:
             The search algorithm to use (``'random'`` or ``'tpe'``).
         search_space : dict[str, SearchSpace]
             A dictionary of parameter names and their corresponding SearchSpace instances.
+        sqlite_wal : bool, default=False
+            Whether to use write-ahead logging when ``storage`` is an SQLite database.
 
         Raises
         ------
@@ -319,6 +452,12 @@ class OptunaState:
             for k in optim_metrics
         ]
 
+        self.rdb_storage: optuna.storages.RDBStorage | None = None
+        if storage.startswith("sqlite"):
+            self.rdb_storage = optuna.storages.RDBStorage(storage)
+            if sqlite_wal:
+                enable_sqlite_wal(self.rdb_storage.engine)
+            storage = self.rdb_storage  # type: ignore[assignment]
         self.optuna_study = optuna.create_study(
             study_name=study_name,
             storage=storage,
@@ -327,6 +466,13 @@ class OptunaState:
             sampler=sampler,
         )
 
+    def close(self):
+        """
+        Close the connections to the Optuna database.
+        """
+        if self.rdb_storage is not None:
+            self.rdb_storage.engine.dispose()
+
     def _optuna_optim_values(self, metrics: dict[str, float]) -> list[float]:
         """
         Convert the input metrics dictionary to a list of metric values.
@@ -464,14 +610,62 @@ class ExperimentState:
             optim_metrics=config.optim_metrics,
             search_algo=config.search_algo,
             search_space=config.search_space,
+            sqlite_wal=config.sqlite_wal,
         )
         experiment_state_db = experiment_dir.joinpath(f"{study_name}_state.db")
 
         self.engine = create_engine(f"sqlite:///{experiment_state_db}", echo=False)
+        if config.sqlite_wal:
+            enable_sqlite_wal(self.engine)
         Trial.metadata.create_all(self.engine)
+        # A single session is used for the lifetime of the experiment state. Nested
+        # transactions are committed once, by the outermost ``_transaction``.
+        self._session = Session(self.engine, expire_on_commit=False)
+        self._transaction_depth = 0
+
+        # In-memory index of the Trial table, by row id, by uid and by state.
+        self._trial_records: dict[int, TrialRecord] = {}
+        self._uid_records: dict[str, TrialRecord] = {}
+        self._state_records: dict[TrialState, dict[int, TrialRecord]] = {
+            state: {} for state in TrialState
+        }
+        self._load_trial_index()
 
         self._init_trials(resume=resume)
 
+    def close(self):
+        """
+        Close the connections to the Experiment state and Optuna databases.
+        """
+        self._session.close()
+        self.engine.dispose()
+        self.optuna_state.close()
+
+    @contextmanager
+    def _transaction(self) -> ty.Iterator[Session]:
+        """
+        A transaction of the Experiment state database. The writes of nested transactions are
+        committed together when the outermost transaction exits, or rolled back together
+        if an exception is raised.
+
+        Yields
+        ------
+        Session
+            The session of the Experiment state database.
+        """
+        self._transaction_depth += 1
+        try:
+            yield self._session
+            if self._transaction_depth == 1:
+                self._session.commit()
+        except builtins.BaseException:
+            if self._transaction_depth == 1:
+                self._session.rollback()
+                self._load_trial_index()
+            raise
+        finally:
+            self._transaction_depth -= 1
+
     @staticmethod
     def search_space_dot_path(trial: ParallelConfig) -> dict[str, ty.Any]:
         """
@@ -634,7 +828,11 @@ class ExperimentState:
             return False
         trial_config = type(self.config)(**trial_kwargs)
         self.__append_trial_internal(
-            trial_config.uid, trial_kwargs, optuna_trial_num, trial_state
+            trial_config.uid,
+            trial_kwargs,
+            optuna_trial_num,
+            trial_state,
+            trial_config,
         )
         return True
 
@@ -673,15 +871,27 @@ class ExperimentState:
         sampled_trials: list[ParallelConfig] = (
             [] if prev_trials is None else prev_trials
         )
+        with self._transaction():
+            self.__sample_trials_loop(
+                n_trials, sampled_trials, error_upper_bound, ignore_errors
+            )
+        return sampled_trials
+
+    def __sample_trials_loop(
+        self,
+        n_trials: int,
+        sampled_trials: list[ParallelConfig],
+        error_upper_bound: int,
+        ignore_errors: bool,
+    ):
         while len(sampled_trials) < n_trials:
-            if (
-                len(self.pruned_errored_trials) + len(self.pruned_duplicate_trials)
-                > error_upper_bound
-            ):
+            n_duplicate = len(self._state_records[TrialState.PRUNED_DUPLICATE])
+            n_invalid = len(self._state_records[TrialState.PRUNED_INVALID])
+            if n_duplicate + n_invalid > error_upper_bound:
                 raise RuntimeError(
                     f"Reached maximum limit of misconfigured trials. {error_upper_bound}\n"
-                    f"Found {len(self.pruned_duplicate_trials)} duplicate and "
-                    f"{len(self.pruned_errored_trials)} invalid trials."
+                    f"Found {n_duplicate} duplicate and "
+                    f"{n_invalid} invalid trials."
                 )
 
             trial_num, parameter = self.optuna_state.sample_trial()
@@ -693,7 +903,7 @@ class ExperimentState:
 
             try:
                 trial_config = type(self.config)(**trial_kwargs)
-                if trial_config.uid in self.all_trials_uid:
+                if self._is_trial(trial_config.uid):
                     trial_state = TrialState.PRUNED_DUPLICATE
             except builtins.Exception as e:
                 if ignore_errors:
@@ -704,7 +914,6 @@ class ExperimentState:
 
             if self.__append_trial(trial_kwargs, trial_num, trial_state):
                 sampled_trials.append(trial_config)
-        return sampled_trials
 
     def update_trial_state(
         self,
@@ -728,14 +937,38 @@ class ExperimentState:
         --------
         >>> experiment.update_trial_state("fje_2211", {"loss": 0.1}, TrialState.COMPLETED)
         """
-        if state == TrialState.RECOVERABLE_ERROR:
-            self._inc_error_count(config_uid, state)
-            return
+        self.update_trial_states([(config_uid, metrics, state)])
+
+    def update_trial_states(
+        self,
+        trial_states: list[tuple[str, dict[str, float] | None, TrialState]],
+    ) -> None:
+        """
+        Update the state of several trials in both the Experiment database and tell Optuna.
+        The Experiment database is updated in a single transaction.
+
+        Parameters
+        ----------
+        trial_states : list[tuple[str, dict[str, float] | None, TrialState]]
+            The uid, the metrics and the state of every trial to update.
 
-        self._update_internal_trial_state(config_uid, metrics, state)
-        # NOTE currently it is error prone to update the optuna state
-        trial_num = self._get_optuna_trial_num(config_uid)
-        self.optuna_state.update_trial(trial_num, metrics, state)
+        Examples
+        --------
+        >>> experiment.update_trial_states(
+        ...     [("fje_2211", {"loss": 0.1}, TrialState.COMPLETE), ("abc_1234", None, TrialState.FAIL)]
+        ... )
+        """
+        with self._transaction():
+            internal_states = []
+            for config_uid, metrics, state in trial_states:
+                if state == TrialState.RECOVERABLE_ERROR:
+                    self._inc_error_count(config_uid, state)
+                else:
+                    internal_states.append((config_uid, metrics, state))
+            # NOTE currently it is error prone to update the optuna state
+            trial_nums = self._update_internal_trial_states(internal_states)
+            for (_, metrics, state), trial_num in zip(internal_states, trial_nums):
+                self.optuna_state.update_trial(trial_num, metrics, state)
 
     def _get_optuna_trial_num(self, config_uid: str) -> int:
         """
@@ -751,65 +984,64 @@ class ExperimentState:
         int
             The optuna trial number.
         """
-        with Session(self.engine) as session:
-            stmt = select(Trial).where(Trial.config_uid == config_uid)
-            res = session.scalar(stmt)
-        if res is not None:
-            return int(res.optuna_trial_num)
-        raise ValueError(f"No trial found with config_uid: {config_uid}")
+        return self._get_record(config_uid).optuna_trial_num
 
-    def _update_internal_trial_state(
-        self, config_uid: str, metrics: dict[str, float] | None, state: TrialState
-    ):
+    def _update_internal_trial_states(
+        self,
+        trial_states: list[tuple[str, dict[str, float] | None, TrialState]],
+    ) -> list[int]:
         """
-        Update the state of a trial in the Experiment state database.
+        Update the state of several trials in the Experiment state database in a single transaction.
 
         Parameters
         ----------
-        config_uid : str
-            The uid of the trial to update.
-        metrics : dict[str, float] | None
-            The metrics of the trial.
-        state : TrialState
-            The state of the trial.
+        trial_states : list[tuple[str, dict[str, float] | None, TrialState]]
+            The uid, the metrics and the state of every trial to update.
 
         Returns
         -------
-        bool
-            True if the update was successful.
+        list[int]
+            The optuna trial number of every updated trial.
         """
-        if metrics is not None:
-            internal_metrics = parse_metrics(self.config.optim_metrics, metrics)
-        else:
-            internal_metrics = None
-
-        with Session(self.engine) as session:
-            stmt = select(Trial).where(Trial.config_uid == config_uid)
-            res = session.execute(stmt).scalar_one()
-            res.metrics.append(internal_metrics)
-            res.state = state  # type: ignore # TODO fix this
-            session.commit()
-            session.flush()
-
-        return True
+        internal_states = []
+        for config_uid, metrics, state in trial_states:
+            if metrics is not None:
+                internal_metrics = parse_metrics(self.config.optim_metrics, metrics)
+            else:
+                internal_metrics = None
+            internal_states.append((config_uid, internal_metrics, state))
+        if len(internal_states) == 0:
+            return []
+
+        trial_nums = []
+        with self._transaction() as session:
+            for config_uid, internal_metrics, state in internal_states:
+                record = self._get_record(config_uid)
+                res = session.get(Trial, record.id)
+                assert res is not None
+                res.metrics.append(internal_metrics)
+                res.state = state
+                self._set_record_state(record, state)
+                trial_nums.append(record.optuna_trial_num)
+
+        return trial_nums
 
     def _inc_error_count(self, config_uid: str, state: TrialState):
-        with Session(self.engine) as session:
-            stmt = select(Trial).where(Trial.config_uid == config_uid)
-            res = session.execute(stmt).scalar_one()
+        with self._transaction() as session:
+            res = session.get(Trial, self._get_record(config_uid).id)
+            assert res is not None
             assert state == TrialState.RECOVERABLE_ERROR
             runtime_errors = copy.deepcopy(res.runtime_errors)
-            res.runtime_errors = Trial.runtime_errors + 1
-
-            session.commit()
-            session.flush()
-
-        if runtime_errors < 10:
-            self.logger.warn(f"{config_uid} failed {runtime_errors} times.")
-            self.update_trial_state(config_uid, None, TrialState.WAITING)
-        else:
-            self.logger.error(f"{config_uid} failed {runtime_errors} times. Skipping.")
-            self.update_trial_state(config_uid, None, TrialState.FAIL)
+            res.runtime_errors = runtime_errors + 1
+
+            if runtime_errors < 10:
+                self.logger.warn(f"{config_uid} failed {runtime_errors} times.")
+                self.update_trial_state(config_uid, None, TrialState.WAITING)
+            else:
+                self.logger.error(
+                    f"{config_uid} failed {runtime_errors} times. Skipping."
+                )
+                self.update_trial_state(config_uid, None, TrialState.FAIL)
 
     def __append_trial_internal(
         self,
@@ -817,6 +1049,7 @@ class ExperimentState:
         trial_kwargs: dict[str, ty.Any],
         optuna_trial_num: int,
         trial_state: TrialState,
+        trial_config: ParallelConfig | None = None,
     ):
         """
         Append a trial to the Experiment state database.
@@ -831,8 +1064,10 @@ class ExperimentState:
             The optuna trial number.
         trial_state : TrialState
             The state of the trial.
+        trial_config : ParallelConfig | None, optional
+            The parsed configuration of the trial, by default ``None``.
         """
-        with Session(self.engine) as session:
+        with self._transaction() as session:
             trial = Trial(
                 config_uid=config_uid,
                 config_param=trial_kwargs,
@@ -841,21 +1076,75 @@ class ExperimentState:
                 metrics=[],
             )
             session.add(trial)
-            session.commit()
+            # assigns the id of the trial
+            session.flush()
+        self._add_record(
+            TrialRecord(
+                trial.id,
+                config_uid,
+                trial_kwargs,
+                optuna_trial_num,
+                trial_state,
+                config=trial_config,
+            )
+        )
 
-    def _get_trials_by_stmt(self, stmt) -> list[Trial]:
-        with self.engine.connect() as conn:
-            trials: list[Trial] = conn.execute(stmt).fetchall()  # type: ignore
-        return trials
+    def _load_trial_index(self):
+        self._trial_records.clear()
+        self._uid_records.clear()
+        for records in self._state_records.values():
+            records.clear()
+        with Session(self.engine) as session:
+            for trial in session.scalars(select(Trial).order_by(Trial.id)):
+                self._add_record(
+                    TrialRecord(
+                        trial.id,
+                        trial.config_uid,
+                        trial.config_param,  # type: ignore[arg-type]
+                        int(trial.optuna_trial_num),
+                        trial.state,
+                    )
+                )
+
+    def _add_record(self, record: TrialRecord):
+        self._trial_records[record.id] = record
+        self._uid_records[record.config_uid] = record
+        self._state_records[record.state][record.id] = record
+
+    def _set_record_state(self, record: TrialRecord, state: TrialState):
+        del self._state_records[record.state][record.id]
+        record.state = state
+        self._state_records[state][record.id] = record
 
-    def _get_trial_configs_by_stmt(self, stmt) -> list[ParallelConfig]:
-        trials = self._get_trials_by_stmt(stmt)
-        configs = []
-        for trial in trials:
-            trial_config = type(self.config)(**dict(trial.config_param))
-            configs.append(trial_config)
-            assert trial_config.uid == trial.config_uid
-        return configs
+    def _get_record(self, config_uid: str) -> TrialRecord:
+        if (record := self._uid_records.get(config_uid)) is not None:
+            return record
+        raise ValueError(f"No trial found with config_uid: {config_uid}")
+
+    def _is_trial(self, config_uid: str) -> bool:
+        record = self._uid_records.get(config_uid)
+        return record is not None and record.state not in {
+            TrialState.PRUNED_DUPLICATE,
+            TrialState.PRUNED_INVALID,
+        }
+
+    def _get_records_by_states(self, *states: TrialState) -> list[TrialRecord]:
+        records = [
+            record
+            for state in states
+            for record in self._state_records[state].values()
+        ]
+        # NOTE in the order the trials were sampled.
+        return sorted(records, key=lambda record: record.id)
+
+    def _get_trial_configs_by_states(
+        self, *states: TrialState
+    ) -> list[ParallelConfig]:
+        config_class = type(self.config)
+        return [
+            record.config(config_class)
+            for record in self._get_records_by_states(*states)
+        ]
 
     @property
     def all_trials_uid(self) -> list[str]:
@@ -863,12 +1152,14 @@ class ExperimentState:
 
     @property
     def all_trials(self) -> list[ParallelConfig]:
-        stmt = select(Trial).where(
-            # (Trial.state != TrialState.WAITING)
-            (Trial.state != TrialState.PRUNED_DUPLICATE)
-            & (Trial.state != TrialState.PRUNED_INVALID)
+        return self._get_trial_configs_by_states(
+            *(
+                state
+                for state in TrialState
+                if state
+                not in {TrialState.PRUNED_DUPLICATE, TrialState.PRUNED_INVALID}
+            )
         )
-        return self._get_trial_configs_by_stmt(stmt)
 
     @property
     def pruned_errored_trials(self) -> list[dict[str, ty.Any]]:
@@ -876,43 +1167,39 @@ class ExperimentState:
         Error trials can not be initialized to a configuration
         and such as return the kwargs parameters.
         """
-
-        stmt = select(Trial).where((Trial.state == TrialState.PRUNED_INVALID))
-        trials = self._get_trials_by_stmt(stmt)
-        return [dict(trial.config_param) for trial in trials]
+        return [
+            dict(record.config_param)
+            for record in self._get_records_by_states(TrialState.PRUNED_INVALID)
+        ]
 
     @property
     def pruned_duplicate_trials(self) -> list[dict[str, ty.Any]]:
-        stmt = select(Trial).where((Trial.state == TrialState.PRUNED_DUPLICATE))
-        trials = self._get_trials_by_stmt(stmt)
-        return [dict(trial.config_param) for trial in trials]
+        return [
+            dict(record.config_param)
+            for record in self._get_records_by_states(TrialState.PRUNED_DUPLICATE)
+        ]
 
     @property
     def running_trials(self) -> list[ParallelConfig]:
-        stmt = select(Trial).where((Trial.state == TrialState.RUNNING))
-        return self._get_trial_configs_by_stmt(stmt)
+        return self._get_trial_configs_by_states(TrialState.RUNNING)
 
     @property
     def pending_trials(self) -> list[ParallelConfig]:
-        stmt = select(Trial).where(
-            (Trial.state == TrialState.WAITING) | (Trial.state == TrialState.RESUME)
+        return self._get_trial_configs_by_states(
+            TrialState.WAITING, TrialState.RESUME
         )
-        return self._get_trial_configs_by_stmt(stmt)
 
     @property
     def resumed_trials(self) -> list[ParallelConfig]:
-        stmt = select(Trial).where((Trial.state == TrialState.RESUME))
-        return self._get_trial_configs_by_stmt(stmt)
+        return self._get_trial_configs_by_states(TrialState.RESUME)
 
     @property
     def complete_trials(self) -> list[ParallelConfig]:
-        stmt = select(Trial).where((Trial.state == TrialState.COMPLETE))
-        return self._get_trial_configs_by_stmt(stmt)
+        return self._get_trial_configs_by_states(TrialState.COMPLETE)
 
     @property
     def failed_trials(self) -> list[ParallelConfig]:
-        stmt = select(Trial).where((Trial.state == TrialState.FAIL))
-        return self._get_trial_configs_by_stmt(stmt)
+        return self._get_trial_configs_by_states(TrialState.FAIL)
 
     @property
     def n_trials_remaining(self) -> int:
@@ -922,4 +1209,7 @@ class ExperimentState:
         the ones that are pruned during sampling.
         """
 
-        return self.config.total_trials - len(self.all_trials)
+        n_pruned = len(self._state_records[TrialState.PRUNED_DUPLICATE]) + len(
+            self._state_records[TrialState.PRUNED_INVALID]
+        )
+        return self.config.total_trials - (len(self._trial_records) - n_pruned)
@@ -35,6 +35,21 @@ class LoggerBase(ABC):
     def write_config(self, config: ConfigBase):
         pass
 
+    def log_step(self):
+        """
+        Called after the metrics of a log step are added.
+        """
+
+    def flush(self):
+        """
+        Write the metrics that were added.
+        """
+
+    def close(self):
+        """
+        Write the metrics that were added and release the resources of the logger.
+        """
+
     @abstractmethod
     def _sync(self):
         """
@@ -0,0 +1,207 @@
+import json
+import typing as ty
+from numbers import Number
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import torch
+
+import ablator.utils.file as futils
+
+
+def _import_pyarrow():
+    try:
+        # pylint: disable=import-outside-toplevel
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401 pylint: disable=unused-import
+    except ImportError as e:
+        raise ImportError(
+            "Writing and reading the results in the arrow format requires pyarrow. "
+            "Install it with `pip install pyarrow`."
+        ) from e
+    return pyarrow
+
+
+def _is_numeric(value: ty.Any) -> bool:
+    if isinstance(value, torch.Tensor):
+        return value.numel() == 1
+    if isinstance(value, np.ndarray):
+        return value.size == 1 and value.dtype.kind in {"b", "i", "u", "f"}
+    return isinstance(value, Number) and not isinstance(value, complex)
+
+
+def _parse_value(value: ty.Any, numeric: bool) -> ty.Any:
+    if value is None:
+        return None
+    if numeric:
+        try:
+            if isinstance(value, (torch.Tensor, np.ndarray)):
+                value = value.item()
+            return float(value)
+        except (TypeError, ValueError, RuntimeError):
+            return None
+    if isinstance(value, str):
+        return value
+    try:
+        return json.dumps(value, default=futils.default_val_parser)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+class ArrowResultsWriter:
+    """
+    Writes the metrics of every log step as a row of an Arrow IPC stream, an alternative to appending JSON
+    lines to ``results.json`` that can be loaded without parsing. Every writer creates a new segment file
+    in ``results_dir``, i.e. a resumed run writes a new segment. The rows are buffered and written as a record
+    batch every ``flush_rows`` rows and when ``flush`` is called.
+
+    The schema is derived from the rows: numeric values are stored as ``float64`` columns and the rest
+    as ``string`` columns, where values that are not strings are encoded as JSON. Metrics missing from
+    a row are null. When a row has a metric that is not in the schema, i.e. the validation metrics after the
+    first evaluation, or a non-numeric value for a ``float64`` column, the buffered rows are written and the
+    writer continues in a new segment file with the extended schema. The writer does not raise for the
+    values of a row, such that it can not interrupt training.
+
+    Attributes
+    ----------
+    results_dir : Path
+        The directory with the segment files of the run.
+    path : Path
+        The current segment file of the writer.
+    flush_rows : int
+        The number of buffered rows that are written as a record batch.
+    """
+
+    def __init__(self, results_dir: Path, flush_rows: int = 100) -> None:
+        """
+        Initialize the writer and choose its segment file.
+
+        Parameters
+        ----------
+        results_dir : Path
+            The directory with the segment files of the run.
+        flush_rows : int, optional
+            The number of buffered rows that are written as a record batch, by default ``100``.
+        """
+        # fails early when pyarrow is not installed.
+        _import_pyarrow()
+        self.results_dir = Path(results_dir)
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self._next_segment_path()
+        self.flush_rows = flush_rows
+        self._rows: list[dict[str, ty.Any]] = []
+        self._numeric_columns: dict[str, bool] | None = None
+        self._schema = None
+        self._sink = None
+        self._writer = None
+
+    def _next_segment_path(self) -> Path:
+        n_segments = len(list(self.results_dir.glob("*.arrow")))
+        return self.results_dir.joinpath(f"{n_segments:05d}.arrow")
+
+    def _update_schema(self, row: dict[str, ty.Any]):
+        numeric_columns = dict(self._numeric_columns or {})
+        for k, v in row.items():
+            if k not in numeric_columns:
+                numeric_columns[k] = _is_numeric(v)
+            elif numeric_columns[k] and v is not None and not _is_numeric(v):
+                numeric_columns[k] = False
+        if numeric_columns == self._numeric_columns:
+            return
+        if self._numeric_columns is not None:
+            # the buffered rows are written with the previous schema.
+            self.close()
+            self.path = self._next_segment_path()
+        self._numeric_columns = numeric_columns
+        pa = _import_pyarrow()
+        self._schema = pa.schema(
+            [
+                (k, pa.float64() if numeric else pa.string())
+                for k, numeric in numeric_columns.items()
+            ]
+        )
+
+    def append(self, row: dict[str, ty.Any]):
+        """
+        Append the metrics of a log step.
+
+        Parameters
+        ----------
+        row : dict[str, ty.Any]
+            The metrics of the log step.
+        """
+        self._update_schema(row)
+        assert self._numeric_columns is not None
+        self._rows.append(
+            {
+                k: _parse_value(row.get(k), numeric)
+                for k, numeric in self._numeric_columns.items()
+            }
+        )
+        if len(self._rows) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered rows to the segment file as a record batch.
+        """
+        if len(self._rows) == 0:
+            return
+        pa = _import_pyarrow()
+        if self._writer is None:
+            self._sink = pa.OSFile(self.path.as_posix(), "wb")
+            self._writer = pa.ipc.new_stream(self._sink, self._schema)
+        batch = pa.RecordBatch.from_pylist(self._rows, schema=self._schema)
+        self._writer.write_batch(batch)
+        self._rows = []
+
+    def close(self):
+        """
+        Write the buffered rows and close the segment file. The rows appended afterwards are written
+        to a new segment file.
+        """
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+            self._writer = None
+            self._sink = None
+            self.path = self._next_segment_path()
+
+
+def read_arrow_results(results_dir: Path) -> pd.DataFrame:
+    """
+    Read the rows of every segment file written by ``ArrowResultsWriter`` for a run. The record
+    batches are read until the end of a segment, or until a batch that was not completely written
+    when the run was interrupted.
+
+    Parameters
+    ----------
+    results_dir : Path
+        The directory with the segment files of the run.
+
+    Returns
+    -------
+    pd.DataFrame
+        The metrics of every log step in the order they were written.
+    """
+    pa = _import_pyarrow()
+    tables = []
+    for segment_path in sorted(Path(results_dir).glob("*.arrow")):
+        batches = []
+        try:
+            with pa.ipc.open_stream(segment_path.as_posix()) as reader:
+                for batch in reader:
+                    batches.append(batch)
+        except (OSError, pa.ArrowInvalid):
+            pass
+        if len(batches) > 0:
+            tables.append(pa.Table.from_batches(batches))
+    if len(tables) == 0:
+        return pd.DataFrame()
+    try:
+        return pa.concat_tables(tables, promote_options="default").to_pandas()
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # a metric that is numeric in a segment and a string in another.
+        return pd.concat([table.to_pandas() for table in tables], ignore_index=True)
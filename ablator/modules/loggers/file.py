@@ -1,13 +1,29 @@
+import atexit
+import threading
+import weakref
 from datetime import datetime
 import os
 
 from pathlib import Path
 
+# The buffered loggers are flushed when the interpreter exits.
+_BUFFERED_LOGGERS: "weakref.WeakSet[FileLogger]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_buffered_loggers():
+    for logger in list(_BUFFERED_LOGGERS):
+        logger.close()
+
 
 class FileLogger:
     """
     A logger that writes messages to a file and prints them to the console.
 
+    In buffered mode the messages are kept in memory and a background thread, started by the first buffered
+    message, appends them to the file in batches every ``flush_interval`` seconds. The messages are also written when ``buffer_size`` messages
+    are buffered, when an error is logged, on ``flush`` and ``close`` and when the interpreter exits.
+
     Attributes
     ----------
     WARNING : str
@@ -16,6 +32,12 @@ class FileLogger:
         ANSI escape code for the error text color.
     ENDC : str
         ANSI escape code for resetting the text color.
+    buffered : bool
+        Whether the messages are buffered.
+    flush_interval : float
+        The seconds between two writes of the buffered messages.
+    buffer_size : int
+        The maximum number of buffered messages.
     """
 
     WARNING = "\033[93m"
@@ -27,6 +49,9 @@ class FileLogger:
         path: str | Path | None = None,
         verbose: bool = True,
         prefix: str | None = None,
+        buffered: bool = False,
+        flush_interval: float = 5.0,
+        buffer_size: int = 1000,
     ):
         """
         Initialize a FileLogger.
@@ -39,16 +64,51 @@ class FileLogger:
             Whether to print messages to the console, by default ``True``.
         prefix : str | None, optional
             A prefix to add to each logged message, by default ``None``.
+        buffered : bool, optional
+            Whether to buffer the messages and write them in batches, by default ``False``.
+        flush_interval : float, optional
+            The seconds between two writes of the buffered messages, by default ``5.0``.
+        buffer_size : int, optional
+            The maximum number of buffered messages, by default ``1000``.
         """
         self.path = path
+        self.buffered = buffered
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self._init_buffer()
         if path is not None:
             self.set_path(path)
         self.verbose = verbose
         self.set_prefix(prefix)
 
+    def _init_buffer(self):
+        self._buffer: list[str] = []
+        self._buffer_lock = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._flusher: threading.Thread | None = None
+
+    def _start_flusher(self):
+        # NOTE called with ``_buffer_lock`` held. The thread is only started once a message is buffered,
+        # such that the copies of the logger that are never written to, i.e. sent to the remote trials,
+        # do not start a thread.
+        if self._flusher is not None or self._closed:
+            return
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+        _BUFFERED_LOGGERS.add(self)
+
+    def _flush_loop(self):
+        while True:
+            with self._buffer_lock:
+                if self._closed:
+                    return
+                self._buffer_lock.wait(self.flush_interval)
+            self.flush()
+
     def _write(self, msg: str):
         """
-        Write a message to the log file.
+        Write a message to the log file, or to the buffer in buffered mode.
 
         Parameters
         ----------
@@ -56,9 +116,55 @@ class FileLogger:
             The message to write.
         """
 
-        if self.path is not None:
+        if self.path is None:
+            return
+        if not self.buffered:
             with open(self.path, "a", encoding="utf-8") as f:
                 f.write(f"{msg}\n")
+            return
+        with self._buffer_lock:
+            self._start_flusher()
+            self._buffer.append(f"{msg}\n")
+            is_full = len(self._buffer) >= self.buffer_size
+        if is_full:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered messages to the log file.
+        """
+        # NOTE the write lock keeps the order of the messages between the flusher thread and the caller.
+        with self._write_lock:
+            with self._buffer_lock:
+                lines, self._buffer = self._buffer, []
+            if len(lines) > 0 and self.path is not None:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+
+    def close(self):
+        """
+        Write the buffered messages and stop the background flusher thread.
+        """
+        with self._buffer_lock:
+            self._closed = True
+            self._buffer_lock.notify_all()
+        if self._flusher is not None and self._flusher is not threading.current_thread():
+            self._flusher.join()
+        self._flusher = None
+        _BUFFERED_LOGGERS.discard(self)
+        self.flush()
+
+    def __getstate__(self):
+        # The locks and the flusher thread can not be copied and are created again by ``__setstate__``.
+        self.flush()
+        state = self.__dict__.copy()
+        for k in ["_buffer", "_buffer_lock", "_write_lock", "_closed", "_flusher"]:
+            state.pop(k, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_buffer()
 
     def _print(self, msg: str, verbose=False):
         """ Print a message to the console.
@@ -109,6 +215,7 @@ class FileLogger:
         """
         msg = f"{FileLogger.FAIL}{msg}{FileLogger.ENDC}"
         self(msg, True)
+        self.flush()
 
     def __call__(self, msg: str, verbose=True):
         """Log a message.
@@ -146,6 +253,8 @@ class FileLogger:
         path : str | Path
             The path to the log file.
         """
+        # the buffered messages are written to the previous file.
+        self.flush()
         self.path = Path(path)
         parent_dir = self.path.parent
         parent_dir.mkdir(exist_ok=True, parents=True)
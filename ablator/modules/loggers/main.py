@@ -1,5 +1,8 @@
 import copy
 import json
+import os
+import threading
+import time
 from pathlib import Path
 from typing import Optional, Union
 
@@ -10,6 +13,7 @@ from PIL import Image
 import ablator.utils.file as futils
 from ablator.main.configs import RunConfig
 from ablator.modules.loggers import LoggerBase
+from ablator.modules.loggers.arrow import ArrowResultsWriter
 from ablator.modules.loggers.file import FileLogger
 from ablator.modules.loggers.tensor import TensorboardLogger
 from ablator.modules.metrics.main import TrainMetrics
@@ -30,18 +34,25 @@ class SummaryLogger:
         Name of the summary directory.
     RESULTS_JSON_NAME : str
         Name of the results JSON file.
+    RESULTS_ARROW_NAME : str
+        Name of the directory with the results segment files, when ``run_config.results_format`` is ``"arrow"``.
     LOG_FILE_NAME : str
         Name of the log file.
     CONFIG_FILE_NAME : str
         Name of the configuration file.
     METADATA_JSON : str
         Name of the metadata JSON file.
+    METADATA_INTERVAL : float
+        The minimum seconds between two writes of the metadata file by ``update()``. The metadata is also
+        written with every checkpoint and by ``flush()`` and ``close()``.
     CHKPT_DIR_NAMES : list[str]
         List of checkpoint directory names.
     CHKPT_DIR_VALUES : list[str]
         List of checkpoint directory values.
     CHKPT_DIRS : dict[str, Path]
         Dictionary containing checkpoint directories.
+    CHKPT_BLOB_DIR_NAME : str
+        Name of the directory with the tensor blobs shared by the deduplicated checkpoints.
     keep_n_checkpoints : int
         Number of checkpoints to keep.
     log_iteration : int
@@ -58,12 +69,25 @@ class SummaryLogger:
         the model directory.
     result_json_path : Path | None
         Path to the results JSON file.
+    results_writer : ArrowResultsWriter | None
+        The writer of the results in the arrow format, when ``run_config.results_format`` is ``"arrow"``.
+    checkpoint_manifest : dict[str, dict]
+        The size and hash of every saved checkpoint, indexed by the checkpoint path relative
+        to ``model_dir``. It is stored in the metadata file and used to verify the checkpoints
+        without loading them.
+    checkpoint_format : str
+        The layout of the saved checkpoints, ``"single"``, ``"sharded"`` or ``"dedup"``.
+    checkpoint_writer : futils.AsyncCheckpointWriter | None
+        The background checkpoint writer, when ``run_config.async_checkpoint`` is set.
     """
     SUMMARY_DIR_NAME = "dashboard"
     RESULTS_JSON_NAME = "results.json"
+    RESULTS_ARROW_NAME = "results.arrow"
     LOG_FILE_NAME = "train.log"
     CONFIG_FILE_NAME = "config.yaml"
     METADATA_JSON = "metadata.json"
+    METADATA_INTERVAL = 30.0
+    CHKPT_BLOB_DIR_NAME = "checkpoint_blobs"
     CHKPT_DIR_NAMES = ["best", "recent"]
     CHKPT_DIR_VALUES = ["best_checkpoints", "checkpoints"]
     CHKPT_DIRS: dict[str, Path]
@@ -100,11 +124,18 @@ class SummaryLogger:
         )
         self.log_iteration: int = 0
         self.checkpoint_iteration: dict[str, dict[str, int]] = {}
+        self.checkpoint_manifest: dict[str, dict] = {}
         self.log_file_path: Path | None = None
         self.dashboard: LoggerBase | None = None
         self.model_dir: Path | None = None
         self.result_json_path: Path | None = None
+        self.results_writer: ArrowResultsWriter | None = None
         self.CHKPT_DIRS = {}
+        self.checkpoint_format: str = run_config.checkpoint_format
+        self.checkpoint_writer: futils.AsyncCheckpointWriter | None = None
+        self._metadata_lock = threading.Lock()
+        self._metadata_dirty = False
+        self._metadata_time = 0.0
         if model_dir is not None:
             self.model_dir = Path(model_dir)
             if not resume and self.model_dir.exists():
@@ -130,6 +161,7 @@ class SummaryLogger:
                 )
                 self.checkpoint_iteration = metadata["checkpoint_iteration"]
                 self.log_iteration = metadata["log_iteration"]
+                self.checkpoint_manifest = metadata.get("checkpoints", {})
 
             (self.summary_dir, *chkpt_dirs) = futils.make_sub_dirs(
                 model_dir, self.SUMMARY_DIR_NAME, *self.CHKPT_DIR_VALUES
@@ -137,29 +169,48 @@ class SummaryLogger:
             for name, path in zip(self.CHKPT_DIR_NAMES, chkpt_dirs):
                 self.CHKPT_DIRS[name] = path
 
-            self.result_json_path = self.model_dir / self.RESULTS_JSON_NAME
+            if run_config.results_format == "arrow":
+                self.results_writer = ArrowResultsWriter(
+                    self.model_dir / self.RESULTS_ARROW_NAME
+                )
+            else:
+                self.result_json_path = self.model_dir / self.RESULTS_JSON_NAME
             self.log_file_path = self.model_dir.joinpath(self.LOG_FILE_NAME)
             self.dashboard = self._make_dashboard(self.summary_dir, run_config)
             self._write_config(run_config)
             self._update_metadata()
-        self.logger = FileLogger(path=self.log_file_path, verbose=verbose)
+            if run_config.async_checkpoint:
+                self.checkpoint_writer = futils.AsyncCheckpointWriter()
+        self.logger = FileLogger(
+            path=self.log_file_path,
+            verbose=verbose,
+            buffered=run_config.buffered_logs and self.log_file_path is not None,
+        )
 
     def _update_metadata(self):
         """
-        Update the metadata file.
+        Update the metadata file. The metadata is written to a temporary file that is then renamed,
+        such that the metadata file is never partially written.
         """
         if self.model_dir is None:
             return
         metadata_path = self.model_dir.joinpath(self.METADATA_JSON)
-        metadata_path.write_text(
-            json.dumps(
-                {
-                    "log_iteration": self.log_iteration,
-                    "checkpoint_iteration": self.checkpoint_iteration,
-                }
-            ),
-            encoding="utf-8",
-        )
+        tmp_path = metadata_path.with_name(f".{metadata_path.name}.tmp")
+        # The metadata can be updated by the checkpoint writer thread.
+        with self._metadata_lock:
+            tmp_path.write_text(
+                json.dumps(
+                    {
+                        "log_iteration": self.log_iteration,
+                        "checkpoint_iteration": self.checkpoint_iteration,
+                        "checkpoints": self.checkpoint_manifest,
+                    }
+                ),
+                encoding="utf-8",
+            )
+            os.replace(tmp_path, metadata_path)
+            self._metadata_dirty = False
+            self._metadata_time = time.monotonic()
 
     def _make_dashboard(
         self, summary_dir: Path, run_config: RunConfig | None = None
@@ -228,7 +279,7 @@ class SummaryLogger:
             for sub_k, sub_v in v.items():
                 self.dashboard.add_scalar(f"{k}_{sub_k}", sub_v, itr)
         elif isinstance(v, MovingAverage):
-            self.dashboard.add_scalar(k, v.get(), itr)
+            self.dashboard.add_scalar(k, v.value, itr)
         elif isinstance(v, str):
             self.dashboard.add_text(k, v, itr)
 
@@ -248,14 +299,16 @@ class SummaryLogger:
             )
 
     def _append_metrics(self, metrics: dict[str, float]):
-        """ Append metrics to the result json file.
+        """ Append metrics to the result json file, or to the arrow results.
 
         Parameters
         ----------
         metrics : dict[str, float]
             The metrics to append.
         """
-        if self.result_json_path is not None:
+        if self.results_writer is not None:
+            self.results_writer.append(metrics)
+        elif self.result_json_path is not None:
             with open(self.result_json_path, "a", encoding="utf-8") as fp:
                 fp.write(futils.dict_to_json(metrics) + "\n")
 
@@ -265,7 +318,9 @@ class SummaryLogger:
         itr: Optional[int] = None,
     ):
         """ Update the dashboard with the given metrics.
-        write some metrics to json files and update the current metadata (``log_iteration``)
+        write some metrics to json files and update the current metadata (``log_iteration``). The metadata
+        file is written at most every ``METADATA_INTERVAL`` seconds, with every checkpoint and on ``flush()``,
+        and the buffered results in the arrow format are written with it.
 
         Parameters
         ----------
@@ -299,8 +354,17 @@ class SummaryLogger:
 
         for k, v in dict_metrics.items():
             self._add_metric(k, v, itr)
+        if self.dashboard is not None:
+            self.dashboard.log_step()
         self._append_metrics(dict_metrics)
-        self._update_metadata()
+        with self._metadata_lock:
+            self._metadata_dirty = True
+        if time.monotonic() - self._metadata_time > self.METADATA_INTERVAL:
+            # the buffered results are written with the metadata, such that they are not lost when the
+            # trial is killed and are visible while it runs.
+            if self.results_writer is not None:
+                self.results_writer.flush()
+            self._update_metadata()
 
     def checkpoint(
         self,
@@ -342,33 +406,132 @@ class SummaryLogger:
         ------
         AssertionError
             If the provided ``itr`` is not larger than the current iteration associated with the checkpoint.
+
+        Notes
+        -----
+        When ``run_config.async_checkpoint`` is set, ``save_dict`` is copied to CPU memory and written
+        by a background thread. Use ``flush()`` to wait for the pending checkpoints to be written.
         """
         if self.model_dir is None:
             return
         dir_name = "best" if is_best else "recent"
         if self.keep_n_checkpoints > 0:
-            if dir_name not in self.checkpoint_iteration:
-                self.checkpoint_iteration[dir_name] = {}
-            if file_name not in self.checkpoint_iteration[dir_name]:
-                self.checkpoint_iteration[dir_name][file_name] = -1
-            if itr is None:
-                self.checkpoint_iteration[dir_name][file_name] += 1
-                itr = self.checkpoint_iteration[dir_name][file_name]
-            else:
-                cur_iter = self.checkpoint_iteration[dir_name][file_name]
-                assert (
-                    itr > cur_iter
-                ), f"Checkpoint iteration {cur_iter} > training iteration {itr}. Can not save checkpoint."
-                self.checkpoint_iteration[dir_name][file_name] = itr
+            with self._metadata_lock:
+                if dir_name not in self.checkpoint_iteration:
+                    self.checkpoint_iteration[dir_name] = {}
+                if file_name not in self.checkpoint_iteration[dir_name]:
+                    self.checkpoint_iteration[dir_name][file_name] = -1
+                if itr is None:
+                    self.checkpoint_iteration[dir_name][file_name] += 1
+                    itr = self.checkpoint_iteration[dir_name][file_name]
+                else:
+                    cur_iter = self.checkpoint_iteration[dir_name][file_name]
+                    assert (
+                        itr > cur_iter
+                    ), f"Checkpoint iteration {cur_iter} > training iteration {itr}. Can not save checkpoint."
+                    self.checkpoint_iteration[dir_name][file_name] = itr
 
             dir_path = self.model_dir.joinpath(self.CHKPT_DIRS[dir_name])
 
             file_path = dir_path.joinpath(f"{file_name}_{itr:010}.pt")
 
             assert not file_path.exists(), f"Checkpoint exists: {file_path}"
-            futils.save_checkpoint(save_dict, file_path)
-            futils.clean_checkpoints(dir_path, self.keep_n_checkpoints)
+            if self.checkpoint_writer is not None:
+                self.checkpoint_writer.submit(
+                    self._write_checkpoint,
+                    futils.copy_to_cpu(save_dict),
+                    file_path,
+                )
+            else:
+                self._write_checkpoint(save_dict, file_path)
+
+    def _write_checkpoint(self, save_dict: object, file_path: Path):
+        """
+        Write the checkpoint, remove the old checkpoints of its directory and update the metadata.
+
+        Parameters
+        ----------
+        save_dict : object
+            The object to save.
+        file_path : Path
+            The path of the checkpoint.
+        """
+        if self.checkpoint_format == "sharded":
+            manifest_entry = futils.save_sharded_checkpoint(save_dict, file_path)
+        elif self.checkpoint_format == "dedup":
+            manifest_entry = futils.save_dedup_checkpoint(
+                save_dict, file_path, self.model_dir.joinpath(self.CHKPT_BLOB_DIR_NAME)
+            )
+        else:
+            manifest_entry = futils.save_checkpoint(save_dict, file_path)
+        removed_paths = futils.clean_checkpoints(
+            file_path.parent, self.keep_n_checkpoints
+        )
+        self._clean_checkpoint_blobs()
+        with self._metadata_lock:
+            self.checkpoint_manifest[self._manifest_key(file_path)] = manifest_entry
+            for path in removed_paths:
+                self.checkpoint_manifest.pop(self._manifest_key(path), None)
+        self._update_metadata()
+
+    def _manifest_key(self, file_path: Path) -> str:
+        assert self.model_dir is not None
+        return Path(file_path).relative_to(self.model_dir).as_posix()
+
+    def verify_checkpoint(self, file_path: Path) -> bool:
+        """
+        Verify a checkpoint against the size and hash recorded when it was saved, without loading it.
+
+        Parameters
+        ----------
+        file_path : Path
+            The path of the checkpoint.
+
+        Returns
+        -------
+        bool
+            ``False`` if the checkpoint does not match its manifest entry, i.e. it was partially written
+            or it is corrupted. Checkpoints without a manifest entry, e.g. saved by a previous version
+            or outside ``model_dir``, can not be verified and are assumed valid.
+        """
+        if self.model_dir is None or not Path(file_path).is_relative_to(self.model_dir):
+            return True
+        manifest_entry = self.checkpoint_manifest.get(self._manifest_key(file_path))
+        if manifest_entry is None:
+            return True
+        return futils.verify_checkpoint(file_path, manifest_entry)
+
+    def flush(self):
+        """
+        Wait until the pending checkpoints and dashboard metrics are written and write the buffered
+        results, log messages and metadata.
+        """
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.flush()
+        if self.results_writer is not None:
+            self.results_writer.flush()
+        if self.dashboard is not None:
+            self.dashboard.flush()
+        if self._metadata_dirty:
             self._update_metadata()
+        self.logger.flush()
+
+    def close(self):
+        """
+        Write the pending checkpoints and stop the background checkpoint writer. Write the buffered
+        results and close the results file. Write the dashboard metrics, the buffered log messages
+        and the metadata.
+        """
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.close()
+            self.checkpoint_writer = None
+        if self.results_writer is not None:
+            self.results_writer.close()
+        if self.dashboard is not None:
+            self.dashboard.close()
+        if self._metadata_dirty:
+            self._update_metadata()
+        self.logger.close()
 
     def clean_checkpoints(self, keep_n_checkpoints: int):
         """
@@ -381,9 +544,33 @@ class SummaryLogger:
         """
         if self.model_dir is None:
             return
+        if self.checkpoint_writer is not None:
+            # the checkpoints that are written in the background reference the blobs to be cleaned.
+            self.checkpoint_writer.flush()
         for chkpt_dir in self.CHKPT_DIR_VALUES:
             dir_path = self.model_dir.joinpath(chkpt_dir)
-            futils.clean_checkpoints(dir_path, keep_n_checkpoints)
+            removed_paths = futils.clean_checkpoints(dir_path, keep_n_checkpoints)
+            with self._metadata_lock:
+                for path in removed_paths:
+                    self.checkpoint_manifest.pop(self._manifest_key(path), None)
+        self._clean_checkpoint_blobs()
+        self._update_metadata()
+
+    def _clean_checkpoint_blobs(self):
+        """
+        Remove the tensor blobs that are not referenced by any of the remaining checkpoints.
+        """
+        if self.model_dir is None:
+            return
+        blob_dir = self.model_dir.joinpath(self.CHKPT_BLOB_DIR_NAME)
+        if not blob_dir.exists():
+            return
+        checkpoint_paths = [
+            path
+            for chkpt_dir in self.CHKPT_DIR_VALUES
+            for path in self.model_dir.joinpath(chkpt_dir).glob("*.pt")
+        ]
+        futils.clean_checkpoint_blobs(blob_dir, checkpoint_paths)
 
     def info(self, *args, **kwargs):
         """
@@ -1,28 +1,99 @@
+import copy
+import queue
+import threading
+import weakref
 from pathlib import Path
-from typing import Union
+from typing import Any, Union
 
 import numpy as np
 import pandas as pd
+import torch
 from omegaconf import OmegaConf
 from tensorboardX import SummaryWriter
+from tensorboardX.proto.summary_pb2 import Summary
+from tensorboardX.summary import scalar
 
 from ablator.config.main import ConfigBase
 from ablator.config.utils import flatten_nested_dict
 from ablator.modules.loggers import LoggerBase
 
+# A log step: the iteration, the scalars by tag and the calls to the methods of the backend logger.
+_Step = tuple[int, dict[str, float], list[tuple[str, tuple, dict[str, Any]]]]
+
+
+def _copy_payload(v: Any) -> Any:
+    # the payloads are written by the background thread, after the caller can modify them.
+    if isinstance(v, torch.Tensor):
+        return v.detach().cpu().clone()
+    if isinstance(v, np.ndarray):
+        return np.array(v, copy=True)
+    if isinstance(v, str):
+        return v
+    return copy.deepcopy(v)
+
+
+def _write_steps(backend_logger: SummaryWriter, steps: list[_Step]):
+    merged_steps: dict[int, tuple[dict[str, float], list]] = {}
+    for itr, step_scalars, calls in steps:
+        if itr not in merged_steps:
+            merged_steps[itr] = ({}, [])
+        # the identical tags of the same iteration are coalesced to the latest value.
+        merged_steps[itr][0].update(step_scalars)
+        merged_steps[itr][1].extend(calls)
+    file_writer = backend_logger._get_file_writer()  # pylint: disable=protected-access
+    for itr, (scalars, calls) in merged_steps.items():
+        if len(scalars) > 0:
+            summary = Summary(
+                value=[value for k, v in scalars.items() for value in scalar(k, v).value]
+            )
+            file_writer.add_summary(summary, itr)
+        for name, args, kwargs in calls:
+            getattr(backend_logger, name)(*args, **kwargs)
+
+
+def _write_loop(
+    backend_logger: SummaryWriter,
+    steps_queue: "queue.Queue[_Step | None]",
+    errors: list[Exception],
+):
+    # NOTE the loop does not reference the logger, such that the logger can be garbage collected.
+    is_closed = False
+    while not is_closed:
+        steps = [steps_queue.get()]
+        # the steps that were queued while the previous steps were written are written together.
+        while True:
+            try:
+                steps.append(steps_queue.get_nowait())
+            except queue.Empty:
+                break
+        is_closed = steps[-1] is None
+        try:
+            _write_steps(backend_logger, [step for step in steps if step is not None])
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            errors.append(e)
+        finally:
+            for _ in steps:
+                steps_queue.task_done()
+
 
 class TensorboardLogger(LoggerBase):
     """
     A logger class for Tensorboard visualization.
 
+    The metrics of a log step are collected until ``log_step`` is called, or until a metric of a different
+    iteration is added, and are then written by a background thread, such that logging does not wait for
+    the summaries to be serialized. The scalars of a log step are written as a single event.
+
     Attributes
     ----------
     summary_dir : Union[str, Path]
         The directory to store the Tensorboard summary files.
     backend_logger : SummaryWriter
         The PyTorch Tensorboard SummaryWriter object used to log data.
+    flush_interval : int
+        The seconds between two flushes of the event file.
     """
-    def __init__(self, summary_dir: Union[str, Path]):
+    def __init__(self, summary_dir: Union[str, Path], flush_interval: int = 120):
         """
         Initialize the TensorboardLogger with a summary directory.
 
@@ -30,9 +101,71 @@ class TensorboardLogger(LoggerBase):
         ----------
         summary_dir : Union[str, Path]
             The directory to store the Tensorboard summary files.
+        flush_interval : int, optional
+            The seconds between two flushes of the event file, by default ``120``.
         """
         self.summary_dir = Path(summary_dir).as_posix()
-        self.backend_logger = SummaryWriter(log_dir=summary_dir)
+        self.flush_interval = flush_interval
+        self.backend_logger = SummaryWriter(
+            log_dir=summary_dir, flush_secs=flush_interval
+        )
+        self._step_itr: int | None = None
+        self._step_scalars: dict[str, float] = {}
+        self._step_calls: list[tuple[str, tuple, dict[str, Any]]] = []
+        self._steps_queue: "queue.Queue[_Step | None]" = queue.Queue()
+        self._errors: list[Exception] = []
+        self._writer = threading.Thread(
+            target=_write_loop,
+            args=(self.backend_logger, self._steps_queue, self._errors),
+            daemon=True,
+        )
+        self._writer.start()
+        weakref.finalize(self, self._steps_queue.put, None)
+
+    def _add_to_step(self, itr: int):
+        if self._step_itr is not None and self._step_itr != itr:
+            self.log_step()
+        self._step_itr = itr
+
+    def _raise_errors(self):
+        if len(self._errors) > 0:
+            raise self._errors.pop(0)
+
+    def log_step(self):
+        """
+        Queue the metrics of the current log step to be written by the background thread.
+
+        Raises
+        ------
+        Exception
+            The error of writing a previous log step.
+        """
+        self._raise_errors()
+        if self._step_itr is None:
+            return
+        self._steps_queue.put((self._step_itr, self._step_scalars, self._step_calls))
+        self._step_itr = None
+        self._step_scalars = {}
+        self._step_calls = []
+
+    def flush(self):
+        """
+        Wait until the metrics that were added are passed to the event writer and flush the event file.
+        """
+        self.log_step()
+        self._steps_queue.join()
+        self.backend_logger.flush()
+        self._raise_errors()
+
+    def close(self):
+        """
+        Write the metrics that were added, stop the background thread and close the event file.
+        """
+        self.log_step()
+        self._steps_queue.put(None)
+        self._writer.join()
+        self.backend_logger.close()
+        self._raise_errors()
 
     def add_image(self, k, v, itr, dataformats="CHW"):
         """
@@ -49,7 +182,10 @@ class TensorboardLogger(LoggerBase):
         dataformats : str, optional
             The format of the image data, by default ``"CHW"``.
         """
-        self.backend_logger.add_image(k, v, itr, dataformats=dataformats)
+        self._add_to_step(itr)
+        self._step_calls.append(
+            ("add_image", (k, _copy_payload(v), itr), {"dataformats": dataformats})
+        )
 
     def add_table(self, k, v: pd.DataFrame, itr):
         """
@@ -64,7 +200,7 @@ class TensorboardLogger(LoggerBase):
         itr : int
             The iteration number.
         """
-        self.backend_logger.add_text(k, v.to_markdown(), itr)
+        self.add_text(k, v.to_markdown(), itr)
 
     def add_text(self, k, v, itr):
         """
@@ -79,7 +215,8 @@ class TensorboardLogger(LoggerBase):
         itr : int
             The iteration number.
         """
-        self.backend_logger.add_text(k, v, itr)
+        self._add_to_step(itr)
+        self._step_calls.append(("add_text", (k, _copy_payload(v), itr), {}))
 
     def add_scalars(self, k, v: dict[str, float | int], itr):
         """
@@ -95,9 +232,8 @@ class TensorboardLogger(LoggerBase):
             The iteration number.
         """
         for _k, _v in v.items():
-            self.backend_logger.add_scalar(f"{k}_{_k}", _v, itr)
-        # NOTE this is buggy:
-        # self.backend_logger.add_scalars(k, v_dict, itr)
+            self.add_scalar(f"{k}_{_k}", _v, itr)
+        # NOTE ``SummaryWriter.add_scalars`` writes every scalar to a separate event file.
 
     def add_scalar(self, k, v, itr):
         """
@@ -112,10 +248,8 @@ class TensorboardLogger(LoggerBase):
         itr : int
             The iteration number.
         """
-        if v is None:
-            self.backend_logger.add_scalar(k, np.nan, itr)
-        else:
-            self.backend_logger.add_scalar(k, v, itr)
+        self._add_to_step(itr)
+        self._step_scalars[k] = np.nan if v is None else float(v)
 
     def write_config(self, config: ConfigBase):
         """
@@ -128,7 +262,9 @@ class TensorboardLogger(LoggerBase):
         """
         hparams = flatten_nested_dict(config.to_dict())
         run_config = OmegaConf.to_yaml(OmegaConf.create(hparams)).replace("\n", "\n\n")
-        self.backend_logger.add_text("config", run_config, 0)
+        self._add_to_step(0)
+        self._step_calls.append(("add_text", ("config", run_config, 0), {}))
+        self.log_step()
 
     def _sync(self):
         pass
@@ -0,0 +1,232 @@
+import typing as ty
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+
+import numpy as np
+import torch
+
+
+class IncrementalMetric(ABC):
+    """
+    Base class for evaluation functions that are computed incrementally, one batch at a time, such that
+    the predictions do not need to be stored. An ``IncrementalMetric`` can be used in place of an evaluation
+    function in ``TrainMetrics`` and ``PredictionStore``.
+
+    The arguments of ``update`` must match the names of the prediction batches that the model returns,
+    the same as for the arguments of an evaluation function.
+
+    An ``IncrementalMetric`` is computed over every batch appended since the predictions were last reset, i.e.
+    over the whole validation set, while an evaluation function is computed over the last ``batch_limit`` stored
+    batches. The two only compute the same value when all the batches fit in ``batch_limit``.
+
+    Examples
+    --------
+    >>> class Mean(IncrementalMetric):
+    ...     def update(self, preds):
+    ...         return preds.sum(), len(preds)
+    ...     def merge(self, state_a, state_b):
+    ...         return state_a[0] + state_b[0], state_a[1] + state_b[1]
+    ...     def compute(self, state):
+    ...         return float(state[0] / state[1])
+    >>> train_metrics = TrainMetrics(evaluation_functions={"mean": Mean()}, tags=["val"])
+    """
+
+    @abstractmethod
+    def update(self, **batches) -> ty.Any:
+        """
+        Compute the state of the metric for a single batch of predictions.
+
+        Parameters
+        ----------
+        **batches
+            The batch of every prediction, i.e. ``preds`` and ``labels``.
+
+        Returns
+        -------
+        ty.Any
+            The state of the batch, i.e. the number of correct predictions and the number of predictions.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def merge(self, state_a: ty.Any, state_b: ty.Any) -> ty.Any:
+        """
+        Merge the states of two disjoint sets of batches.
+
+        Parameters
+        ----------
+        state_a : ty.Any
+            The state of the first set of batches.
+        state_b : ty.Any
+            The state of the second set of batches.
+
+        Returns
+        -------
+        ty.Any
+            The state of the union of the sets of batches.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def compute(self, state: ty.Any) -> float | int | torch.Tensor:
+        """
+        Compute the value of the metric from a state.
+
+        Parameters
+        ----------
+        state : ty.Any
+            The state of all the batches since the last reset.
+
+        Returns
+        -------
+        float | int | torch.Tensor
+            The value of the metric, a numeric scalar.
+        """
+        raise NotImplementedError
+
+
+class Accuracy(IncrementalMetric):
+    """
+    The accuracy of predicted classes (or scores of every class) compared to the labels, computed incrementally.
+    The predictions are received as tensors.
+
+    Examples
+    --------
+    >>> train_metrics = TrainMetrics(evaluation_functions={"acc": Accuracy()}, tags=["val"])
+    >>> train_metrics.append_batch(preds=np.array([1, 0]), labels=np.array([1, 1]), tag="val")
+    >>> train_metrics.evaluate("val")
+    {'acc': 0.5}
+    """
+
+    def update(self, preds: torch.Tensor, labels: torch.Tensor):  # type: ignore[override]
+        if preds.ndim > labels.ndim:
+            preds = preds.argmax(-1)
+        # NOTE the count is kept on the device of the predictions until the metric is computed.
+        return (preds == labels).sum(), labels.numel()
+
+    def merge(self, state_a, state_b):
+        return state_a[0] + state_b[0], state_a[1] + state_b[1]
+
+    def compute(self, state):
+        correct, total = state
+        return float(correct) / total
+
+
+def _f1_macro(confusion_matrix: np.ndarray) -> float:
+    true_positives = np.diag(confusion_matrix)
+    support = confusion_matrix.sum(1) + confusion_matrix.sum(0)
+    present = support > 0
+    return float(np.mean(2 * true_positives[present] / support[present]))
+
+
+class ConfusionMatrix(IncrementalMetric):
+    """
+    A metric of the confusion matrix of predicted classes (or scores of every class) and the labels, computed
+    incrementally. The confusion matrix counts the labels in its rows and the predicted classes in its columns,
+    and is reduced to the value of the metric by ``reduce``, by default the macro-averaged F1 score of the
+    classes that appear in the labels or the predictions.
+
+    Attributes
+    ----------
+    n_classes : int
+        The number of classes.
+    reduce : Callable[[np.ndarray], float]
+        Computes the value of the metric from the confusion matrix.
+
+    Examples
+    --------
+    >>> balanced_accuracy = lambda cm: np.mean(np.diag(cm) / cm.sum(1))
+    >>> train_metrics = TrainMetrics(
+    ...     evaluation_functions={"f1": ConfusionMatrix(3), "bacc": ConfusionMatrix(3, balanced_accuracy)},
+    ...     tags=["val"],
+    ... )
+    """
+
+    def __init__(
+        self,
+        n_classes: int,
+        reduce: Callable[[np.ndarray], float] | None = None,
+    ):
+        """
+        Initialize the metric.
+
+        Parameters
+        ----------
+        n_classes : int
+            The number of classes.
+        reduce : Callable[[np.ndarray], float] | None, optional
+            Computes the value of the metric from the confusion matrix, by default the macro-averaged F1 score.
+        """
+        assert n_classes > 1, "`n_classes` must be larger than 1."
+        self.n_classes = n_classes
+        self.reduce = _f1_macro if reduce is None else reduce
+
+    def update(self, preds: torch.Tensor, labels: torch.Tensor):  # type: ignore[override]
+        if preds.ndim > labels.ndim:
+            preds = preds.argmax(-1)
+        idx = labels.reshape(-1).long() * self.n_classes + preds.reshape(-1).long()
+        # NOTE the counts are kept on the device of the predictions until the metric is computed.
+        return torch.bincount(idx, minlength=self.n_classes**2)
+
+    def merge(self, state_a, state_b):
+        return state_a + state_b
+
+    def compute(self, state):
+        confusion_matrix = state.cpu().numpy().reshape(self.n_classes, self.n_classes)
+        return self.reduce(confusion_matrix)
+
+
+class AUC(IncrementalMetric):
+    """
+    The area under the ROC curve of binary classification scores, computed incrementally from histograms
+    of the scores of the positive and the negative labels. The scores are expected in ``[0, 1]`` and are
+    binned into ``n_bins`` equal bins, such that the area is exact up to the pairs of scores in the same bin,
+    which are counted as ties. When the predictions have a score for every class, the score of the last class
+    is used.
+
+    Attributes
+    ----------
+    n_bins : int
+        The number of bins of the histograms.
+
+    Examples
+    --------
+    >>> train_metrics = TrainMetrics(evaluation_functions={"auc": AUC()}, tags=["val"])
+    >>> train_metrics.append_batch(preds=np.array([0.9, 0.2, 0.6]), labels=np.array([1, 0, 0]), tag="val")
+    >>> train_metrics.evaluate("val")
+    {'auc': 1.0}
+    """
+
+    def __init__(self, n_bins: int = 1000):
+        """
+        Initialize the metric.
+
+        Parameters
+        ----------
+        n_bins : int, optional
+            The number of bins of the histograms, by default ``1000``.
+        """
+        assert n_bins > 0, "`n_bins` must be a positive integer."
+        self.n_bins = n_bins
+
+    def update(self, preds: torch.Tensor, labels: torch.Tensor):  # type: ignore[override]
+        if preds.ndim > labels.ndim:
+            preds = preds[..., -1]
+        bins = (preds.reshape(-1).double() * self.n_bins).long().clamp(0, self.n_bins - 1)
+        positive = labels.reshape(-1) > 0
+        # the histograms of the negative and the positive scores.
+        idx = bins + positive.long() * self.n_bins
+        return torch.bincount(idx, minlength=2 * self.n_bins)
+
+    def merge(self, state_a, state_b):
+        return state_a + state_b
+
+    def compute(self, state):
+        histograms = state.cpu().numpy().astype(np.float64).reshape(2, self.n_bins)
+        negative, positive = histograms
+        n_pairs = negative.sum() * positive.sum()
+        if n_pairs == 0:
+            return np.nan
+        # the negative scores in lower bins, and half of the ties.
+        lower_negative = np.cumsum(negative) - negative
+        return float(np.sum(positive * (lower_negative + 0.5 * negative)) / n_pairs)
@@ -30,6 +30,8 @@ class TrainMetrics:
         static_aux_metrics: dict[str, ty.Any] | None = None,
         # metrics for which we update with their moving average, i.e. loss
         moving_aux_metrics: Iterable[str] | None = None,
+        on_device: bool = False,
+        evaluation_intermediates: dict[str, Callable] | None = None,
     ):
         """
         Initialize the train metrics settings
@@ -49,6 +51,8 @@ class TrainMetrics:
             a batch looks like this: {"preds": <batch of predictions>, "labels": <batch of predicted labels>},
             then callable's arguments should be ``preds`` and ``labels``, e.g ``evaluation_functions=
             {"mean": lambda preds, labels: np.mean(preads) + np.mean(labels)}``. Default is None.
+            An ``IncrementalMetric`` can be used in place of a function. It is computed over every batch appended
+            since the last ``reset``, while a function is computed over the last ``batch_limit`` batches.
         moving_average_limit : int, optional
             The maximum number of values allowed to store moving average metrics. Default is 3000.
         tags : list[str], optional
@@ -64,6 +68,14 @@ class TrainMetrics:
             while values is a proper initial value. Default is None.
         moving_aux_metrics : Iterable[str], optional
             A list of metrics, those we update with their moving average, such as loss. Default is None.
+        on_device : bool, optional
+            Whether to keep the appended predictions as tensors on their device until they are evaluated,
+            instead of copying every batch to the host. Default is False.
+        evaluation_intermediates : dict[str, Callable], optional
+            A dictionary of intermediate values shared by the evaluation functions, i.e.
+            ``{"pred_class": lambda preds: preds.argmax(-1)}``, that are computed once per evaluation.
+            Evaluation functions receive an intermediate by using its name as an argument.
+            Check ``PredictionStore`` for more details. Default is None.
 
         Examples
         --------
@@ -102,6 +114,8 @@ class TrainMetrics:
         self.__memory_limit__ = memory_limit
         self.__moving_average_limit__ = moving_average_limit
         self.__evaluation_functions__ = _evaluation_functions
+        self.__on_device__ = on_device
+        self.__evaluation_intermediates__ = evaluation_intermediates
         self.__static_aux_attributes__: list[str] = sorted(
             list(_static_aux_metrics.keys())
         )
@@ -391,6 +405,8 @@ class TrainMetrics:
             batch_limit=self.__batch_limit__,
             memory_limit=self.__memory_limit__,
             evaluation_functions=self.__evaluation_functions__,
+            on_device=self.__on_device__,
+            evaluation_intermediates=self.__evaluation_intermediates__,
         )
         setattr(self, attr_name, _preds)
         return getattr(self, attr_name)
@@ -1,6 +1,7 @@
 import inspect
-import sys
+import math
 import typing as ty
+from collections import deque
 from collections.abc import (
     Callable,
     Sequence,
@@ -10,12 +11,24 @@ import numpy as np
 import torch
 
 import ablator.utils.base as butils
+from ablator.modules.metrics.incremental import IncrementalMetric
 
 
 class ArrayStore(Sequence):
     """
     Base class for manipulations (storing, getting, resetting) of batches of values.
 
+    Batches of arrays with the same per-sample shape are stored in a single preallocated numpy buffer,
+    that grows when needed and is compacted when the oldest batches are dropped, such that ``get``
+    returns a view of the stored values without concatenating the batches. Scalars and batches
+    with different per-sample shapes are stored in a list of batches.
+
+    Attributes
+    ----------
+    limit : int
+        The maximum number of batches to store.
+    memory_limit : int or None
+        The maximum memory allowed for all values in bytes, i.e. the ``nbytes`` of the stored arrays.
     """
 
     def __init__(
@@ -43,15 +56,122 @@ class ArrayStore(Sequence):
         ... )
         """
         super().__init__()
-        self.arr: list[np.ndarray | int | float] = []
         self.limit = batch_limit
         self.memory_limit = memory_limit
+        # the values are stored in ``_buffer[_start:_end]`` unless ``_list`` is used.
+        self._buffer: np.ndarray | None = None
+        self._start = 0
+        self._end = 0
+        self._batch_sizes: deque[int] = deque()
+        self._list: list[np.ndarray | int | float] | None = None
+
+    @property
+    def arr(self) -> list[np.ndarray | int | float]:
+        """
+        The stored batches, from the oldest to the most recent.
+        """
+        if self._list is not None:
+            return self._list
+        batches = []
+        start = self._start
+        for size in self._batch_sizes:
+            batches.append(self._buffer[start : start + size])  # type: ignore[index]
+            start += size
+        return batches
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The memory of the stored values in bytes.
+        """
+        if self._list is not None:
+            return sum(self._value_nbytes(v) for v in self._list)
+        if self._buffer is None:
+            return 0
+        return self._buffer[self._start : self._end].nbytes
+
+    # The array operations are overwritten by ``TensorStore`` to store ``torch.Tensor``.
+    def _check_value(self, val: ty.Any):
+        assert isinstance(
+            val, (np.ndarray, int, float)
+        ), f"Invalid ArrayStore value type {type(val)}"
+
+    def _is_batch(self, val: ty.Any) -> bool:
+        return isinstance(val, np.ndarray) and val.ndim > 0
+
+    def _value_nbytes(self, val: ty.Any) -> int:
+        return np.asarray(val).nbytes
+
+    def _empty(self, n_rows: int, like: ty.Any) -> ty.Any:
+        return np.empty((n_rows, *like.shape[1:]), dtype=like.dtype)
+
+    def _promote(self, buffer: ty.Any, val: ty.Any) -> ty.Any:
+        if buffer.dtype != val.dtype:
+            return buffer.astype(np.result_type(buffer, val))
+        return buffer
+
+    def _move_rows(self, start: int, end: int):
+        # numpy assignments handle the overlapping memory of the source and destination.
+        assert self._buffer is not None
+        self._buffer[: end - start] = self._buffer[start:end]
+
+    def _concatenate(self, values: list) -> ty.Any:
+        return np.concatenate(values)
+
+    def _stack(self, values: list) -> ty.Any:
+        return np.array(values)
+
+    def _copy(self, val: ty.Any) -> ty.Any:
+        return np.array(val)
+
+    def _use_list(self):
+        self._list = [self._copy(v) for v in self.arr]
+        self._buffer = None
+        self._start = self._end = 0
+        self._batch_sizes.clear()
+
+    def _append_to_list(self, val: np.ndarray | float | int):
+        assert self._list is not None
+        self._list.append(val)
+        if len(self._list) > self.limit:
+            self._list = self._list[-self.limit :]
+        elif self.memory_limit is not None and self.nbytes > self.memory_limit:
+            self.limit = max(len(self._list) - 1, 1)
+
+    def _reserve(self, n_rows: int):
+        # makes space for ``n_rows`` after ``_end``, by compacting or growing the buffer.
+        assert self._buffer is not None
+        n_stored = self._end - self._start
+        if self._end + n_rows <= len(self._buffer):
+            return
+        if n_stored + n_rows <= len(self._buffer) // 2 or (
+            n_stored + n_rows <= len(self._buffer) and self._start > 0
+        ):
+            self._move_rows(self._start, self._end)
+        else:
+            capacity = 2 * (n_stored + n_rows)
+            if self.memory_limit is not None:
+                max_rows = int(self.memory_limit // max(self._row_nbytes, 1))
+                capacity = max(min(capacity, max_rows), n_stored + n_rows)
+            buffer = self._empty(capacity, self._buffer)
+            buffer[:n_stored] = self._buffer[self._start : self._end]
+            self._buffer = buffer
+        self._start, self._end = 0, n_stored
+
+    @property
+    def _row_nbytes(self) -> int:
+        assert self._buffer is not None
+        return self._value_nbytes(self._buffer[:1]) if len(self._buffer) > 0 else 0
+
+    def _drop_oldest(self):
+        self._start += self._batch_sizes.popleft()
 
     def append(self, val: np.ndarray | float | int):
         """
         Appends a batch of values, or a single value, constrained on the limits.
         If after appending a new batch, ``batch_limit`` is exceeded, only ``batch_limit`` number
-        of latest batches is kept. If memory limit is exceeded, ``batch_limit`` will be reduced.
+        of latest batches is kept. If memory limit is exceeded, the oldest batches are dropped and
+        ``batch_limit`` is reduced to the number of batches that fit in memory.
 
         Parameters
         ----------
@@ -75,45 +195,62 @@ class ArrayStore(Sequence):
         ...     memory_limit=1000
         ... )
         >>> for i in range(100):
-        >>>     array_store.append(int(i))
-        >>> array_store.arr
-        [90, 91, 92, 93, 94, 95, 96, 97, 98, 99]
+        >>>     array_store.append(np.array([i]))
+        >>> array_store.get()
+        array([[90, 91, 92, 93, 94, 95, 96, 97, 98, 99]])
         >>> array_store.limit
         10
 
-        This example shows a case where memory limit is exceeded. As soon as the 5th
-        value is appended, memory of the list is 104 > 100), so ``batch_limit`` is set
-        to the length of the store so far (which is 5) reduced by 1, which equals to 4.
-        Therefore, from then on, only 4 values/batches is allowed.
+        This example shows a case where memory limit is exceeded. Every batch is 8 bytes,
+        so only 100 / 8 = 12 batches fit in memory and ``batch_limit`` is reduced to 12.
 
         >>> array_store = ArrayStore(
-        ...     batch_limit=10,
+        ...     batch_limit=30,
         ...     memory_limit=100
         ... )
         >>> for i in range(100):
-        >>>     array_store.append(int(i))
-        >>> array_store.arr
-        [96, 97, 98, 99]
+        >>>     array_store.append(np.array([i]))
+        >>> array_store.get()
+        array([[88, 89, 90, 91, 92, 93, 94, 95, 96, 97, 98, 99]])
         >>> array_store.limit
-        4
+        12
         """
-        """Appends a batch of values"""
-        # Appending by batch is faster than converting numpy to list
-        assert isinstance(
-            val, (np.ndarray, int, float)
-        ), f"Invalid ArrayStore value type {type(val)}"
-        self.arr.append(val)
-        if len(self.arr) > self.limit:
-            self.arr = self.arr[-self.limit :]
-        elif (
-            self.memory_limit is not None
-            and sys.getsizeof(self.arr) > self.memory_limit
+        self._check_value(val)
+        if self._list is None and (
+            not self._is_batch(val)
+            or (
+                self._buffer is not None
+                and self._buffer.shape[1:] != val.shape[1:]
+            )
         ):
-            self.limit = len(self.arr) - 1
+            self._use_list()
+        if self._list is not None:
+            self._append_to_list(val)
+            return
+
+        if self._buffer is None:
+            self._buffer = self._empty(0, val)
+        else:
+            self._buffer = self._promote(self._buffer, val)
+
+        while len(self._batch_sizes) >= self.limit:
+            self._drop_oldest()
+        if self.memory_limit is not None:
+            while (
+                len(self._batch_sizes) > 0
+                and self.nbytes + self._value_nbytes(val) > self.memory_limit
+            ):
+                self._drop_oldest()
+                self.limit = max(len(self._batch_sizes) + 1, 1)
+        self._reserve(len(val))
+        self._buffer[self._end : self._end + len(val)] = val
+        self._end += len(val)
+        self._batch_sizes.append(len(val))
 
     def get(self) -> np.ndarray:
         """
-        Returns a flatten array of values
+        Returns a flatten array of values. When the batches are stored in the preallocated buffer,
+        the returned array is a view of the buffer, which is only valid until the next ``append``.
 
         Examples
         --------
@@ -127,19 +264,25 @@ class ArrayStore(Sequence):
         >>> array_store.get()
         [[90 91 92 93 94 95 96 97 98 99]]
         """
-        if len(self.arr) > 0:
-            self.arr = [np.concatenate(self.arr)]
-        return np.array(self.arr)
+        if self._list is not None:
+            if len(self._list) > 0:
+                self._list = [self._concatenate(self._list)]
+            return self._stack(self._list)
+        if self._buffer is None or len(self._batch_sizes) == 0:
+            return self._stack([])
+        return self._buffer[None, self._start : self._end]
 
     def __len__(self):
-        return len(self.arr)
+        if self._list is not None:
+            return len(self._list)
+        return len(self._batch_sizes)
 
     def __getitem__(self, i):
         return self.arr[i]
 
     def reset(self):
         """
-        Reset list of values to empty.
+        Reset list of values to empty. The preallocated buffer is kept to be reused.
 
         Examples
         --------
@@ -149,14 +292,79 @@ class ArrayStore(Sequence):
         ...     memory_limit=1000
         ... )
         >>> for i in range(100):
-        >>>     array_store.append(int(i))
-        >>> array_store.arr
-        [90, 91, 92, 93, 94, 95, 96, 97, 98, 99]
+        >>>     array_store.append(np.array([i]))
+        >>> len(array_store)
+        10
         >>> array_store.reset()
-        >>> array_store.arr
-        []
+        >>> len(array_store)
+        0
         """
-        self.arr = []
+        self._start = self._end = 0
+        self._batch_sizes.clear()
+        self._list = None
+
+
+class TensorStore(ArrayStore):
+    """
+    An ``ArrayStore`` for batches of ``torch.Tensor``, that are stored on the device of the first batch.
+    Appending a batch does not copy it to the host, nor synchronizes with the device.
+
+    Examples
+    --------
+    >>> from ablator.modules.metrics.stores import TensorStore
+    >>> tensor_store = TensorStore(batch_limit=10, memory_limit=1000)
+    >>> for i in range(100):
+    >>>     tensor_store.append(torch.tensor([i], device="cuda"))
+    >>> tensor_store.get()
+    tensor([[90, 91, 92, 93, 94, 95, 96, 97, 98, 99]], device='cuda:0')
+    """
+
+    def _check_value(self, val: ty.Any):
+        assert isinstance(
+            val, torch.Tensor
+        ), f"Invalid TensorStore value type {type(val)}"
+
+    def _is_batch(self, val: ty.Any) -> bool:
+        return val.ndim > 0 and (self._buffer is None or val.device == self._buffer.device)
+
+    def _value_nbytes(self, val: ty.Any) -> int:
+        return val.nbytes
+
+    def _empty(self, n_rows: int, like: ty.Any) -> ty.Any:
+        return torch.empty((n_rows, *like.shape[1:]), dtype=like.dtype, device=like.device)
+
+    def _promote(self, buffer: ty.Any, val: ty.Any) -> ty.Any:
+        if buffer.dtype != val.dtype:
+            return buffer.to(torch.promote_types(buffer.dtype, val.dtype))
+        return buffer
+
+    def _move_rows(self, start: int, end: int):
+        # the source and destination of a copy can not overlap.
+        assert self._buffer is not None
+        self._buffer[: end - start] = self._buffer[start:end].clone()
+
+    def _concatenate(self, values: list) -> ty.Any:
+        return torch.cat(values)
+
+    def _stack(self, values: list) -> ty.Any:
+        if len(values) == 0:
+            return torch.empty(0)
+        return torch.stack(values)
+
+    def _copy(self, val: ty.Any) -> ty.Any:
+        return val.clone()
+
+    def append(self, val: torch.Tensor):  # type: ignore[override]
+        """
+        Appends a batch of values, constrained on the limits. See ``ArrayStore.append``.
+
+        Parameters
+        ----------
+        val : torch.Tensor
+            The batch of values.
+        """
+        self._check_value(val)
+        super().append(val.detach())
 
 
 class PredictionStore:
@@ -172,6 +380,8 @@ class PredictionStore:
         memory_limit: int = int(1e8),
         moving_average_limit: int = 3000,
         evaluation_functions: dict[str, Callable] | None = None,
+        on_device: bool = False,
+        evaluation_intermediates: dict[str, Callable] | None = None,
     ):
         """
         Initialize the storage settings.
@@ -194,6 +404,20 @@ class PredictionStore:
             a batch looks like this: ``{"preds": <batch of predictions>, "labels": <batch of predicted labels>}``,
             then callable's arguments should be ``preds`` and ``labels``, e.g ``evaluation_functions=
             {"mean": lambda preds, labels: np.mean(preads) + np.mean(labels)}``. Default is None.
+            The arguments annotated as ``torch.Tensor`` receive the predictions as tensors, and the rest
+            as numpy arrays. An ``IncrementalMetric`` can be used in place of a function, in which case
+            it is updated with every appended batch instead of storing the predictions, and is computed over
+            every batch since the last ``reset`` rather than the last ``batch_limit`` batches.
+        on_device : bool, optional
+            Whether to store the predictions as tensors on the device they are appended from, in a ``TensorStore``.
+            The predictions are then copied to the host only when they are evaluated. Default is False.
+        evaluation_intermediates : dict[str, Callable], optional
+            A dictionary of intermediate values shared by the evaluation functions, keys are the intermediate names
+            and values are functions of the predictions or of other intermediates, e.g
+            ``{"pred_class": lambda preds: preds.argmax(-1)}``. An evaluation function (or another intermediate)
+            receives an intermediate by using its name as an argument, e.g ``lambda pred_class, labels: ...``.
+            Every intermediate is computed at most once per evaluation. The predictions an evaluation function
+            uses directly or through its intermediates must match the stored predictions. Default is None.
 
         Examples
         --------
@@ -214,11 +438,38 @@ class PredictionStore:
             else {}
         )
         self.__evaluation_functions__ = evaluation_functions
+        self.on_device = on_device
+        self.__evaluation_intermediates__ = (
+            {} if evaluation_intermediates is None else evaluation_intermediates
+        )
         self._keys: list[str] | None = None
+        # The signatures are inspected once. ``_fn_args`` are the arguments of every evaluation function,
+        # ``_tensor_args`` the arguments that receive tensors and ``_fn_predictions`` the predictions that
+        # an evaluation function uses directly or through the intermediates.
+        self._fn_args: dict[str, list[str]] = {}
+        self._tensor_args: dict[str, set[str]] = {}
+        self._intermediate_args: dict[str, list[str]] = {}
+        self._intermediate_tensor_args: dict[str, set[str]] = {}
+        for k, fn in self.__evaluation_intermediates__.items():
+            self._intermediate_args[k] = _arg_names(fn)
+            self._intermediate_tensor_args[k] = _tensor_arg_names(fn)
+        for k, fn in (evaluation_functions or {}).items():
+            fn = fn.update if isinstance(fn, IncrementalMetric) else fn
+            self._fn_args[k] = _arg_names(fn)
+            self._tensor_args[k] = _tensor_arg_names(fn)
+        self._fn_predictions: dict[str, list[str]] = {
+            k: sorted(self._predictions_of(args)) for k, args in self._fn_args.items()
+        }
+        self._incremental_states: dict[str, ty.Any] = {}
+        # the predictions are only stored when they are used by an evaluation function.
+        self._store_batches = evaluation_functions is None or any(
+            not isinstance(fn, IncrementalMetric) for fn in evaluation_functions.values()
+        )
 
     def _init_arr(self, tag):
         attr_name = f"__{tag}_arr__"
-        _arr = ArrayStore(batch_limit=self.limit, memory_limit=self.memory_limit)
+        store_class = TensorStore if self.on_device else ArrayStore
+        _arr = store_class(batch_limit=self.limit, memory_limit=self.memory_limit)
         setattr(self, attr_name, _arr)
         return getattr(self, attr_name)
 
@@ -258,6 +509,10 @@ class PredictionStore:
 
         """
         if self._keys is None:
+            shared_names = set(batches).intersection(self.__evaluation_intermediates__)
+            assert (
+                len(shared_names) == 0
+            ), f"Evaluation intermediates {sorted(shared_names)} have the same name as predictions."
             for k in batches:
                 self._init_arr(k)
             self._keys = sorted(list(batches.keys()))
@@ -266,18 +521,93 @@ class PredictionStore:
         assert self._keys == sorted(
             list(batches.keys())
         ), f"Missing keys from the prediction store update. Expected: {self._keys}, received {list(batches.keys())}"
+        arrs = {}
         for k, v in batches.items():
-            np_arr = butils.iter_to_numpy(v)
-            sizes[k] = len(np_arr)
-            self._get_arr(k).append(np_arr)
-            limits.append(self._get_arr(k).limit)
+            if self.on_device:
+                arr = torch.as_tensor(v)
+            else:
+                arr = butils.iter_to_numpy(v)
+            arrs[k] = arr
+            sizes[k] = len(arr)
+            if self._store_batches:
+                self._get_arr(k).append(arr)
+                limits.append(self._get_arr(k).limit)
         assert (
             len(set(sizes.values())) == 1
         ), f"Different number of batches between inputs. Sizes: {sizes}"
 
-        new_limit = min(limits)
-        for k in self._keys:
-            self._get_arr(k).limit = new_limit
+        if self._store_batches:
+            new_limit = min(limits)
+            for k in self._keys:
+                self._get_arr(k).limit = new_limit
+        self._update_incremental(arrs)
+
+    def _predictions_of(self, args: list[str], _visiting: tuple[str, ...] = ()) -> set[str]:
+        # the predictions used by the arguments directly or through the intermediates.
+        predictions = set()
+        for arg in args:
+            if arg in self.__evaluation_intermediates__:
+                assert (
+                    arg not in _visiting
+                ), f"Circular dependency of evaluation intermediate {arg}."
+                predictions |= self._predictions_of(
+                    self._intermediate_args[arg], _visiting + (arg,)
+                )
+            else:
+                predictions.add(arg)
+        return predictions
+
+    def _update_incremental(self, batches: dict[str, ty.Any]):
+        if self.__evaluation_functions__ is None:
+            return
+        cache: dict[tuple[str, str], ty.Any] = {}
+        for k, v in self.__evaluation_functions__.items():
+            if not isinstance(v, IncrementalMetric):
+                continue
+            state = v.update(**self._fn_batches(k, batches, cache))
+            if k in self._incremental_states:
+                state = v.merge(self._incremental_states[k], state)
+            self._incremental_states[k] = state
+
+    def _resolve(
+        self,
+        arg: str,
+        as_tensor: bool,
+        batches: dict[str, ty.Any],
+        cache: dict[tuple[str, str], ty.Any],
+    ) -> ty.Any:
+        # the predictions are converted to numpy or torch, and the intermediates are computed, once.
+        if arg in self.__evaluation_intermediates__:
+            key = ("intermediate", arg)
+            if key not in cache:
+                cache[key] = self.__evaluation_intermediates__[arg](
+                    **{
+                        a: self._resolve(
+                            a, a in self._intermediate_tensor_args[arg], batches, cache
+                        )
+                        for a in self._intermediate_args[arg]
+                    }
+                )
+            return cache[key]
+        key = ("tensor" if as_tensor else "numpy", arg)
+        if key not in cache:
+            if as_tensor:
+                cache[key] = torch.as_tensor(batches[arg])
+            else:
+                cache[key] = butils.iter_to_numpy(batches[arg])
+        return cache[key]
+
+    def _fn_batches(
+        self, name: str, batches: dict[str, ty.Any], cache: dict[tuple[str, str], ty.Any]
+    ) -> dict[str, ty.Any]:
+        fn_args = self._fn_predictions[name]
+        assert (
+            self._keys == fn_args
+        ), f"Evaluation function arguments {fn_args} different than stored predictions: {self._keys}"
+        return {
+            arg: self._resolve(arg, arg in self._tensor_args[name], batches, cache)
+            for arg in self._fn_args[name]
+        }
 
     def evaluate(self) -> dict[str, float]:
         """
@@ -311,18 +641,23 @@ class PredictionStore:
         """
         if self._keys is None:
             return {}
-        batches = {k: self._get_arr(k).get() for k in self._keys}
+        batches = (
+            {k: self._get_arr(k).get() for k in self._keys}
+            if self._store_batches
+            else {}
+        )
 
-        if self.__evaluation_functions__ is None or len(batches) == 0:
+        if self.__evaluation_functions__ is None or len(self._keys) == 0:
             return {}
+        cache: dict[tuple[str, str], ty.Any] = {}
         metrics = {}
         for k, v in self.__evaluation_functions__.items():
-            fn_args = sorted(list(inspect.getfullargspec(v)[0]))
-
-            assert (
-                self._keys == fn_args
-            ), f"Evaluation function arguments {fn_args} different than stored predictions: {self._keys}"
-            metric = v(**batches)
+            if isinstance(v, IncrementalMetric):
+                if k not in self._incremental_states:
+                    continue
+                metric = v.compute(self._incremental_states[k])
+            else:
+                metric = v(**self._fn_batches(k, batches, cache))
             if isinstance(metric, torch.Tensor):
                 metric = metric.item()
             metrics[k] = metric
@@ -330,13 +665,14 @@ class PredictionStore:
                 self.metrics[k].append(metric)
             except Exception as exc:
                 raise ValueError(
-                    f"Invalid value {metric} returned by evaluation function {v.__name__}. Must be numeric scalar."
+                    f"Invalid value {metric} returned by evaluation function "
+                    f"{getattr(v, '__name__', type(v).__name__)}. Must be numeric scalar."
                 ) from exc
         return metrics
 
     def reset(self):
         """
-        Reset to empty all prediction sequences (e.g predictions, labels).
+        Reset to empty all prediction sequences (e.g predictions, labels) and the states of the incremental metrics.
 
         Examples
         --------
@@ -350,28 +686,125 @@ class PredictionStore:
         >>> pred_store.append(preds=np.array([4,3,0]), labels=np.array([5,1,3]))
         >>> pred_store.reset()
         """
+        self._incremental_states = {}
         if self._keys is None:
             return
         for k in self._keys:
             self._get_arr(k).reset()
 
 
+def _arg_names(fn: Callable) -> list[str]:
+    args = list(inspect.getfullargspec(fn)[0])
+    if inspect.ismethod(fn):
+        args = args[1:]
+    return args
+
+
+def _tensor_arg_names(fn: Callable) -> set[str]:
+    try:
+        parameters = inspect.signature(fn).parameters
+    except (TypeError, ValueError):
+        return set()
+    return {
+        name
+        for name, param in parameters.items()
+        if param.annotation is torch.Tensor
+        or param.annotation in {"torch.Tensor", "Tensor"}
+    }
+
+
 class MovingAverage(ArrayStore):
     """
-    This class is used to store moving average metrics
-
+    This class is used to store moving average metrics. The values are stored in a ring buffer of
+    at most ``limit`` values, which grows as values are appended. The running sum and sum of squared
+    deviations (Welford) of the finite values, and the number of ``nan``, ``inf`` and ``-inf`` values, are
+    updated with every value, such that appending a value and reading the mean or the variance of the window
+    are O(1). As with ``np.mean``, the mean of a window with non-finite values is ``nan`` or ``+-inf``.
+
+    Attributes
+    ----------
+    limit : int
+        The maximum number of values in the window, i.e. the smallest of ``batch_limit`` and the number
+        of ``float64`` values that fit in ``memory_limit`` bytes.
+    memory_limit : int or None
+        The maximum memory allowed for the values in bytes.
     """
 
+    # pylint: disable=super-init-not-called
+    def __init__(
+        self,
+        batch_limit: int = 30,
+        # 100 MB memory limit
+        memory_limit: int | None = int(1e8),
+    ):
+        """
+        Initialize the moving average window.
+
+        Parameters
+        ----------
+        batch_limit : int, optional
+            The maximum number of values in the window. Default is 30.
+        memory_limit : int or None, optional
+            The maximum memory allowed for the values in bytes. Default is 1e8.
+        """
+        self.memory_limit = memory_limit
+        self.limit = batch_limit
+        if memory_limit is not None:
+            self.limit = min(batch_limit, int(memory_limit // np.float64().itemsize))
+        self.limit = max(self.limit, 1)
+        # the buffer grows up to ``limit`` values as they are appended.
+        self._buffer = np.empty(min(self.limit, 16), dtype=np.float64)
+        self.reset()
+
+    @property
+    def arr(self) -> np.ndarray:
+        """
+        The values of the window, from the oldest to the most recent.
+        """
+        if self._count < self.limit:
+            return self._buffer[: self._count]
+        return np.concatenate(
+            [self._buffer[self._next :], self._buffer[: self._next]]
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The memory of the values in the window in bytes.
+        """
+        return self._buffer[: self._count].nbytes
+
+    @property
+    def _n_nonfinite(self) -> int:
+        return self._n_nan + self._n_pos_inf + self._n_neg_inf
+
     @property
     def __mean__(self):
-        return np.mean(self.arr)
+        if self._n_nan > 0 or (self._n_pos_inf > 0 and self._n_neg_inf > 0):
+            return np.nan
+        if self._n_pos_inf > 0:
+            return np.inf
+        if self._n_neg_inf > 0:
+            return -np.inf
+        return self._sum / self._count
 
     @property
     def value(self):
-        if len(self.arr) > 0:
+        if self._count > 0:
             return self.__mean__
         return np.nan
 
+    @property
+    def variance(self) -> float:
+        """
+        The population variance of the values in the window, ``np.nan`` when empty.
+        """
+        if self._count == 0:
+            return np.nan
+        if self._n_nonfinite > 0:
+            return np.nan
+        return max(self._sq_dev, 0.0) / self._count
+
     def __lt__(self, __o: float) -> bool:
         return float(self.value).__lt__(__o)
 
@@ -387,6 +820,50 @@ class MovingAverage(ArrayStore):
     def __repr__(self) -> str:
         return f"{self.value:.2e}"
 
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        return self.arr[i]
+
+    def _recompute(self):
+        # exact statistics of the window, to remove the accumulated rounding errors.
+        window = self._buffer[: self._count]
+        finite = window[np.isfinite(window)]
+        self._n_nan = int(np.isnan(window).sum())
+        self._n_pos_inf = int(np.isposinf(window).sum())
+        self._n_neg_inf = int(np.isneginf(window).sum())
+        if len(finite) == 0:
+            self._sum = 0.0
+            self._sq_dev = 0.0
+            return
+        self._sum = float(np.sum(finite))
+        self._sq_dev = float(np.sum((finite - self._sum / len(finite)) ** 2))
+
+    def _count_nonfinite(self, x: float, n: int):
+        if math.isnan(x):
+            self._n_nan += n
+        elif x > 0:
+            self._n_pos_inf += n
+        else:
+            self._n_neg_inf += n
+
+    def _add_finite(self, x: float, n_finite: int):
+        # ``n_finite`` is the number of finite values before ``x`` is added.
+        old_mean = self._sum / n_finite if n_finite > 0 else 0.0
+        self._sum += x
+        self._sq_dev += (x - old_mean) * (x - self._sum / (n_finite + 1))
+
+    def _remove_finite(self, x: float, n_finite: int):
+        # ``n_finite`` is the number of finite values before ``x`` is removed.
+        if n_finite == 1:
+            self._sum = 0.0
+            self._sq_dev = 0.0
+            return
+        old_mean = self._sum / n_finite
+        self._sum -= x
+        self._sq_dev -= (x - old_mean) * (x - self._sum / (n_finite - 1))
+
     def append(self, val: ty.Union[np.ndarray, torch.Tensor, float, int]):
         """
         Appends a batch of values, or a single value, constrained on the limits.
@@ -408,8 +885,9 @@ class MovingAverage(ArrayStore):
         >>> for i in range(100):
         >>>     ma_store.append(np.array([int(i)]))
         >>> ma_store.arr
-        [70, 71, 72, 73, 74, 75, 76, 77, 78, 79, 80, 81, 82, 83, 84, 85,
-        86, 87, 88, 89, 90, 91, 92, 93, 94, 95, 96, 97, 98, 99]
+        array([70., 71., 72., 73., 74., 75., 76., 77., 78., 79., 80., 81., 82.,
+               83., 84., 85., 86., 87., 88., 89., 90., 91., 92., 93., 94., 95.,
+               96., 97., 98., 99.])
         """
         if not isinstance(val, (np.ndarray, torch.Tensor, int, float)):
             raise ValueError(f"Invalid MovingAverage value type {type(val)}")
@@ -421,4 +899,45 @@ class MovingAverage(ArrayStore):
                 raise ValueError(f"MovingAverage value must be scalar. {val}") from exc
         else:
             scalar = val
-        super().append(scalar)
+        x = float(scalar)
+        is_full = self._count == self.limit
+        if not is_full and self._count == len(self._buffer):
+            buffer = np.empty(min(2 * len(self._buffer), self.limit), dtype=np.float64)
+            buffer[: self._count] = self._buffer[: self._count]
+            self._buffer = buffer
+        n_finite = self._count - self._n_nonfinite
+        if is_full:
+            old_val = float(self._buffer[self._next])
+            if math.isfinite(old_val):
+                self._remove_finite(old_val, n_finite)
+                n_finite -= 1
+            else:
+                self._count_nonfinite(old_val, -1)
+        if math.isfinite(x):
+            self._add_finite(x, n_finite)
+        else:
+            self._count_nonfinite(x, 1)
+        self._buffer[self._next] = x
+        self._next = (self._next + 1) % self.limit
+        if not is_full:
+            self._count += 1
+        if self._next == 0:
+            self._recompute()
+
+    def get(self) -> np.ndarray:
+        """
+        Returns the values of the window, from the oldest to the most recent.
+        """
+        return self.arr
+
+    def reset(self):
+        """
+        Reset the window to empty.
+        """
+        self._next = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sq_dev = 0.0
+        self._n_nan = 0
+        self._n_pos_inf = 0
+        self._n_neg_inf = 0
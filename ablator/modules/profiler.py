@@ -0,0 +1,382 @@
+import contextlib
+import math
+import time
+import typing as ty
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from ablator.config.main import ConfigBase, configclass
+from ablator.config.types import List, Optional
+
+# The upper edges of the bins of the phase histograms, in milliseconds.
+HISTOGRAM_EDGES_MS: list[float] = [2.0**k for k in range(-4, 17)]
+
+
+class _Phase:
+    def __init__(self, timer: "StepTimer", name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.timer._start(self.name)  # pylint: disable=protected-access
+
+    def __exit__(self, *args):
+        self.timer._stop()  # pylint: disable=protected-access
+
+
+class _PhaseStats:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.histogram = np.zeros(len(HISTOGRAM_EDGES_MS) + 1, dtype=np.int64)
+        self.window_count = 0
+        self.window_total_ms = 0.0
+        self.cuda_total_ms = 0.0
+        self.window_cuda_count = 0
+        self.window_cuda_total_ms = 0.0
+
+    def add(self, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.window_count += 1
+        self.window_total_ms += elapsed_ms
+        # ``elapsed_ms`` is in [2 ** (exponent - 1), 2 ** exponent)
+        _, exponent = math.frexp(elapsed_ms)
+        self.histogram[min(max(exponent + 4, 0), len(self.histogram) - 1)] += 1
+
+    def add_cuda(self, elapsed_ms: float):
+        self.cuda_total_ms += elapsed_ms
+        self.window_cuda_count += 1
+        self.window_cuda_total_ms += elapsed_ms
+
+    def percentile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        idx = int(np.searchsorted(np.cumsum(self.histogram), q * self.count))
+        edges = HISTOGRAM_EDGES_MS + [math.inf]
+        return edges[min(idx, len(edges) - 1)]
+
+
+class StepTimer:
+    """
+    Records the wall time spent in every phase of the training loop, i.e. fetching the data, the forward
+    and backward passes or logging. The phases can be nested, and the time of a phase excludes the time of the
+    phases nested in it, such that no time is counted in two phases.
+
+    The time of every phase is aggregated into a histogram with logarithmic bins, from which ``summary``
+    estimates the percentiles. ``metrics`` returns the mean time of every phase since it was last called,
+    which ``ModelWrapper`` logs as static metrics at every log step.
+
+    When ``cuda`` is set, the phases additionally record cuda events, such that the time the device spends
+    on the work of a phase is measured without synchronizing the device. The events are read back by
+    ``metrics`` and ``summary``. Unlike the wall time, the cuda time of a phase includes its nested phases.
+
+    Attributes
+    ----------
+    PHASES : tuple[str, ...]
+        The phases of the training loop.
+    enabled : bool
+        Whether the phases are timed. When disabled, ``phase`` returns a context that does nothing.
+    cuda : bool
+        Whether the phases record cuda events.
+
+    Examples
+    --------
+    >>> timer = StepTimer()
+    >>> with timer.phase("forward"):
+    ...     out = model(batch)
+    >>> timer.metrics()["step_forward_ms"]
+    """
+
+    PHASES: tuple[str, ...] = (
+        "data",
+        "to_device",
+        "forward",
+        "backward",
+        "metrics",
+        "status",
+        "log",
+        "eval",
+    )
+
+    def __init__(self, enabled: bool = True, cuda: bool = False):
+        """
+        Initialize the timer.
+
+        Parameters
+        ----------
+        enabled : bool, optional
+            Whether the phases are timed, by default ``True``.
+        cuda : bool, optional
+            Whether the phases record cuda events, by default ``False``.
+        """
+        self.enabled = enabled
+        self.cuda = cuda and enabled and torch.cuda.is_available()
+        self._null_phase = contextlib.nullcontext()
+        self._phases = {name: _Phase(self, name) for name in self.PHASES}
+        self._stats = {name: _PhaseStats() for name in self.PHASES}
+        # the name, start time, time of the nested phases and start cuda event of every active phase.
+        self._stack: list[list[ty.Any]] = []
+        self._pending_cuda_events: list[tuple[str, torch.cuda.Event, torch.cuda.Event]] = []
+
+    @classmethod
+    def metric_names(cls, cuda: bool = True) -> list[str]:
+        """
+        The names of the metrics returned by ``metrics``.
+
+        Parameters
+        ----------
+        cuda : bool, optional
+            Whether to include the names of the cuda time metrics, by default ``True``.
+
+        Returns
+        -------
+        list[str]
+            The names of the metrics.
+        """
+        names = [f"step_{name}_ms" for name in cls.PHASES]
+        if cuda:
+            names += [f"step_{name}_cuda_ms" for name in cls.PHASES]
+        return names
+
+    def phase(self, name: str) -> ty.ContextManager:
+        """
+        A context that times a phase.
+
+        Parameters
+        ----------
+        name : str
+            The name of the phase, one of ``PHASES``.
+
+        Returns
+        -------
+        ty.ContextManager
+            The context of the phase.
+        """
+        if not self.enabled:
+            return self._null_phase
+        return self._phases[name]
+
+    def _start(self, name: str):
+        start_event = None
+        if self.cuda:
+            start_event = torch.cuda.Event(enable_timing=True)
+            start_event.record()
+        self._stack.append([name, time.perf_counter(), 0.0, start_event])
+
+    def _stop(self):
+        name, start, nested_time, start_event = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        if len(self._stack) > 0:
+            self._stack[-1][2] += elapsed
+        self._stats[name].add((elapsed - nested_time) * 1000)
+        if start_event is not None:
+            end_event = torch.cuda.Event(enable_timing=True)
+            end_event.record()
+            self._pending_cuda_events.append((name, start_event, end_event))
+
+    def _read_cuda_events(self):
+        if len(self._pending_cuda_events) == 0:
+            return
+        self._pending_cuda_events[-1][2].synchronize()
+        for name, start_event, end_event in self._pending_cuda_events:
+            self._stats[name].add_cuda(start_event.elapsed_time(end_event))
+        self._pending_cuda_events = []
+
+    def metrics(self) -> dict[str, float]:
+        """
+        The mean time of every phase in milliseconds, since the last time the metrics were returned.
+
+        Returns
+        -------
+        dict[str, float]
+            The mean time of every phase, named as ``step_{phase}_ms`` and ``step_{phase}_cuda_ms``,
+            or an empty dictionary when the timer is disabled.
+        """
+        if not self.enabled:
+            return {}
+        self._read_cuda_events()
+        metrics = {}
+        for name, stats in self._stats.items():
+            metrics[f"step_{name}_ms"] = stats.window_total_ms / max(stats.window_count, 1)
+            stats.window_count = 0
+            stats.window_total_ms = 0.0
+        if self.cuda:
+            for name, stats in self._stats.items():
+                metrics[f"step_{name}_cuda_ms"] = stats.window_cuda_total_ms / max(
+                    stats.window_cuda_count, 1
+                )
+                stats.window_cuda_count = 0
+                stats.window_cuda_total_ms = 0.0
+        return metrics
+
+    def to_dict(self) -> dict[str, dict[str, float]]:
+        """
+        The statistics of every phase that was timed since the timer was created.
+
+        Returns
+        -------
+        dict[str, dict[str, float]]
+            The number of times every phase was timed (``count``), its total time (``total_ms``), its mean
+            and estimated median and 90th percentile times (``mean_ms``, ``p50_ms``, ``p90_ms``), its
+            share of the total time (``share``) and, when ``cuda`` is set, its total cuda time (``cuda_total_ms``).
+        """
+        self._read_cuda_events()
+        total_ms = sum(stats.total_ms for stats in self._stats.values())
+        phases = {}
+        for name, stats in self._stats.items():
+            if stats.count == 0:
+                continue
+            phases[name] = {
+                "count": stats.count,
+                "total_ms": stats.total_ms,
+                "mean_ms": stats.total_ms / stats.count,
+                "p50_ms": stats.percentile(0.5),
+                "p90_ms": stats.percentile(0.9),
+                "share": stats.total_ms / max(total_ms, 1e-12),
+            }
+            if self.cuda:
+                phases[name]["cuda_total_ms"] = stats.cuda_total_ms
+        return phases
+
+    def summary(self) -> str:
+        """
+        A table with the statistics of every phase, as returned by ``to_dict``.
+
+        Returns
+        -------
+        str
+            The summary table.
+        """
+        header = (
+            f"{'phase':<10} {'count':>8} {'total s':>10} {'mean ms':>10} "
+            f"{'p50 ms':>10} {'p90 ms':>10} {'share':>7}"
+        )
+        if self.cuda:
+            header += f" {'cuda s':>10}"
+        lines = [header]
+        for name, stats in self.to_dict().items():
+            line = (
+                f"{name:<10} {stats['count']:>8} {stats['total_ms'] / 1000:>10.3f} "
+                f"{stats['mean_ms']:>10.3f} {stats['p50_ms']:>10.3f} "
+                f"{stats['p90_ms']:>10.3f} {stats['share']:>7.1%}"
+            )
+            if self.cuda:
+                line += f" {stats['cuda_total_ms'] / 1000:>10.3f}"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+@configclass
+class ProfilerConfig(ConfigBase):
+    """
+    Configuration of the ``torch.profiler`` traces of the training loop. The profiler skips ``wait`` training
+    iterations, warms up for ``warmup`` iterations and then records ``active`` iterations, and repeats the
+    cycle ``repeat`` times. The trace of every cycle is written to the dashboard directory of the trial and
+    the ``top_k`` operators are written to the log of the trial.
+
+    Attributes
+    ----------
+    wait : int
+        The number of iterations skipped at the start of every cycle.
+    warmup : int
+        The number of iterations the profiler runs without recording at the start of every cycle.
+    active : int
+        The number of iterations recorded in every cycle.
+    repeat : int
+        The number of cycles. ``0`` repeats the cycles until training ends.
+    trial_uids : Optional[List[str]]
+        The ``uid`` of the trials to profile. All the trials are profiled when ``None``.
+    record_shapes : bool
+        Whether to record the shapes of the operator inputs.
+    profile_memory : bool
+        Whether to record the memory allocated by the operators.
+    with_stack : bool
+        Whether to record the source of the operators.
+    top_k : int
+        The number of operators in the table written to the log.
+    sort_by : str
+        The column of the operator table that the operators are sorted by, i.e. ``"self_cpu_time_total"``.
+    """
+
+    wait: int = 1
+    warmup: int = 1
+    active: int = 3
+    repeat: int = 1
+    trial_uids: Optional[List[str]] = None
+    record_shapes: bool = False
+    profile_memory: bool = False
+    with_stack: bool = False
+    top_k: int = 20
+    sort_by: str = "self_cpu_time_total"
+
+    def should_profile(self, uid: str) -> bool:
+        """
+        Whether a trial is profiled.
+
+        Parameters
+        ----------
+        uid : str
+            The ``uid`` of the trial.
+
+        Returns
+        -------
+        bool
+            Whether the trial is profiled.
+        """
+        return self.trial_uids is None or uid in self.trial_uids
+
+    def make_profiler(
+        self,
+        trace_dir: Path | None,
+        log_fn: Callable[[str], ty.Any],
+        cuda: bool = False,
+    ) -> torch.profiler.profile:
+        """
+        Create the profiler. ``step()`` of the profiler must be called after every training iteration.
+
+        Parameters
+        ----------
+        trace_dir : Path | None
+            The directory the traces are written to. The traces are not written when ``None``.
+        log_fn : Callable[[str], ty.Any]
+            Called with the operator table of every cycle.
+        cuda : bool, optional
+            Whether to profile the cuda kernels, by default ``False``.
+
+        Returns
+        -------
+        torch.profiler.profile
+            The profiler.
+        """
+        write_trace = None
+        if trace_dir is not None:
+            write_trace = torch.profiler.tensorboard_trace_handler(
+                Path(trace_dir).as_posix()
+            )
+
+        def on_trace_ready(prof: torch.profiler.profile):
+            if write_trace is not None:
+                write_trace(prof)
+            table = prof.key_averages().table(sort_by=self.sort_by, row_limit=self.top_k)
+            log_fn(f"Profiler step {prof.step_num}:\n{table}")
+
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if cuda:
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+        return torch.profiler.profile(
+            activities=activities,
+            schedule=torch.profiler.schedule(
+                wait=self.wait,
+                warmup=self.warmup,
+                active=self.active,
+                repeat=self.repeat,
+            ),
+            on_trace_ready=on_trace_ready,
+            record_shapes=self.record_shapes,
+            profile_memory=self.profile_memory,
+            with_stack=self.with_stack,
+        )
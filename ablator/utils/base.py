@@ -24,6 +24,12 @@ class Dummy(FileLogger):
     def __getitem__(self, *args, **kwargs):
         return self
 
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
 
 def iter_to_numpy(iterable):
     """
@@ -46,7 +52,7 @@ def iter_to_numpy(iterable):
 
 
 def iter_to_device(
-    data_dict, device
+    data_dict, device, non_blocking: bool = False
 ) -> ty.Union[Sequence[torch.Tensor], dict[str, torch.Tensor]]:
     """
     Moving torch.Tensor elements to the specified device.
@@ -57,6 +63,8 @@ def iter_to_device(
         The input dictionary or list containing torch.Tensor elements.
     device : torch.device | str
         The target device for the tensors.
+    non_blocking : bool, optional
+        Whether to copy asynchronously with respect to the host, when possible, by default ``False``.
 
     Returns
     -------
@@ -64,7 +72,10 @@ def iter_to_device(
         The input data with tensors moved to the target device.
     """
     return apply_lambda_to_iter(
-        data_dict, lambda v: v.to(device) if isinstance(v, torch.Tensor) else v
+        data_dict,
+        lambda v: v.to(device, non_blocking=non_blocking)
+        if isinstance(v, torch.Tensor)
+        else v,
     )
 
 
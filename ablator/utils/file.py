@@ -1,12 +1,24 @@
 import copy
+import hashlib
+import inspect
 import json
+import os
+import queue
+import shutil
+import threading
 import typing as ty
+from collections.abc import Callable
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
 import torch
 
+SHARD_INDEX_NAME = "index.json"
+# tensors smaller than this are stored inside the index file of a deduplicated checkpoint.
+BLOB_MIN_BYTES = 4096
+_TORCH_LOAD_MMAP = "mmap" in inspect.signature(torch.load).parameters
+
 
 def make_sub_dirs(parent: str | Path, *dir_names) -> list[Path]:
     """
@@ -32,9 +44,29 @@ def make_sub_dirs(parent: str | Path, *dir_names) -> list[Path]:
     return dirs
 
 
-def save_checkpoint(state, filename="checkpoint.pt"):
+class _HashWriter:
+    def __init__(self, file: ty.BinaryIO):
+        self.file = file
+        self.size = 0
+        self._hash = hashlib.md5()
+
+    def write(self, data: bytes) -> int:
+        self._hash.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def save_checkpoint(state, filename="checkpoint.pt") -> dict[str, ty.Any]:
     """
-    Save a checkpoint of the given state.
+    Save a checkpoint of the given state. The checkpoint is first written to a temporary
+    file in the same directory, which is then renamed to ``filename``, such that a
+    checkpoint file is never partially written.
 
     Parameters
     ----------
@@ -42,28 +74,416 @@ def save_checkpoint(state, filename="checkpoint.pt"):
         Model State dictionary to save.
     filename : str, optional
         The name of the checkpoint file, by default "checkpoint.pt".
+
+    Returns
+    -------
+    dict[str, ty.Any]
+        The manifest entry of the checkpoint, with its ``size`` in bytes and ``md5`` hash,
+        computed while it is written. It can be used with ``verify_checkpoint``.
+    """
+    file_path = Path(filename)
+    tmp_path = file_path.with_name(f".{file_path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        writer = _HashWriter(f)
+        torch.save(state, writer)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+    return {"size": writer.size, "md5": writer.hexdigest()}
+
+
+def save_sharded_checkpoint(state: dict, filename="checkpoint.pt") -> dict[str, ty.Any]:
+    """
+    Save a checkpoint as a directory with a separate shard file for every top-level key of
+    ``state``, such that the keys can be loaded independently with ``load_checkpoint``. The
+    directory is first written under a temporary name and then renamed to ``filename``.
+
+    Parameters
+    ----------
+    state : dict
+        Model State dictionary to save.
+    filename : str, optional
+        The name of the checkpoint directory, by default "checkpoint.pt".
+
+    Returns
+    -------
+    dict[str, ty.Any]
+        The manifest entry of the checkpoint, with its total ``size`` in bytes and the manifest
+        entry of every shard under ``shards``. It can be used with ``verify_checkpoint``.
     """
-    torch.save(state, filename)
+    assert isinstance(state, dict), "A sharded checkpoint can only be saved from a dictionary."
+    dir_path = Path(filename)
+    tmp_path = dir_path.with_name(f".{dir_path.name}.tmp")
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    tmp_path.mkdir(parents=True)
+    index = {}
+    shards = {}
+    for i, (k, v) in enumerate(state.items()):
+        shard_name = f"{i:04d}.pt"
+        index[k] = shard_name
+        shards[shard_name] = save_checkpoint(v, tmp_path.joinpath(shard_name))
+    tmp_path.joinpath(SHARD_INDEX_NAME).write_text(json.dumps(index), encoding="utf-8")
+    os.replace(tmp_path, dir_path)
+    return {"size": sum(v["size"] for v in shards.values()), "shards": shards}
+
+
+class _BlobRef(ty.NamedTuple):
+    # the path of a tensor blob, relative to the directory of the checkpoint index.
+    path: str
+
+
+def _map_tensors(state: ty.Any, fn: Callable) -> ty.Any:
+    if isinstance(state, (torch.Tensor, _BlobRef)):
+        return fn(state)
+    if isinstance(state, dict):
+        return type(state)((k, _map_tensors(v, fn)) for k, v in state.items())
+    if isinstance(state, list):
+        return [_map_tensors(v, fn) for v in state]
+    if isinstance(state, tuple) and not hasattr(state, "_fields"):
+        return tuple(_map_tensors(v, fn) for v in state)
+    return state
+
+
+def _tensor_digest(tensor: torch.Tensor) -> str:
+    _hash = hashlib.blake2b(digest_size=20)
+    _hash.update(f"{tensor.dtype}{tuple(tensor.shape)}".encode())
+    _hash.update(tensor.reshape(-1).view(torch.uint8).numpy())
+    return _hash.hexdigest()
 
 
-def clean_checkpoints(checkpoint_folder: Path, n_checkpoints: int):
+def save_dedup_checkpoint(
+    state: ty.Any, filename="checkpoint.pt", blob_dir: str | Path = "blobs"
+) -> dict[str, ty.Any]:
+    """
+    Save a checkpoint where the tensors are stored as content-addressed blobs in ``blob_dir``
+    and the checkpoint file is a small index that references them. A tensor that is identical to
+    a tensor of a previous checkpoint, e.g. the same state saved as the best and the most recent
+    checkpoint, or a parameter that did not change between two checkpoints, is not written again.
+
+    Parameters
+    ----------
+    state : ty.Any
+        Model State dictionary to save.
+    filename : str, optional
+        The name of the checkpoint index file, by default "checkpoint.pt".
+    blob_dir : str | Path, optional
+        The directory of the tensor blobs, shared by all the checkpoints to deduplicate, by default "blobs".
+
+    Returns
+    -------
+    dict[str, ty.Any]
+        The manifest entry of the checkpoint index, with its ``size`` in bytes and ``md5`` hash, and
+        the size of every blob it references under ``blobs``. It can be used with ``verify_checkpoint``.
+
+    Notes
+    -----
+    Blobs that are no longer referenced by any checkpoint are removed with ``clean_checkpoint_blobs``.
+    """
+    file_path = Path(filename)
+    blob_dir = Path(blob_dir)
+    blob_dir.mkdir(parents=True, exist_ok=True)
+    blobs: dict[str, int] = {}
+
+    def _to_blob(tensor: torch.Tensor) -> torch.Tensor | _BlobRef:
+        tensor = tensor.detach().to("cpu").contiguous()
+        if tensor.is_sparse or tensor.element_size() * tensor.numel() < BLOB_MIN_BYTES:
+            return tensor
+        blob_path = blob_dir.joinpath(f"{_tensor_digest(tensor)}.pt")
+        if not blob_path.exists():
+            if tensor.untyped_storage().nbytes() != tensor.element_size() * tensor.numel():
+                # a view would otherwise save the whole storage it belongs to.
+                tensor = tensor.clone()
+            save_checkpoint(tensor, blob_path)
+        rel_path = Path(os.path.relpath(blob_path, file_path.parent)).as_posix()
+        blobs[rel_path] = blob_path.stat().st_size
+        return _BlobRef(rel_path)
+
+    index = _map_tensors(state, _to_blob)
+    manifest_entry = save_checkpoint(index, file_path)
+    manifest_entry["blobs"] = blobs
+    return manifest_entry
+
+
+def clean_checkpoint_blobs(
+    blob_dir: str | Path, checkpoint_paths: ty.Iterable[str | Path]
+) -> list[Path]:
+    """
+    Remove the blobs of ``blob_dir`` that are not referenced by any of the given deduplicated checkpoints.
+
+    Parameters
+    ----------
+    blob_dir : str | Path
+        The directory of the tensor blobs.
+    checkpoint_paths : ty.Iterable[str | Path]
+        All the checkpoints that are kept and can reference blobs of ``blob_dir``.
+
+    Returns
+    -------
+    list[Path]
+        The removed blobs.
+    """
+    referenced: set[Path] = set()
+
+    def _add_ref(v: ty.Any, parent: Path):
+        if isinstance(v, _BlobRef):
+            referenced.add(parent.joinpath(v.path).resolve())
+        return v
+
+    for chkpt in checkpoint_paths:
+        chkpt = Path(chkpt)
+        if chkpt.is_file():
+            _map_tensors(_torch_load(chkpt), lambda v, p=chkpt.parent: _add_ref(v, p))
+    removed = []
+    for blob_path in Path(blob_dir).glob("*.pt"):
+        if blob_path.resolve() not in referenced:
+            blob_path.unlink(missing_ok=True)
+            removed.append(blob_path)
+    return removed
+
+
+def load_checkpoint(
+    filename: str | Path,
+    keys: list[str] | None = None,
+    exclude_keys: ty.Sequence[str] | None = None,
+) -> dict[str, ty.Any]:
+    """
+    Load a checkpoint saved by ``save_checkpoint``, ``save_sharded_checkpoint`` or ``save_dedup_checkpoint``
+    to CPU memory. For sharded and deduplicated checkpoints, only the shards or the blobs of the requested
+    keys are read. A single-file checkpoint is always deserialized entirely and the keys are selected afterwards,
+    unless ``torch.load`` supports memory-mapping (``torch>=2.1``), in which case the tensors that are not used
+    are not read from the disk.
+
+    Parameters
+    ----------
+    filename : str | Path
+        The checkpoint file or directory.
+    keys : list[str] | None, optional
+        The top-level keys to load, by default ``None`` which loads all the keys. Only the sharded and
+        deduplicated checkpoints skip reading the rest of the keys.
+    exclude_keys : ty.Sequence[str] | None, optional
+        The top-level keys to skip, by default ``None``. Only the sharded and deduplicated checkpoints skip
+        reading them.
+
+    Returns
+    -------
+    dict[str, ty.Any]
+        The loaded save dictionary.
+    """
+    file_path = Path(filename)
+    exclude_keys = [] if exclude_keys is None else exclude_keys
+    if file_path.is_dir():
+        index = json.loads(
+            file_path.joinpath(SHARD_INDEX_NAME).read_text(encoding="utf-8")
+        )
+        return {
+            k: _torch_load(file_path.joinpath(shard_name))
+            for k, shard_name in index.items()
+            if (keys is None or k in keys) and k not in exclude_keys
+        }
+    save_dict = _torch_load(file_path)
+    return {
+        k: _map_tensors(
+            v,
+            lambda t: _torch_load(file_path.parent.joinpath(t.path))
+            if isinstance(t, _BlobRef)
+            else t,
+        )
+        for k, v in save_dict.items()
+        if (keys is None or k in keys) and k not in exclude_keys
+    }
+
+
+def _torch_load(file_path: Path) -> ty.Any:
+    if _TORCH_LOAD_MMAP:
+        try:
+            return torch.load(str(file_path), map_location="cpu", mmap=True)
+        except RuntimeError:
+            # checkpoints in the legacy serialization format can not be memory-mapped.
+            pass
+    return torch.load(file_path, map_location="cpu")
+
+
+def verify_checkpoint(filename: str | Path, manifest_entry: dict[str, ty.Any]) -> bool:
+    """
+    Verify that a checkpoint matches the size and hash recorded when it was saved,
+    without deserializing it.
+
+    Parameters
+    ----------
+    filename : str | Path
+        The checkpoint file or directory.
+    manifest_entry : dict[str, ty.Any]
+        The manifest entry returned by ``save_checkpoint``, ``save_sharded_checkpoint`` or
+        ``save_dedup_checkpoint``. The blobs of a deduplicated checkpoint are only checked for their size.
+
+    Returns
+    -------
+    bool
+        Whether the checkpoint is complete and unmodified.
+    """
+    file_path = Path(filename)
+    if "shards" in manifest_entry:
+        return file_path.is_dir() and all(
+            verify_checkpoint(file_path.joinpath(shard_name), shard_entry)
+            for shard_name, shard_entry in manifest_entry["shards"].items()
+        )
+    if not file_path.exists() or file_path.stat().st_size != manifest_entry["size"]:
+        return False
+    for blob_path, blob_size in manifest_entry.get("blobs", {}).items():
+        blob_path = file_path.parent.joinpath(blob_path)
+        if not blob_path.exists() or blob_path.stat().st_size != blob_size:
+            return False
+    _hash = hashlib.md5()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(2**24):
+            _hash.update(chunk)
+    return _hash.hexdigest() == manifest_entry["md5"]
+
+
+def copy_to_cpu(state: ty.Any) -> ty.Any:
+    """
+    Make a copy of a (nested) state, where all tensors are copied to CPU memory. The copy
+    does not share memory with the original state, which can be modified while the copy is saved.
+
+    Parameters
+    ----------
+    state : ty.Any
+        The state to copy, i.e. a ``dict``, ``list`` or ``tuple`` that can contain ``torch.Tensor``.
+
+    Returns
+    -------
+    ty.Any
+        The copy of the state.
+    """
+    if isinstance(state, torch.Tensor):
+        return state.detach().to("cpu", copy=True)
+    if isinstance(state, dict):
+        return {k: copy_to_cpu(v) for k, v in state.items()}
+    if isinstance(state, tuple) and hasattr(state, "_fields"):
+        return type(state)(*[copy_to_cpu(v) for v in state])
+    if isinstance(state, (list, tuple)):
+        return type(state)(copy_to_cpu(v) for v in state)
+    return copy.deepcopy(state)
+
+
+class AsyncCheckpointWriter:
+    """
+    Runs checkpoint writing functions in a background thread, in the order they are submitted.
+
+    Attributes
+    ----------
+    max_pending : int
+        Maximum number of submitted writes that are waiting to be executed. ``submit`` blocks
+        when the limit is reached.
+    """
+
+    def __init__(self, max_pending: int = 1):
+        """
+        Initialize the writer and start the background thread.
+
+        Parameters
+        ----------
+        max_pending : int, optional
+            Maximum number of pending writes, by default 1.
+        """
+        self.max_pending = max_pending
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                fn, args, kwargs = job
+                fn(*args, **kwargs)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error = self._error
+            self._error = None
+            raise RuntimeError("Could not write checkpoint.") from error
+
+    def submit(self, fn: Callable, *args, **kwargs):
+        """
+        Submit a function that writes a checkpoint to be executed in the background.
+
+        Parameters
+        ----------
+        fn : Callable
+            The function to execute.
+        *args
+            Positional arguments passed to ``fn``.
+        **kwargs
+            Keyword arguments passed to ``fn``.
+
+        Raises
+        ------
+        RuntimeError
+            If a previously submitted write has failed.
+        """
+        self._raise_error()
+        assert self._thread.is_alive(), "The checkpoint writer is closed."
+        self._queue.put((fn, args, kwargs))
+
+    def flush(self):
+        """
+        Wait until all the submitted writes are complete.
+
+        Raises
+        ------
+        RuntimeError
+            If a submitted write has failed.
+        """
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """
+        Wait for the submitted writes and stop the background thread.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
+
+def clean_checkpoints(checkpoint_folder: Path, n_checkpoints: int) -> list[Path]:
     """
     Remove all but the n latest checkpoints from the given directory.
 
     Parameters
     ----------
     checkpoint_folder : Path
-        Directory containing the checkpoint files.
+        Directory containing the checkpoint files or sharded checkpoint directories.
     n_checkpoints : int
         Number of checkpoints to keep.
+
+    Returns
+    -------
+    list[Path]
+        The removed checkpoints.
     """
     chkpts = sorted(list(checkpoint_folder.glob("*.pt")))[::-1]
 
     # Keep only last n checkpoints (or first n because we sort in reverse)
+    chkpts_to_del = []
     if len(chkpts) > n_checkpoints:
         chkpts_to_del = chkpts[n_checkpoints:]
         for _chkpt in chkpts_to_del:
-            Path(_chkpt).unlink(missing_ok=True)
+            if Path(_chkpt).is_dir():
+                shutil.rmtree(_chkpt, ignore_errors=True)
+            else:
+                Path(_chkpt).unlink(missing_ok=True)
+    return chkpts_to_del
 
 
 def default_val_parser(val):
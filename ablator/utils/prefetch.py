@@ -0,0 +1,168 @@
+import queue
+import threading
+import typing as ty
+from collections import deque
+from collections.abc import Iterable
+
+import torch
+
+import ablator.utils.base as butils
+
+
+class _PrefetchEnd:
+    pass
+
+
+class _PrefetchError:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+class BatchPrefetcher:
+    """
+    An iterator over a dataloader that prepares the following batches while the current batch is used.
+
+    The batches are read from the dataloader by a background thread into a bounded queue. When the
+    target device is a cuda device, the tensors are additionally copied to pinned memory and transferred
+    to the device with non-blocking copies on a side stream, such that the transfer of batch ``N + 1``
+    overlaps with the computation on batch ``N``.
+
+    Attributes
+    ----------
+    device : str
+        The device the batches are moved to.
+    prefetch_batches : int
+        The number of batches to prepare ahead of the current batch.
+
+    Examples
+    --------
+    >>> dataloader = [torch.rand(10) for i in range(100)]
+    >>> for batch in BatchPrefetcher(dataloader, device="cpu", prefetch_batches=2):
+    ...     pass
+    """
+
+    def __init__(
+        self, dataloader: Iterable, device: str = "cpu", prefetch_batches: int = 1
+    ):
+        """
+        Initializes the prefetcher and starts reading batches from the dataloader.
+
+        Parameters
+        ----------
+        dataloader : Iterable
+            The dataloader to iterate over.
+        device : str, optional
+            The device to move the batches to, by default ``"cpu"``.
+        prefetch_batches : int, optional
+            The number of batches to prepare ahead of the current batch, by default 1.
+        """
+        assert prefetch_batches > 0, "`prefetch_batches` must be a positive integer."
+        self.device = device
+        self.prefetch_batches = prefetch_batches
+        self._stream: torch.cuda.Stream | None = None
+        if "cuda" in str(device) and torch.cuda.is_available():
+            self._stream = torch.cuda.Stream(device=device)
+        # batches on the device that wait to be consumed
+        self._staged: deque = deque()
+        self._queue: queue.Queue = queue.Queue(maxsize=prefetch_batches)
+        self._stop_event = threading.Event()
+        self._exhausted = False
+        self._thread = threading.Thread(
+            target=self._read_batches, args=(iter(dataloader),), daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, item: ty.Any) -> bool:
+        while not self._stop_event.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read_batches(self, iterator: ty.Iterator):
+        try:
+            for batch in iterator:
+                if self._stream is not None:
+                    batch = butils.apply_lambda_to_iter(batch, _pin_memory)
+                if not self._put(batch):
+                    return
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            self._put(_PrefetchError(exc))
+            return
+        self._put(_PrefetchEnd())
+
+    def _get(self) -> ty.Any:
+        item = self._queue.get()
+        if isinstance(item, _PrefetchEnd):
+            self._exhausted = True
+            return item
+        if isinstance(item, _PrefetchError):
+            self._exhausted = True
+            raise item.exc
+        return item
+
+    def _stage(self):
+        # issues the copy of the next batch on the side stream without waiting for it.
+        if self._exhausted:
+            return
+        batch = self._get()
+        if isinstance(batch, _PrefetchEnd):
+            return
+        assert self._stream is not None
+        with torch.cuda.stream(self._stream):
+            batch = butils.iter_to_device(batch, self.device, non_blocking=True)
+        self._staged.append(batch)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._stream is None:
+            if self._exhausted:
+                raise StopIteration
+            batch = self._get()
+            if isinstance(batch, _PrefetchEnd):
+                raise StopIteration
+            return batch
+
+        if len(self._staged) == 0:
+            self._stage()
+        if len(self._staged) == 0:
+            raise StopIteration
+        batch = self._staged.popleft()
+        current_stream = torch.cuda.current_stream(self.device)
+        current_stream.wait_stream(self._stream)
+        # the memory of the batch is now used by the current stream.
+        butils.apply_lambda_to_iter(
+            batch,
+            lambda v: v.record_stream(current_stream)
+            if isinstance(v, torch.Tensor)
+            else v,
+        )
+        self._stage()
+        return batch
+
+    def close(self):
+        """
+        Stops reading batches from the dataloader and releases the prefetched batches.
+        """
+        self._stop_event.set()
+        self._staged.clear()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._thread.join(timeout=1)
+
+    def __del__(self):
+        if hasattr(self, "_thread"):
+            self.close()
+
+
+def _pin_memory(v: ty.Any) -> ty.Any:
+    if isinstance(v, torch.Tensor) and v.device.type == "cpu" and not v.is_pinned():
+        return v.pin_memory()
+    return v
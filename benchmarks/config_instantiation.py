@@ -0,0 +1,80 @@
+"""
+Benchmark of creating a ``ParallelConfig`` from the dictionary of a trial, as ``ExperimentState`` does
+when sampling trials and when loading them from the experiment state database.
+
+Usage::
+
+    python benchmarks/config_instantiation.py --repeats 1000
+"""
+import argparse
+import timeit
+
+from ablator import ModelConfig, OptimizerConfig, TrainConfig
+from ablator.config.main import ConfigBase
+from ablator.main.configs import ParallelConfig, SearchSpace
+
+
+def make_trial_kwargs() -> dict:
+    config = ParallelConfig(
+        train_config=TrainConfig(
+            dataset="test",
+            batch_size=128,
+            epochs=2,
+            optimizer_config=OptimizerConfig(name="sgd", arguments={"lr": 0.1}),
+            scheduler_config=None,
+        ),
+        model_config=ModelConfig(),
+        verbose="silent",
+        device="cpu",
+        amp=False,
+        search_space={
+            "train_config.optimizer_config.arguments.lr": SearchSpace(
+                value_range=[0, 1], value_type="float"
+            ),
+        },
+        optim_metrics={"val_loss": "min"},
+        total_trials=10,
+        concurrent_trials=10,
+        gpu_mb_per_experiment=0,
+        cpus_per_experiment=1,
+    )
+    return config.to_dict()
+
+
+def clear_class_caches():
+    # simulates parsing the annotations and the members of every class for every object.
+    classes = [ConfigBase]
+    while len(classes) > 0:
+        cls = classes.pop()
+        if "__class_cache__" in cls.__dict__:
+            delattr(cls, "__class_cache__")
+        classes += cls.__subclasses__()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=1000)
+    args = parser.parse_args()
+    trial_kwargs = make_trial_kwargs()
+
+    def uncached():
+        clear_class_caches()
+        ParallelConfig(**trial_kwargs)
+
+    results = {
+        "uncached constructor": uncached,
+        "cached constructor": lambda: ParallelConfig(**trial_kwargs),
+        "from_trusted_dict": lambda: ParallelConfig.from_trusted_dict(trial_kwargs),
+    }
+    baseline = None
+    for name, fn in results.items():
+        fn()
+        seconds = timeit.timeit(fn, number=args.repeats) / args.repeats
+        baseline = seconds if baseline is None else baseline
+        print(
+            f"{name:>22}: {seconds * 1e6:10.1f} us / config ({baseline / seconds:5.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
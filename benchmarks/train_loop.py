@@ -0,0 +1,228 @@
+"""
+Benchmarks of the overhead of the training loop of ``ModelWrapper`` on synthetic CPU models and dataloaders:
+
+- the training steps per second of ``train_loop``, and the time per step spent outside of the forward
+  and backward passes, compared to a plain PyTorch loop over the same model and batches,
+- the mean time of every phase of the training loop, as recorded by ``StepTimer``,
+- the time to append a batch to ``TrainMetrics`` and to evaluate it, as the number of evaluation
+  functions and the batch size grow,
+- the time to write a checkpoint with ``SummaryLogger`` for every checkpoint format.
+
+The results are written as JSON, such that the overhead can be compared between commits.
+
+Usage::
+
+    python benchmarks/train_loop.py --steps 500 --output results.json
+"""
+import argparse
+import copy
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch import nn
+
+from ablator import ModelConfig, ModelWrapper, OptimizerConfig, RunConfig, TrainConfig
+from ablator.modules.loggers.main import SummaryLogger
+from ablator.modules.metrics.main import TrainMetrics
+
+N_FEATURES = 64
+N_CLASSES = 10
+
+
+class SyntheticModel(nn.Module):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__()
+        self.linear = nn.Linear(N_FEATURES, N_CLASSES)
+
+    def forward(self, x: torch.Tensor, labels: torch.Tensor):
+        out = self.linear(x)
+        return {"preds": out, "labels": labels}, nn.functional.cross_entropy(out, labels)
+
+
+def accuracy(preds, labels):
+    return float((preds.argmax(-1) == labels).mean())
+
+
+def make_batches(n_batches: int, batch_size: int) -> list[list[torch.Tensor]]:
+    return [
+        [torch.rand(batch_size, N_FEATURES), torch.randint(N_CLASSES, (batch_size,))]
+        for _ in range(n_batches)
+    ]
+
+
+class SyntheticWrapper(ModelWrapper):
+    def __init__(self, *args, n_batches: int = 100, batch_size: int = 32, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batches = make_batches(n_batches, batch_size)
+
+    def make_dataloader_train(self, run_config: RunConfig):
+        return self.batches
+
+    def evaluation_functions(self):
+        return {"acc": accuracy}
+
+
+def make_run_config(steps: int, n_batches: int, batch_size: int) -> RunConfig:
+    return RunConfig(
+        train_config=TrainConfig(
+            dataset="synthetic",
+            batch_size=batch_size,
+            epochs=max(steps // n_batches, 1),
+            optimizer_config=OptimizerConfig(name="sgd", arguments={"lr": 0.1}),
+            scheduler_config=None,
+        ),
+        model_config=ModelConfig(),
+        verbose="silent",
+        device="cpu",
+        amp=False,
+    )
+
+
+def bench_plain_loop(batches: list, steps: int) -> float:
+    model = SyntheticModel()
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+    start = time.perf_counter()
+    for i in range(steps):
+        optimizer.zero_grad()
+        _, loss = model(*batches[i % len(batches)])
+        loss.backward()
+        optimizer.step()
+    return time.perf_counter() - start
+
+
+def bench_train_loop(steps: int, n_batches: int, batch_size: int) -> dict:
+    run_config = make_run_config(steps, n_batches, batch_size)
+    wrapper = SyntheticWrapper(SyntheticModel, n_batches=n_batches, batch_size=batch_size)
+    wrapper._init_state(run_config=run_config)  # pylint: disable=protected-access
+    total_steps = wrapper.total_steps
+    start = time.perf_counter()
+    wrapper.train_loop()
+    train_seconds = time.perf_counter() - start
+    plain_seconds = bench_plain_loop(wrapper.batches, total_steps)
+
+    timer_config = copy.deepcopy(run_config)
+    timer_config.step_timer = "wall"
+    wrapper = SyntheticWrapper(SyntheticModel, n_batches=n_batches, batch_size=batch_size)
+    wrapper._init_state(run_config=timer_config)  # pylint: disable=protected-access
+    wrapper.train_loop()
+    step_times = wrapper.step_timer.to_dict()
+    return {
+        "steps": total_steps,
+        "batch_size": batch_size,
+        "steps_per_sec": total_steps / train_seconds,
+        "plain_steps_per_sec": total_steps / plain_seconds,
+        "overhead_ms_per_step": (train_seconds - plain_seconds) / total_steps * 1000,
+        "step_times": step_times,
+    }
+
+
+def bench_metrics(repeats: int, n_functions: list[int], batch_sizes: list[int]) -> list[dict]:
+    results = []
+    for n in n_functions:
+        for batch_size in batch_sizes:
+            metrics = TrainMetrics(
+                batch_limit=repeats,
+                memory_limit=None,
+                evaluation_functions={f"acc_{i}": accuracy for i in range(n)},
+                moving_average_limit=100,
+                tags=["train"],
+                moving_aux_metrics=["loss"],
+            )
+            preds = np.random.rand(batch_size, N_CLASSES)
+            labels = np.random.randint(N_CLASSES, size=batch_size)
+            start = time.perf_counter()
+            for _ in range(repeats):
+                metrics.append_batch(preds=preds, labels=labels, tag="train")
+            append_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            metrics.evaluate("train")
+            evaluate_seconds = time.perf_counter() - start
+            results.append(
+                {
+                    "evaluation_functions": n,
+                    "batch_size": batch_size,
+                    "append_batch_ms": append_seconds / repeats * 1000,
+                    "evaluate_ms": evaluate_seconds * 1000,
+                }
+            )
+    return results
+
+
+def bench_checkpoint(repeats: int, size_mb: float) -> list[dict]:
+    n_params = int(size_mb * 1e6 / 4)
+    model = nn.Linear(n_params // 1000, 1000, bias=False)
+    results = []
+    for checkpoint_format in ["single", "sharded", "dedup"]:
+        run_config = make_run_config(1, 1, 1)
+        run_config.checkpoint_format = checkpoint_format
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            logger = SummaryLogger(
+                run_config, Path(tmp_dir) / "model", keep_n_checkpoints=3, verbose=False
+            )
+            seconds = []
+            for _ in range(repeats):
+                with torch.no_grad():
+                    model.weight.add_(1)
+                start = time.perf_counter()
+                logger.checkpoint({"model": model.state_dict()}, "model")
+                seconds.append(time.perf_counter() - start)
+            logger.close()
+        results.append(
+            {
+                "checkpoint_format": checkpoint_format,
+                "size_mb": size_mb,
+                "write_ms": float(np.mean(seconds)) * 1000,
+                "mb_per_sec": size_mb / float(np.mean(seconds)),
+            }
+        )
+    return results
+
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--metrics-repeats", type=int, default=32)
+    parser.add_argument("--checkpoint-repeats", type=int, default=5)
+    parser.add_argument("--checkpoint-mb", type=float, default=20)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+    torch.manual_seed(0)
+    np.random.seed(0)
+    torch.set_num_threads(1)
+
+    results = {
+        "commit": get_commit(),
+        "torch": torch.__version__,
+        "python": platform.python_version(),
+        "train_loop": bench_train_loop(args.steps, 100, args.batch_size),
+        "metrics": bench_metrics(args.metrics_repeats, [1, 4, 16], [32, 256, 2048]),
+        "checkpoint": bench_checkpoint(args.checkpoint_repeats, args.checkpoint_mb),
+    }
+    output = json.dumps(results, indent=2)
+    if args.output is not None:
+        Path(args.output).write_text(output, encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -41,5 +41,8 @@ setup(
             "pylint==2.17.2",
             "tensorboard==2.12.2",
         ],
+        "arrow": [
+            "pyarrow>=14.0.0",
+        ],
     },
 )
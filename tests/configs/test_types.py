@@ -200,6 +200,42 @@ def test_iterable(assert_error_msg):
     assert_error_msg(lambda:ErrorConfigList(a4="11"),"Invalid type <class 'str'> for type List")
     
 
+def test_from_trusted_dict():
+    # the annotations are parsed when the class is decorated.
+    @configclass
+    class TrustedConfig(ConfigBase):
+        a1: float = 1
+        a2: Optional[List[int]] = None
+
+    assert "__class_cache__" in TrustedConfig.__dict__
+    c = TrustedConfig.from_trusted_dict({"a1": 2, "a2": [3]})
+    assert c.a1 == 2.0 and type(c.a1) == float and c.a2 == [3] and c == TrustedConfig(a1=2, a2=[3])
+    e = MultiTypeConfig(a5={"a": 1}, c3={"a1": 2.4}, c4={"a1": "2"})
+    assert MultiTypeConfig.__dict__["__class_cache__"].annotations == e.annotations
+    e_trusted = MultiTypeConfig.from_trusted_dict(e.to_dict())
+    assert type(e_trusted.c3) == SimpleConfig and e_trusted.c3.a1 == 2
+    assert e_trusted.a5.a == 1 and e_trusted.a6 == "a"
+    assert e_trusted.to_dict() == e.to_dict() and e_trusted.uid == e.uid
+    pc = ParentTestTestConfig(c={"a1": 0, "c": {"a1": 10}, "c2": {"a1": "2"}})
+    assert ParentTestTestConfig.from_trusted_dict(pc.to_dict()) == pc
+
+
+def test_cached_uid():
+    pc = ParentTestTestConfig(c={"a1": 0, "c": {"a1": 10}, "c2": {"a1": "2"}})
+    uid = pc.uid
+    assert pc.__dict__["_cache"]["uid"][1] == uid
+    # assigning a nested attribute invalidates the cached uid
+    pc.c.c.a1 = 5
+    assert pc.uid != uid
+    pc.c.c.a1 = 10
+    assert pc.uid == uid
+    # derived attributes are not part of the uid
+    pc.a1 = 5
+    assert pc.uid == uid
+    pc.c = ParentTestConfig(a1=1, c={"a1": 10}, c2={"a1": "2"})
+    assert pc.uid != uid
+
+
 if __name__ == "__main__":
     # TODO tests for iterable Type
     def assert_error_msg(fn, error_msg):
@@ -214,4 +250,6 @@ if __name__ == "__main__":
     test_hierarchical()
     test_error_configs(assert_error_msg)
     test_iterable(assert_error_msg)
+    test_from_trusted_dict()
+    test_cached_uid()
 
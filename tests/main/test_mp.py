@@ -142,6 +142,11 @@ def test_mp(tmp_path: Path):
     ablator.launch(Path(__file__).parent.as_posix(), ray_head_address=None)
     res = Results(MyParallelConfig, ablator.experiment_dir)
     assert res.data.shape[0] // 2 == len(ablator.experiment_state.complete_trials)
+    eval_df = ablator.evaluate(concurrent_evaluations=2)
+    complete_uids = [c.uid for c in ablator.experiment_state.complete_trials]
+    assert sorted(eval_df.index) == sorted(complete_uids)
+    assert "val_loss" in eval_df.columns and eval_df["val_loss"].notna().all()
+    assert ablator.experiment_dir.joinpath("evaluation_results.csv").exists()
 
 
 def test_resume(tmp_path: Path):
@@ -2,6 +2,8 @@ from pathlib import Path
 import shutil
 import numpy as np
 import os
+import pickle
+import sqlite3
 import tempfile
 from ablator import ModelConfig, OptimizerConfig, RunConfig, TrainConfig
 from ablator.main.configs import ParallelConfig, SearchSpace
@@ -268,3 +270,84 @@ def test_state(tmp_path: Path):
 
     # tmp_path = Path("./temp")
     # shutil.rmtree(tmp_path)
+
+
+def test_legacy_trial_state(tmp_path: Path):
+    config = ParallelConfig(
+        train_config=train_config,
+        model_config=ModelConfig(),
+        verbose="silent",
+        device="cpu",
+        amp=False,
+        search_space={
+            "train_config.optimizer_config.arguments.lr": SearchSpace(
+                value_range=[0, 1], value_type="float"
+            ),
+        },
+        optim_metrics={"acc": "max"},
+        total_trials=10,
+        concurrent_trials=3,
+        gpu_mb_per_experiment=0,
+        cpus_per_experiment=0.1,
+    )
+    s = ExperimentState(tmp_path, config)
+    some_uid = s.pending_trials[0].uid
+    s.update_trial_state(some_uid, None, TrialState.RUNNING)
+    assert s.running_trials[0].uid == some_uid
+    # databases of earlier versions store the state pickled.
+    with sqlite3.connect(tmp_path.joinpath(f"{config.uid}_state.db")) as conn:
+        conn.execute(
+            "UPDATE trial SET state = ? WHERE config_uid = ?",
+            (pickle.dumps(TrialState.COMPLETE), some_uid),
+        )
+    s = ExperimentState(tmp_path, config, resume=True)
+    assert [c.uid for c in s.complete_trials] == [some_uid]
+    assert len(s.pending_trials) == 3
+    assert s.n_trials_remaining == 6
+
+
+def test_state_transaction(tmp_path: Path):
+    config = ParallelConfig(
+        train_config=train_config,
+        model_config=ModelConfig(),
+        verbose="silent",
+        device="cpu",
+        amp=False,
+        search_space={
+            "train_config.optimizer_config.arguments.lr": SearchSpace(
+                value_range=[0, 1], value_type="float"
+            ),
+        },
+        optim_metrics={"acc": "max"},
+        total_trials=10,
+        concurrent_trials=3,
+        gpu_mb_per_experiment=0,
+        cpus_per_experiment=0.1,
+    )
+    s = ExperimentState(tmp_path, config)
+    db_names = [f"{config.uid}_state.db", f"{config.uid}_optuna.db"]
+    # write-ahead logging is opt-in, as it is not supported on network file systems.
+    for db_name in db_names:
+        with sqlite3.connect(tmp_path.joinpath(db_name)) as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    s.close()
+    config.sqlite_wal = True
+    s = ExperimentState(tmp_path, config, resume=True)
+    for db_name in db_names:
+        with sqlite3.connect(tmp_path.joinpath(db_name)) as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    uids = s.all_trials_uid
+    assert_error_msg(
+        lambda: s.update_trial_states(
+            [(uids[0], {"acc": 0}, TrialState.COMPLETE), ("xxx", None, TrialState.FAIL)]
+        ),
+        "No trial found with config_uid: xxx",
+    )
+    # the update of the first trial is rolled back with the rest of the transaction.
+    assert len(s.complete_trials) == 0 and len(s.pending_trials) == 3
+    s.update_trial_states(
+        [(uid, {"acc": 0}, TrialState.COMPLETE) for uid in uids[:2]]
+    )
+    s.close()
+    s = ExperimentState(tmp_path, config, resume=True)
+    assert [c.uid for c in s.complete_trials] == uids[:2]
@@ -12,11 +12,14 @@ from ablator import (
     ModelConfig,
     ModelWrapper,
     OptimizerConfig,
+    ProfilerConfig,
     RunConfig,
     TrainConfig,
     Derived,
 )
-from ablator.modules.metrics.main import TrainMetrics
+from ablator.modules.metrics.main import LossDivergedError, TrainMetrics
+from ablator.utils.prefetch import BatchPrefetcher
+import ablator.utils.file as futils
 
 import numpy as np
 
@@ -277,6 +280,115 @@ def test_train_stats():
     }
 
 
+def test_deferred_readback():
+    _config = copy.deepcopy(config)
+    _config.metrics_readback_itr = 16
+    assert_error_msg(
+        lambda: TestWrapper(MyUnstableModel).train(_config),
+        "Loss Diverged. Terminating. loss: inf",
+    )
+    wrapper = TestWrapper(MyModel)
+    m = wrapper.train(_config)
+    assert len(wrapper._pending_train_metrics) == 0
+    res = m.to_dict()
+    assert np.isfinite(res["train_loss"])
+    assert res["current_iteration"] == 200
+
+    # the steps can return different metrics
+    wrapper = TestWrapper(MyModel)
+    wrapper.aux_metric_names = ["aux"]
+    wrapper._init_state(run_config=_config)
+    wrapper._pending_train_metrics = [
+        {"loss": torch.tensor(1.0)},
+        {"loss": torch.tensor(3.0), "aux": torch.tensor(2.0)},
+        {"aux": 4.0},
+    ]
+    wrapper._flush_train_metrics()
+    res = wrapper.metrics.to_dict()
+    assert res["train_loss"] == 2.0 and res["train_aux"] == 3.0
+
+
+def test_gradient_accumulation():
+    _train_config = copy.deepcopy(train_config)
+    _train_config.gradient_accumulation_steps = 4
+    assert _train_config.uid != train_config.uid
+    _config = copy.deepcopy(config)
+    _config.train_config = _train_config
+    wrapper = TestWrapper(MyModel)
+    wrapper._init_state(run_config=_config)
+    assert wrapper.epoch_len == 25 and wrapper.total_steps == 50
+    optimizer_steps = []
+    wrapper.optimizer.register_step_post_hook(
+        lambda *args: optimizer_steps.append(wrapper.current_iteration)
+    )
+    wrapper.train_loop()
+    assert wrapper.current_iteration == 50
+    assert optimizer_steps == list(range(50))
+
+    # the accumulated gradients are the average of the batch gradients
+    wrapper = TestWrapper(MyModel)
+    wrapper._init_state(run_config=_config)
+    wrapper.optimizer.step = lambda *args, **kwargs: None
+    for _ in range(3):
+        wrapper.train_step(torch.rand(100))
+    assert wrapper._is_accumulating() and wrapper.current_iteration == 0
+    assert torch.allclose(wrapper.model.param.grad, torch.full((100,), 0.75))
+    wrapper.train_step(torch.rand(100))
+    assert not wrapper._is_accumulating() and wrapper.current_iteration == 1
+    assert wrapper.model.param.grad is None or (wrapper.model.param.grad == 0).all()
+
+    # the leftover batches of a dataloader whose length is not a multiple of the accumulation steps
+    # are skipped, and the train metrics are reset at the step boundary.
+    _config.train_config.gradient_accumulation_steps = 3
+    wrapper = TestWrapper(MyModel)
+    wrapper._init_state(run_config=_config)
+    assert wrapper.epoch_len == 33 and wrapper.total_steps == 66
+    resets = []
+    wrapper.metrics.reset = lambda tag: resets.append(
+        (wrapper.current_iteration, wrapper._accumulated_steps)
+    )
+    batch_idxs = {batch.data_ptr(): i for i, batch in enumerate(wrapper.train_dataloader)}
+    train_step = wrapper.train_step
+    step_batches = []
+
+    def record_train_step(batch):
+        step_batches.append(batch_idxs[batch.data_ptr()])
+        return train_step(batch)
+
+    wrapper.train_step = record_train_step
+    wrapper.train_loop()
+    assert resets == [(33, 0)]
+    assert step_batches == list(range(99)) * 2
+
+
+def test_train_config_uid():
+    # the uid of a configuration without gradient accumulation is the same as before the attribute
+    assert train_config.uid == "f83c"
+    assert config.uid == "f83c_9991"
+    _train_config = copy.deepcopy(train_config)
+    _train_config.gradient_accumulation_steps = 2
+    assert _train_config.uid != train_config.uid
+
+
+def test_prefetch():
+    _config = copy.deepcopy(config)
+    _config.prefetch_batches = 2
+    wrapper = TestWrapper(MyCustomModel)
+    make_batch_iterator = wrapper.make_batch_iterator
+    prefetchers = []
+
+    def make_prefetcher(dataloader):
+        prefetchers.append(make_batch_iterator(dataloader))
+        return prefetchers[-1]
+
+    wrapper.make_batch_iterator = make_prefetcher
+    m = wrapper.train(_config)
+    assert m.to_dict()["current_iteration"] == 200
+    # the prefetchers of the exhausted train dataloaders and of the validation loops are closed.
+    assert len(prefetchers) > 2 and all(isinstance(p, BatchPrefetcher) for p in prefetchers)
+    assert not any(p._thread.is_alive() for p in prefetchers)
+
+
 def test_state():
     wrapper = TestWrapper(MyCustomModel)
     assert_error_msg(
@@ -391,6 +503,117 @@ def test_load_save(tmp_path: Path):
     ).all()
 
 
+def test_async_checkpoint(tmp_path: Path):
+    tmp_path = tmp_path.joinpath("test_exp")
+    _config = copy.deepcopy(config)
+    _config.experiment_dir = tmp_path
+    _config.async_checkpoint = True
+    wrapper = TestWrapper(MyCustomModel)
+    wrapper.train(_config)
+    wrapper = TestWrapper(MyCustomModel)
+    wrapper._init_state(run_config=_config, resume=True)
+    assert wrapper.current_iteration == 200
+    assert wrapper.current_checkpoint.name == "MyCustomModel_0000000200.pt"
+
+    # the error of training is not replaced by the error of a background checkpoint write.
+    wrapper = TestWrapper(MyCustomModel)
+
+    def diverge(smoke_test=False):
+        wrapper.logger.checkpoint_writer._error = OSError("No space left on device.")
+        raise LossDivergedError("Loss Diverged.")
+
+    wrapper.train_loop = diverge
+    assert_error_msg(lambda: wrapper.train(_config, resume=True), "Loss Diverged.")
+
+
+def test_resume_verified_checkpoint(tmp_path: Path):
+    tmp_path = tmp_path.joinpath("test_exp")
+    _config = copy.deepcopy(config)
+    _config.experiment_dir = tmp_path
+    wrapper = TestWrapper(MyCustomModel)
+    wrapper.train(_config)
+    chkpt_dir = tmp_path.joinpath(_config.uid, "checkpoints")
+    latest_chkpt = chkpt_dir.joinpath("MyCustomModel_0000000200.pt")
+    latest_chkpt.write_bytes(latest_chkpt.read_bytes()[:100])
+    wrapper = TestWrapper(MyCustomModel)
+    wrapper._init_state(run_config=_config, resume=True)
+    assert wrapper.current_checkpoint == chkpt_dir.joinpath("MyCustomModel_0000000100.pt")
+    assert wrapper.current_iteration == 100
+
+
+def test_sharded_checkpoint(tmp_path: Path):
+    tmp_path = tmp_path.joinpath("test_exp")
+    _config = copy.deepcopy(config)
+    _config.experiment_dir = tmp_path
+    _config.checkpoint_format = "sharded"
+    wrapper = TestWrapper(MyCustomModel)
+    wrapper.train(_config)
+    chkpt = tmp_path.joinpath(_config.uid, "checkpoints", "MyCustomModel_0000000200.pt")
+    assert chkpt.is_dir()
+    assert sorted(futils.load_checkpoint(chkpt)) == sorted(wrapper.current_state)
+    assert sorted(futils.load_checkpoint(chkpt, keys=["model", "metrics"])) == [
+        "metrics",
+        "model",
+    ]
+    wrapper = TestWrapper(MyCustomModel)
+    wrapper._init_state(run_config=_config, resume=True)
+    assert wrapper.current_checkpoint == chkpt
+    assert wrapper.current_iteration == 200
+    assert "optimizer" in wrapper.current_state
+    wrapper = TestWrapper(MyCustomModel)
+    wrapper._init_state(run_config=_config, resume=True, model_only=True)
+    assert wrapper.current_iteration == 200
+    assert "optimizer" not in wrapper.current_state
+    wrapper.evaluate(_config)
+
+
+def test_dedup_checkpoint(tmp_path: Path):
+    tmp_path = tmp_path.joinpath("test_exp")
+    _config = copy.deepcopy(config)
+    _config.experiment_dir = tmp_path
+    _config.checkpoint_format = "dedup"
+    wrapper = TestWrapper(MyCustomModel)
+    wrapper.train(_config)
+    wrapper = TestWrapper(MyCustomModel)
+    wrapper._init_state(run_config=_config, resume=True)
+    assert wrapper.current_iteration == 200
+    assert wrapper.current_checkpoint.name == "MyCustomModel_0000000200.pt"
+
+
+def test_step_timer(tmp_path: Path):
+    tmp_path = tmp_path.joinpath("test_exp")
+    _config = copy.deepcopy(config)
+    _config.experiment_dir = tmp_path
+    _config.step_timer = "wall"
+    wrapper = TestWrapper(MyCustomModel)
+    res = wrapper.train(_config).to_dict()
+    for phase in ["data", "forward", "backward", "metrics", "log"]:
+        assert res[f"step_{phase}_ms"] > 0
+    assert "step_data_cuda_ms" not in res
+    log = tmp_path.joinpath(_config.uid, "train.log").read_text()
+    assert "Step times:" in log and "forward" in log
+    # the step times are not loaded from the checkpoint.
+    _config.step_timer = "off"
+    wrapper = TestWrapper(MyCustomModel)
+    wrapper._init_state(run_config=_config, resume=True)
+    assert wrapper.current_iteration == 200
+    assert "step_data_ms" not in wrapper.metrics.to_dict()
+
+
+def test_profiler(tmp_path: Path):
+    tmp_path = tmp_path.joinpath("test_exp")
+    _config = copy.deepcopy(config)
+    _config.experiment_dir = tmp_path
+    _config.profiler_config = ProfilerConfig(wait=10, warmup=1, active=2, top_k=5)
+    wrapper = TestWrapper(MyCustomModel)
+    wrapper.train(_config)
+    trace_dir = tmp_path.joinpath(_config.uid, "dashboard", "profiler")
+    assert len(list(trace_dir.glob("*.pt.trace.json"))) == 1
+    assert "Profiler step 13:" in tmp_path.joinpath(_config.uid, "train.log").read_text()
+    _config.profiler_config.trial_uids = ["other"]
+    assert wrapper._make_profiler() is None
+
+
 def test_train_loop():
     _config = copy.deepcopy(config)
 
@@ -434,5 +657,8 @@ if __name__ == "__main__":
     # test_state()
     test_verbosity()
     test_train_resume(tmp_path)
+    test_step_timer(tmp_path)
+    test_profiler(tmp_path)
     test_train_loop()
+    test_train_config_uid()
     test_validation_loop()
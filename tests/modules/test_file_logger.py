@@ -5,6 +5,9 @@ from ablator.modules.loggers.tensor import TensorboardLogger
 import sys
 from contextlib import redirect_stdout
 import io
+import copy
+import threading
+import time
 
 
 def assert_console_output(fn, assert_fn):
@@ -43,6 +46,47 @@ def test_file_logger(tmp_path: Path):
     assert_console_output(lambda: l.error("hello"), lambda s: s.endswith("\x1b[91mhello\x1b[0m\n"))
 
 
+def test_buffered_file_logger(tmp_path: Path):
+    logpath = tmp_path.joinpath("test.log")
+    l = FileLogger(logpath, verbose=False, buffered=True, flush_interval=100, buffer_size=5)
+    n_lines = lambda: len(logpath.read_text().strip("\n").split("\n"))
+    for i in range(3):
+        l.info(f"hello {i}")
+    assert n_lines() == 1
+    # the buffer is written when it is full.
+    l.info("hello 3")
+    l.info("hello 4")
+    assert n_lines() == 6
+    # and on error
+    l.info("hello 5")
+    assert_console_output(lambda: l.error("hello 6"), lambda s: s.endswith("\x1b[91mhello 6\x1b[0m\n"))
+    lines = logpath.read_text().strip("\n").split("\n")
+    assert len(lines) == 8
+    assert all(line.endswith(f"hello {i}") for i, line in enumerate(lines[1:6]))
+
+    # the copies write the buffered messages and only start their own flusher thread when written to.
+    l.info("hello 7")
+    n_threads = threading.active_count()
+    l_copy = copy.deepcopy(l)
+    assert n_lines() == 9
+    assert threading.active_count() == n_threads and l_copy._flusher is None
+    l_copy.info("hello 8")
+    assert threading.active_count() == n_threads + 1
+    assert l_copy._flusher is not None and l_copy._flusher is not l._flusher
+    l_copy.close()
+    assert n_lines() == 10
+
+    l.flush_interval = 0.01
+    l.close()
+    l = FileLogger(logpath, verbose=False, buffered=True, flush_interval=0.01)
+    l.info("hello 9")
+    time.sleep(0.5)
+    assert logpath.read_text().strip("\n").split("\n")[-1].endswith("hello 9")
+    l.close()
+    assert not l._flusher
+
+
 if __name__ == "__main__":
     test_file_logger(Path("/tmp/"))
+    test_buffered_file_logger(Path("/tmp/"))
     pass
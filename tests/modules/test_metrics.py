@@ -1,9 +1,16 @@
 from pathlib import Path
+from ablator.modules.metrics.incremental import AUC, Accuracy, ConfusionMatrix, IncrementalMetric
 from ablator.modules.metrics.main import TrainMetrics
-from ablator.modules.metrics.stores import PredictionStore
+from ablator.modules.metrics.stores import (
+    ArrayStore,
+    MovingAverage,
+    PredictionStore,
+    TensorStore,
+)
 import numpy as np
+import torch
+from sklearn.metrics import balanced_accuracy_score, f1_score, roc_auc_score
 
-import sys
 
 
 moving_average_limit = 100
@@ -108,8 +115,8 @@ def test_metrics(assert_error_msg):
     for i in range(1000):
         m.update_ma_metrics({"ma_some": int(i)}, tag="my_tag")
 
-    assert sys.getsizeof(m._get_ma("my_tag_ma_some").arr) < memory_limit
-    assert m.to_dict() == {"my_tag_ma_some": 997.5, "my_tag_mean": np.nan, "some": 0}
+    assert m._get_ma("my_tag_ma_some").arr.nbytes <= memory_limit
+    assert m.to_dict() == {"my_tag_ma_some": 993.5, "my_tag_mean": np.nan, "some": 0}
 
     assert_error_msg(
         lambda: m.append_batch(1, preds="", labels=None, tag=""),
@@ -210,6 +217,215 @@ def test_prediction_store_reset(assert_error_msg):
 
 
 
+def test_moving_average():
+    ma = MovingAverage(batch_limit=10, memory_limit=None)
+    assert np.isnan(ma.value) and np.isnan(ma.variance) and len(ma) == 0
+    values = np.random.rand(105)
+    values[50] = np.nan
+    for i, v in enumerate(values):
+        ma.append(v)
+        window = values[max(0, i - 9) : i + 1]
+        assert np.isclose(ma.value, np.mean(window), equal_nan=True)
+        assert np.isclose(ma.variance, np.var(window), equal_nan=True)
+    assert len(ma) == 10
+    assert np.allclose(ma.arr, values[-10:])
+    assert float(ma) == ma.value and ma < 2 and f"{ma:.2f}" == f"{np.mean(values[-10:]):.2f}"
+    ma.reset()
+    assert len(ma) == 0 and np.isnan(ma.value)
+    # the window is limited by the memory of float64 values.
+    assert MovingAverage(batch_limit=100, memory_limit=80).limit == 10
+    # the buffer grows with the values, and a non-finite value is counted until it leaves the window.
+    ma = MovingAverage(batch_limit=1000, memory_limit=None)
+    assert ma._buffer.size < 1000
+    values = np.random.rand(1700)
+    values[[10, 600]] = [np.inf, np.nan]
+    for i, v in enumerate(values):
+        ma.append(v)
+        assert ma._n_nonfinite == (~np.isfinite(values[max(0, i - 999) : i + 1])).sum()
+    assert ma._buffer.size == 1000 and np.allclose(ma.arr, values[-1000:], equal_nan=True)
+    ma.append(0.5)
+    assert np.isclose(ma.value, np.mean(ma.arr)) and np.isclose(ma.variance, np.var(ma.arr))
+    # the mean of a window with non-finite values follows np.mean without reading the window.
+    ma = MovingAverage(batch_limit=4, memory_limit=None)
+    for v in [1.0, np.inf, 2.0, -np.inf, 3.0, 4.0, np.nan, 5.0, 6.0, 7.0, 8.0]:
+        ma.append(v)
+        assert np.array_equal(ma.value, np.mean(ma.arr), equal_nan=True)
+        assert np.isclose(ma.variance, np.var(ma.arr), equal_nan=True)
+
+
+def test_array_store():
+    store = ArrayStore(batch_limit=5, memory_limit=None)
+    batches = [np.random.rand(i % 7 + 1, 3) for i in range(50)]
+    for i, batch in enumerate(batches):
+        store.append(batch)
+        assert np.array_equal(store.get(), np.concatenate(batches[max(0, i - 4) : i + 1])[None])
+    assert len(store) == 5
+    assert np.array_equal(store[-1], batches[-1])
+    # the returned values are a view of the preallocated buffer
+    assert store.get().base is not None
+    store.reset()
+    assert len(store) == 0 and len(store.get()) == 0
+
+    # the memory limit is applied on the size of the arrays
+    store = ArrayStore(batch_limit=100, memory_limit=800)
+    for i in range(100):
+        store.append(np.full((10,), i, dtype=np.float64))
+    assert store.limit == 10
+    assert store.nbytes <= 800
+    assert np.array_equal(store.get()[0], np.repeat(np.arange(90, 100), 10))
+
+    # batches with different shapes are stored as a list
+    store = ArrayStore(batch_limit=5, memory_limit=None)
+    store.append(np.zeros((2, 3)))
+    store.append(np.zeros((2, 4)))
+    assert len(store) == 2 and store.arr[1].shape == (2, 4)
+
+
+def test_on_device_metrics():
+    store = TensorStore(batch_limit=3, memory_limit=None)
+    for i in range(10):
+        store.append(torch.full((2,), i))
+    assert torch.equal(store.get(), torch.tensor([[7, 7, 8, 8, 9, 9]]))
+
+    def tensor_mean(preds: torch.Tensor, labels):
+        assert isinstance(preds, torch.Tensor) and isinstance(labels, np.ndarray)
+        return preds.float().mean()
+
+    m = TrainMetrics(
+        batch_limit=30,
+        memory_limit=None,
+        evaluation_functions={
+            "tensor_mean": tensor_mean,
+            "mean": lambda preds, labels: float(np.mean(preds)),
+        },
+        moving_average_limit=100,
+        tags=["val"],
+        on_device=True,
+    )
+    for i in range(4):
+        m.append_batch(
+            preds=torch.full((3,), float(i), requires_grad=True),
+            labels=np.zeros(3),
+            tag="val",
+        )
+    assert isinstance(m._get_preds("val")._get_arr("labels"), TensorStore)
+    assert m.evaluate("val") == {"tensor_mean": 1.5, "mean": 1.5}
+
+
+def test_incremental_metrics(assert_error_msg):
+    class Mean(IncrementalMetric):
+        def update(self, preds, labels):
+            return preds.sum(), preds.size
+
+        def merge(self, state_a, state_b):
+            return state_a[0] + state_b[0], state_a[1] + state_b[1]
+
+        def compute(self, state):
+            return float(state[0] / state[1])
+
+    m = TrainMetrics(
+        batch_limit=2,
+        memory_limit=None,
+        evaluation_functions={"mean": Mean(), "acc": Accuracy()},
+        moving_average_limit=100,
+        tags=["val"],
+    )
+    assert m.evaluate("val") == {}
+    preds = np.random.rand(100, 3)
+    labels = np.random.randint(3, size=100)
+    for i in range(0, 100, 10):
+        m.append_batch(preds=preds[i : i + 10], labels=labels[i : i + 10], tag="val")
+    # the predictions are not stored and all the batches are used, regardless of the batch limit
+    assert len(m._get_preds("val")._get_arr("preds")) == 0
+    metrics = m.evaluate("val")
+    assert np.isclose(metrics["mean"], preds.mean())
+    assert np.isclose(metrics["acc"], (preds.argmax(-1) == labels).mean())
+    assert m.evaluate("val") == {}
+
+    m = TrainMetrics(
+        batch_limit=2,
+        memory_limit=None,
+        evaluation_functions={
+            "f1": ConfusionMatrix(3),
+            "bacc": ConfusionMatrix(3, lambda cm: np.mean(np.diag(cm) / cm.sum(1))),
+            "auc": AUC(n_bins=10000),
+        },
+        moving_average_limit=100,
+        tags=["val"],
+    )
+    for i in range(0, 100, 10):
+        m.append_batch(preds=preds[i : i + 10], labels=labels[i : i + 10], tag="val")
+    metrics = m.evaluate("val")
+    assert np.isclose(metrics["f1"], f1_score(labels, preds.argmax(-1), average="macro"))
+    assert np.isclose(metrics["bacc"], balanced_accuracy_score(labels, preds.argmax(-1)))
+    # the positive labels are the non-zero labels, and the scores are of the last class.
+    assert np.isclose(metrics["auc"], roc_auc_score(labels > 0, preds[:, -1]), atol=1e-3)
+
+    m = TrainMetrics(
+        batch_limit=2,
+        memory_limit=None,
+        evaluation_functions={"mean": Mean(), "acc": Accuracy()},
+        moving_average_limit=100,
+        tags=["val"],
+    )
+    assert_error_msg(
+        lambda: m.append_batch(somex=np.array([100]), labels=np.array([1000]), tag="val"),
+        "Evaluation function arguments ['labels', 'preds'] different than stored predictions: ['labels', 'somex']",
+    )
+
+
+def test_evaluation_intermediates(assert_error_msg):
+    n_calls = {"pred_class": 0}
+
+    def pred_class(preds):
+        n_calls["pred_class"] += 1
+        return preds.argmax(-1)
+
+    m = TrainMetrics(
+        batch_limit=30,
+        memory_limit=None,
+        evaluation_functions={
+            "acc": lambda pred_class, labels: float(np.mean(pred_class == labels)),
+            "err": lambda correct: 1 - float(np.mean(correct)),
+            "mean": lambda preds, labels: float(np.mean(preds)),
+        },
+        evaluation_intermediates={
+            "pred_class": pred_class,
+            "correct": lambda pred_class, labels: pred_class == labels,
+        },
+        moving_average_limit=100,
+        tags=["val"],
+    )
+    preds = np.random.rand(100, 3)
+    labels = np.random.randint(3, size=100)
+    m.append_batch(preds=preds, labels=labels, tag="val")
+    metrics = m.evaluate("val")
+    acc = np.mean(preds.argmax(-1) == labels)
+    assert np.isclose(metrics["acc"], acc) and np.isclose(metrics["err"], 1 - acc)
+    assert n_calls["pred_class"] == 1
+
+    assert_error_msg(
+        lambda: TrainMetrics(
+            evaluation_functions={"acc": lambda a: a},
+            evaluation_intermediates={"a": lambda b: b, "b": lambda a: a},
+            tags=["val"],
+        ),
+        "Circular dependency of evaluation intermediate a.",
+    )
+    m = TrainMetrics(
+        evaluation_functions={"acc": lambda pred_class: float(np.mean(pred_class))},
+        evaluation_intermediates={"pred_class": pred_class},
+        tags=["val"],
+    )
+    assert_error_msg(
+        lambda: [
+            m.append_batch(preds=preds, labels=labels, tag="val"),
+            m.evaluate("val"),
+        ],
+        "Evaluation function arguments ['preds'] different than stored predictions: ['labels', 'preds']",
+    )
+
+
 if __name__ == "__main__":
 
     def assert_error_msg(fn, error_msg):
@@ -222,3 +438,8 @@ if __name__ == "__main__":
 
     test_metrics(assert_error_msg)
     test_prediction_store_reset(assert_error_msg)
+    test_moving_average()
+    test_array_store()
+    test_on_device_metrics()
+    test_incremental_metrics(assert_error_msg)
+    test_evaluation_intermediates(assert_error_msg)
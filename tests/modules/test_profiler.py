@@ -0,0 +1,54 @@
+import time
+from pathlib import Path
+
+import torch
+
+from ablator.modules.profiler import ProfilerConfig, StepTimer
+
+
+def test_step_timer():
+    timer = StepTimer()
+    for _ in range(3):
+        with timer.phase("forward"):
+            time.sleep(0.01)
+            with timer.phase("to_device"):
+                time.sleep(0.02)
+    metrics = timer.metrics()
+    assert sorted(metrics) == sorted(StepTimer.metric_names(cuda=False))
+    # the time of the nested phases is excluded.
+    assert 10 <= metrics["step_forward_ms"] < 20
+    assert metrics["step_to_device_ms"] >= 20
+    assert metrics["step_data_ms"] == 0
+    # the metrics are the mean since they were last returned.
+    assert timer.metrics()["step_forward_ms"] == 0
+    summary = timer.summary().split("\n")
+    assert len(summary) == 3
+    assert summary[1].split()[:2] == ["to_device", "3"]
+    assert summary[2].split()[:2] == ["forward", "3"]
+    # the 50th percentile is the upper edge of the histogram bin of 10ms.
+    assert float(summary[2].split()[4]) == 16
+
+    timer = StepTimer(enabled=False)
+    with timer.phase("forward"):
+        pass
+    assert timer.metrics() == {}
+
+
+def test_profiler_config(tmp_path: Path):
+    config = ProfilerConfig(wait=1, warmup=1, active=2, top_k=5, trial_uids=["a"])
+    assert config.should_profile("a") and not config.should_profile("b")
+    assert ProfilerConfig().should_profile("b")
+    tables = []
+    x = torch.rand(10, 10)
+    with config.make_profiler(tmp_path, tables.append) as profiler:
+        for _ in range(6):
+            x = torch.mm(x, x).softmax(-1)
+            profiler.step()
+    assert len(tables) == 1
+    assert "aten::mm" in tables[0]
+    assert len(list(tmp_path.glob("*.pt.trace.json"))) == 1
+
+
+if __name__ == "__main__":
+    test_step_timer()
+    test_profiler_config(Path("/tmp/"))
@@ -1,5 +1,6 @@
 import copy
 import io
+import json
 import random
 import sys
 from contextlib import redirect_stdout
@@ -9,8 +10,11 @@ import numpy as np
 import pandas as pd
 import pytest
 from PIL import Image
+from tensorboard.backend.event_processing.event_file_loader import LegacyEventFileLoader
 
 from ablator import ModelConfig, OptimizerConfig, RunConfig, TrainConfig
+from ablator.analysis.results import read_result
+from ablator.modules.loggers.arrow import ArrowResultsWriter, read_arrow_results
 from ablator.modules.loggers.main import SummaryLogger
 
 
@@ -237,8 +241,218 @@ def test_summary_logger(tmp_path: Path):
     assert event_acc.Images("img")[0].encoded_image_string == img_byte_arr
 
 
+def test_async_checkpoint(tmp_path: Path):
+    import torch
+
+    tmp_path = tmp_path.joinpath(f"{random.random()}")
+    async_c = copy.deepcopy(c)
+    async_c.async_checkpoint = True
+    l = SummaryLogger(async_c, tmp_path, keep_n_checkpoints=3)
+    assert l.checkpoint_writer is not None
+    save_dict = {"A": torch.zeros(100), "B": [torch.ones(10), 1]}
+    for i in range(10):
+        l.checkpoint(save_dict, "b")
+        # the submitted checkpoint is a copy of the state
+        save_dict["A"] += 1
+    l.flush()
+    chkpts = sorted(tmp_path.joinpath("checkpoints").glob("*"))
+    assert [p.name for p in chkpts] == [f"b_{i:010}.pt" for i in range(7, 10)]
+    assert (torch.load(chkpts[-1])["A"] == 9).all()
+    assert torch.load(chkpts[-1])["B"][1] == 1
+    # the checkpoints that are written in the background are written before they are cleaned.
+    l.checkpoint({"A": torch.zeros(int(1e6))}, "b")
+    l.clean_checkpoints(0)
+    assert list(tmp_path.joinpath("checkpoints").glob("*")) == []
+    l.close()
+    assert l.checkpoint_writer is None
+
+    l = SummaryLogger(async_c, tmp_path, resume=True)
+    l.checkpoint({"A": lambda x: x}, "b")
+    assert_error_msg(lambda: l.flush(), "Could not write checkpoint.")
+    l.close()
+
+
+def test_checkpoint_manifest(tmp_path: Path):
+    tmp_path = tmp_path.joinpath(f"{random.random()}")
+    l = SummaryLogger(c, tmp_path, keep_n_checkpoints=2)
+    save_dict = {"A": np.random.random(100)}
+    for i in range(3):
+        l.checkpoint(save_dict, "b")
+    assert sorted(l.checkpoint_manifest) == [
+        "checkpoints/b_0000000001.pt",
+        "checkpoints/b_0000000002.pt",
+    ]
+    chkpt = tmp_path.joinpath("checkpoints", "b_0000000002.pt")
+    assert l.checkpoint_manifest["checkpoints/b_0000000002.pt"]["size"] == chkpt.stat().st_size
+    assert l.verify_checkpoint(chkpt)
+    chkpt.write_bytes(chkpt.read_bytes()[:-1] + b"0")
+    l = SummaryLogger(c, tmp_path, resume=True)
+    assert not l.verify_checkpoint(chkpt)
+    assert l.verify_checkpoint(tmp_path.joinpath("checkpoints", "b_0000000001.pt"))
+    l.clean_checkpoints(0)
+    assert len(l.checkpoint_manifest) == 0
+
+
+def test_dedup_checkpoint(tmp_path: Path):
+    import torch
+
+    import ablator.utils.file as futils
+
+    tmp_path = tmp_path.joinpath(f"{random.random()}")
+    dedup_c = copy.deepcopy(c)
+    dedup_c.checkpoint_format = "dedup"
+    l = SummaryLogger(dedup_c, tmp_path, keep_n_checkpoints=1)
+    blob_dir = tmp_path.joinpath(SummaryLogger.CHKPT_BLOB_DIR_NAME)
+    save_dict = {
+        "model": {"w": torch.rand(2000), "b": torch.rand(10)},
+        "optimizer": [torch.rand(2000)],
+    }
+    l.checkpoint(save_dict, "b")
+    l.checkpoint(save_dict, "b", is_best=True)
+    # the small tensor is stored in the index
+    assert len(list(blob_dir.glob("*.pt"))) == 2
+    chkpt = tmp_path.joinpath("checkpoints", "b_0000000000.pt")
+    loaded = futils.load_checkpoint(chkpt)
+    assert (loaded["model"]["w"] == save_dict["model"]["w"]).all()
+    assert (loaded["model"]["b"] == save_dict["model"]["b"]).all()
+    assert (loaded["optimizer"][0] == save_dict["optimizer"][0]).all()
+    assert list(futils.load_checkpoint(chkpt, exclude_keys=["optimizer"])) == ["model"]
+    assert l.verify_checkpoint(chkpt)
+
+    save_dict["model"]["w"] = torch.rand(2000)
+    l.checkpoint(save_dict, "b")
+    # the blob of the previous weights is still used by the best checkpoint
+    assert len(list(blob_dir.glob("*.pt"))) == 3
+    l.clean_checkpoints(1)
+    assert len(list(blob_dir.glob("*.pt"))) == 3
+    l.checkpoint(save_dict, "b", is_best=True)
+    assert len(list(blob_dir.glob("*.pt"))) == 2
+    next(blob_dir.glob("*.pt")).unlink()
+    assert not l.verify_checkpoint(tmp_path.joinpath("checkpoints", "b_0000000001.pt"))
+    l.clean_checkpoints(0)
+    assert len(list(blob_dir.glob("*.pt"))) == 0
+
+
+def test_arrow_results(tmp_path: Path):
+    tmp_path = tmp_path.joinpath(f"{random.random()}")
+    arrow_c = copy.deepcopy(c)
+    arrow_c.results_format = "arrow"
+    l = SummaryLogger(arrow_c, tmp_path)
+    l.results_writer.flush_rows = 3
+    for i in range(5):
+        l.update({"loss": i, "lr": 0.1, "tag": "train", "arr": [i, i]})
+    assert len(read_arrow_results(tmp_path / l.RESULTS_ARROW_NAME)) == 3
+    l.flush()
+    l = SummaryLogger(arrow_c, tmp_path, resume=True)
+    l.update({"loss": 5.0, "lr": 0.1, "tag": "train"})
+    l.close()
+    assert not tmp_path.joinpath(l.RESULTS_JSON_NAME).exists()
+    assert len(list(tmp_path.joinpath(l.RESULTS_ARROW_NAME).glob("*.arrow"))) == 2
+    df = read_result(RunConfig, tmp_path / l.RESULTS_ARROW_NAME)
+    assert df["loss"].tolist() == list(range(6))
+    assert df["tag"].unique().tolist() == ["train"]
+    assert df["arr"].tolist()[:2] == ["[0, 0]", "[1, 1]"]
+    assert (df["path"] == tmp_path.as_posix()).all()
+    assert (df["train_config.batch_size"] == train_c.batch_size).all()
+
+    # the buffered rows are written with the metadata.
+    l = SummaryLogger(arrow_c, tmp_path, resume=True)
+    l.METADATA_INTERVAL = 0
+    l.update({"loss": 6.0, "lr": 0.1, "tag": "train"})
+    assert read_arrow_results(tmp_path / l.RESULTS_ARROW_NAME)["loss"].tolist()[-1] == 6.0
+    l.close()
+    # the rows appended after closing are written to a new segment.
+    l.results_writer.append({"loss": 7.0})
+    l.results_writer.close()
+    assert read_arrow_results(tmp_path / l.RESULTS_ARROW_NAME)["loss"].tolist()[-2:] == [6.0, 7.0]
+
+    # a new metric or a non-numeric value of a numeric metric continue in a new segment
+    tmp_path = tmp_path.joinpath("schema")
+    writer = ArrowResultsWriter(tmp_path, flush_rows=100)
+    writer.append({"loss": 1.0})
+    writer.append({"loss": 2.0, "val_loss": 3.0})
+    writer.append({"loss": "nan", "val_loss": 4.0})
+    writer.append({"loss": 5.0})
+    writer.close()
+    assert len(list(tmp_path.glob("*.arrow"))) == 3
+    df = read_arrow_results(tmp_path)
+    assert df["loss"].tolist() == [1.0, 2.0, "nan", "5.0"]
+    assert df["val_loss"].tolist()[1:3] == [3.0, 4.0]
+    assert df["val_loss"].isna().tolist() == [True, False, False, True]
+
+
+def test_batched_dashboard(tmp_path: Path):
+    tmp_path = tmp_path.joinpath(f"{random.random()}")
+    l = SummaryLogger(c, tmp_path)
+    l.update({"loss": 1.0, "lr": 0.1, "arr": [1, 2], "aux": {"a": 3}})
+    l.dashboard.add_scalar("loss", 2.0, 1)
+    l.dashboard.add_scalar("loss", 3.0, 1)
+    # the step is queued when a metric of a new iteration is added.
+    l.dashboard.add_text("text", "bb", 2)
+    l.close()
+    assert not l.dashboard._writer.is_alive()
+    (event_file,) = list(tmp_path.joinpath("dashboard", "tensorboard").glob("events.*"))
+    events = [
+        event
+        for event in LegacyEventFileLoader(event_file.as_posix()).Load()
+        if event.HasField("summary")
+    ]
+    # the config, a single event for the scalars of every step and the text.
+    assert sorted(event.step for event in events) == [0, 0, 1, 2]
+    scalar_events = [
+        {value.tag: value.simple_value for value in event.summary.value}
+        for event in events
+        if event.summary.value[0].HasField("simple_value")
+    ]
+    assert scalar_events == [
+        {"loss": 1.0, "lr": pytest.approx(0.1), "arr_0": 1, "arr_1": 2, "aux_a": 3},
+        {"loss": 3.0},
+    ]
+
+    # the images are copied when they are added, and not when they are written.
+    import torch
+
+    l = SummaryLogger(c, tmp_path.joinpath("images"))
+    image = torch.zeros((3, 4, 4))
+    for v in [image, image.numpy()]:
+        l.dashboard.add_image("image", v, 1)
+        _, (_, queued_image, _), _ = l.dashboard._step_calls[-1]
+        image += 1
+        assert np.array_equal(np.asarray(queued_image), (image - 1).numpy())
+    l.close()
+
+
+def test_metadata_updates(tmp_path: Path):
+    tmp_path = tmp_path.joinpath(f"{random.random()}")
+    l = SummaryLogger(c, tmp_path)
+    l.METADATA_INTERVAL = 1000
+    read_metadata = lambda: json.loads(tmp_path.joinpath(l.METADATA_JSON).read_text())
+    for _ in range(3):
+        l.update({"loss": 1.0})
+    assert read_metadata()["log_iteration"] == 0
+    # the metadata is written with the checkpoints.
+    l.checkpoint({"a": 1}, "a")
+    metadata = read_metadata()
+    assert metadata["log_iteration"] == 3
+    assert metadata["checkpoint_iteration"] == {"recent": {"a": 0}}
+    l.update({"loss": 1.0})
+    l.flush()
+    assert read_metadata()["log_iteration"] == 4
+    assert list(tmp_path.glob(f".{l.METADATA_JSON}*")) == []
+    l.METADATA_INTERVAL = 0
+    l.update({"loss": 1.0})
+    assert read_metadata()["log_iteration"] == 5
+    l.close()
+
+
 if __name__ == "__main__":
     # TODO test results.json
     test_summary_logger(Path("/tmp/"))
+    test_async_checkpoint(Path("/tmp/"))
+    test_checkpoint_manifest(Path("/tmp/"))
+    test_dedup_checkpoint(Path("/tmp/"))
+    test_arrow_results(Path("/tmp/"))
+    test_batched_dashboard(Path("/tmp/"))
+    test_metadata_updates(Path("/tmp/"))
 
     pass
@@ -0,0 +1,36 @@
+import torch
+
+from ablator.utils.prefetch import BatchPrefetcher
+
+
+def test_prefetch(assert_error_msg):
+    dataloader = [torch.rand(100) for i in range(10)]
+    batches = list(BatchPrefetcher(dataloader, device="cpu", prefetch_batches=3))
+    assert len(batches) == 10
+    assert all((a == b).all() for a, b in zip(batches, dataloader))
+
+    def bad_dataloader():
+        yield torch.rand(100)
+        raise ValueError("Bad batch.")
+
+    prefetcher = BatchPrefetcher(bad_dataloader(), device="cpu")
+    next(prefetcher)
+    assert_error_msg(lambda: next(prefetcher), "Bad batch.")
+
+    prefetcher = BatchPrefetcher(dataloader, device="cpu", prefetch_batches=1)
+    next(prefetcher)
+    prefetcher.close()
+    assert not prefetcher._thread.is_alive()
+
+
+if __name__ == "__main__":
+
+    def assert_error_msg(fn, error_msg):
+        try:
+            fn()
+            assert False
+        except Exception as excp:
+            if not error_msg == str(excp):
+                raise excp
+
+    test_prefetch(assert_error_msg)